@@ -1,25 +1,29 @@
 import os
 import sys
+import argparse
 import datetime
 import json
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from src.utils import ForensicUtils
 from src.modules.adb_manager import ADBManager
 from src.modules.crypto import WhatsAppDecryptor
 from src.modules.downgrade import DowngradeAttack
 from src.modules.lpe import LPEAttack
 from src.modules.agent import UIAgent
-from src.modules.media_extractor import MediaExtractor
+from src.modules.media_extractor import MediaExtractor, AcquisitionScope
 from src.modules.analyst import DataAnalyst          # <--- Nuevo
 from src.modules.metadata_analyst import MetadataAnalyst # <--- Nuevo
+from src.modules.perceptual_hash import SimilarityAnalyst
+from src.modules.known_hashes import KnownHashSet
 from src.modules.report_generator import ReportGenerator # <--- Nuevo
 
 def create_case_structure(case_id):
     timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
     safe_id = "".join([c for c in case_id if c.isalnum() or c in ('-', '_')]).strip()
     if not safe_id: safe_id = "CASO"
-    
+
     base_dir = os.path.join("cases", f"{safe_id}_{timestamp}")
-    
+
     folders = {
         "base": base_dir,
         "evidence": os.path.join(base_dir, "01_Evidence"),
@@ -27,37 +31,64 @@ def create_case_structure(case_id):
         "report": os.path.join(base_dir, "03_Report"),
         "media": os.path.join(base_dir, "04_Media")
     }
-    
+
     for path in folders.values():
         os.makedirs(path, exist_ok=True)
-        
+
     return folders
 
-def main():
-    ForensicUtils.banner()
-    
-    case_id = input("[?] Ingrese ID de Caso / Expediente: ")
-    perito = input("[?] Nombre del Perito Responsable: ")
-    
-    folders = create_case_structure(case_id)
+def close_case(folders, case_id, serial, method_used):
+    """Manifiesto final (hashes + árbol Merkle) y resumen ejecutivo. Devuelve (hash del manifiesto, raíz Merkle)."""
+    manifest_path = ForensicUtils.generate_manifest(folders["base"])
+    manifest_hash = ForensicUtils.calculate_hash(manifest_path)
+    merkle_root = ForensicUtils.load_merkle(folders["base"])["root"]
+
+    # Reporte Ejecutivo TXT (fuera del árbol Merkle: cita el hash del manifiesto ya cerrado)
+    report_path = os.path.join(folders["base"], ForensicUtils.SUMMARY_FILE)
+    with open(report_path, "w", encoding="utf-8") as f:
+        f.write(f"INFORME PERICIAL: CENTRUX WA-X v2.0 PRO\n")
+        f.write(f"=======================================\n")
+        f.write(f"ID CASO: {case_id}\n")
+        if serial:
+            f.write(f"SERIAL: {serial}\n")
+        f.write(f"FECHA: {datetime.datetime.now()}\n")
+        f.write(f"METODO EXITOSO: {method_used}\n")
+        f.write(f"INTEGRIDAD (SHA256): {manifest_hash}\n")
+        f.write(f"RAIZ MERKLE (SHA256): {merkle_root}\n")
+        f.write(f"=======================================\n")
+    return manifest_hash, merkle_root
+
+def acquire_device(case_id, perito, serial=None, interactive=True, previous=None, scope=None):
+    """
+    Pipeline completo de un dispositivo: triage → extracción → multimedia → análisis → reporte.
+    Devuelve un resumen para el informe consolidado del modo multi-dispositivo.
+    'previous' es un caso anterior del mismo dispositivo para la sincronización incremental
+    y 'scope' el alcance autorizado de la adquisición multimedia (AcquisitionScope).
+    """
+    folders = create_case_structure(f"{case_id}_{serial}" if serial else case_id)
     audit_file = os.path.join(folders["logs"], "audit.log")
-    
+    summary = {"serial": serial, "case_path": folders["base"], "device": None,
+               "method": None, "success": False, "manifest_sha256": None, "merkle_root": None}
+
     ForensicUtils.log("SYSTEM", "INFO", f"Sesión iniciada. Evidencia en: {folders['base']}")
-    ForensicUtils.log_audit(audit_file, "SYSTEM", "SESSION_START", f"Perito: {perito} | Caso: {case_id}")
-    
-    adb = ADBManager()
+    ForensicUtils.log_audit(audit_file, "SYSTEM", "SESSION_START", f"Perito: {perito} | Caso: {case_id} | Serial: {serial or 'N/A'}")
+    if scope and scope.active:
+        ForensicUtils.log_audit(audit_file, "SYSTEM", "ACQUISITION_SCOPE", scope.describe())
+
+    adb = ADBManager(serial=serial)
     if not adb.check_connection():
         ForensicUtils.log("MAIN", "CRITICAL", "Dispositivo no detectado o no autorizado.")
-        return
+        return summary
 
     metadata = adb.get_device_metadata()
     with open(os.path.join(folders["logs"], "device_metadata.json"), "w", encoding="utf-8") as f:
         json.dump(metadata, f, indent=4, ensure_ascii=False)
-    
+
     sdk = adb.get_android_version()
     rooted = adb.is_rooted()
-    
+
     device_str = f"{metadata.get('fabricante', 'N/A')} {metadata.get('modelo', 'N/A')}"
+    summary["device"] = device_str
     ForensicUtils.log("TRIAGE", "INFO", f"ID: {device_str} | SDK: {sdk} | Root: {rooted}")
 
     extraction_success = False
@@ -66,12 +97,18 @@ def main():
     # --- CASCADA DE EXTRACCIÓN ---
     if rooted:
         ForensicUtils.log("STRATEGY", "SUCCESS", "Vector A (Root) disponible.")
-        extraction_success = True 
+        extraction_success = True
         method_used = "ROOT_ACCESS"
     else:
         ForensicUtils.log("STRATEGY", "SKIP", "Vector A: No root.")
 
-    if not extraction_success:
+    if not extraction_success and not interactive:
+        # Downgrade, exploits y agente UI alteran el dispositivo o requieren al perito
+        # frente a la pantalla: en paralelo sólo se adquiere lo obtenible sin intervención
+        ForensicUtils.log("STRATEGY", "SKIP", "Vectores B, C y D: Requieren sesión interactiva (modo multi-dispositivo).")
+        ForensicUtils.log_audit(audit_file, "STRATEGY", "VECTORS_SKIPPED", "Downgrade/LPE/UI no ejecutados en modo multi-dispositivo")
+
+    if not extraction_success and interactive:
         if sdk < 31:
             ForensicUtils.log("STRATEGY", "INFO", "Vector B: Downgrade Attack...")
             attacker = DowngradeAttack(adb)
@@ -81,7 +118,7 @@ def main():
         else:
             ForensicUtils.log("STRATEGY", "SKIP", "Vector B: Incompatible con Android 12+.")
 
-    if not extraction_success:
+    if not extraction_success and interactive:
         ForensicUtils.log("STRATEGY", "WARNING", "Vector C: LPE Exploits...")
         lpe = LPEAttack(adb)
         if lpe.run(folders["evidence"]):
@@ -90,7 +127,7 @@ def main():
         else:
             ForensicUtils.log("STRATEGY", "SKIP", "Vector C: Sin vulnerabilidades detectadas.")
 
-    if not extraction_success:
+    if not extraction_success and interactive:
         ForensicUtils.log("STRATEGY", "CRITICAL", "Activando Vector D (Agente UI)...")
         agent = UIAgent(adb, folders)
         if agent.run(pages=15):
@@ -99,9 +136,11 @@ def main():
 
     # --- FASE DE MULTIMEDIA ---
     ForensicUtils.log("SYSTEM", "INFO", "Extracción de Multimedia...")
-    media = MediaExtractor(adb, folders)
+    media = MediaExtractor(adb, folders, baseline=previous, scope=scope)
     media.run()
 
+    summary["method"] = method_used
+
     # --- POST-PROCESAMIENTO Y ANÁLISIS ---
     if extraction_success:
         # 1. Inteligencia de Datos (Keywords)
@@ -112,33 +151,165 @@ def main():
         meta_analyst = MetadataAnalyst(folders)
         meta_analyst.run()
 
+        # 2b. Similitud visual (hash perceptual)
+        SimilarityAnalyst(folders).run()
+
         # 3. Generación de Reporte Visual HTML
         ForensicUtils.log("SYSTEM", "INFO", "Generando Reporte Forense HTML...")
         reporter = ReportGenerator(folders, metadata)
         reporter.generate()
 
         # 4. Cierre y Manifiesto
-        manifest_path = ForensicUtils.generate_manifest(folders["base"])
-        manifest_hash = ForensicUtils.calculate_hash(manifest_path)
-        
-        # Reporte Ejecutivo TXT
-        report_path = os.path.join(folders["report"], "Resumen_Ejecutivo.txt")
-        with open(report_path, "w", encoding="utf-8") as f:
-            f.write(f"INFORME PERICIAL: CENTRUX WA-X v2.0 PRO\n")
-            f.write(f"=======================================\n")
-            f.write(f"ID CASO: {case_id}\n")
-            f.write(f"FECHA: {datetime.datetime.now()}\n")
-            f.write(f"METODO EXITOSO: {method_used}\n")
-            f.write(f"INTEGRIDAD (SHA256): {manifest_hash}\n")
-            f.write(f"=======================================\n")
-        
+        manifest_hash, merkle_root = close_case(folders, case_id, serial, method_used)
+
+        summary["success"] = True
+        summary["manifest_sha256"] = manifest_hash
+        summary["merkle_root"] = merkle_root
         ForensicUtils.log("MAIN", "SUCCESS", f"Caso cerrado. Evidencia en: {folders['base']}")
     else:
         ForensicUtils.log("MAIN", "ERROR", "Adquisición fallida.")
 
+    return summary
+
+def acquire_all_devices(case_id, perito, scope=None):
+    """
+    Modo multi-dispositivo: un proceso de trabajo y una carpeta de caso por serial.
+    Sin intervención del perito: sólo Vector A (root) y multimedia; downgrade, exploits
+    LPE y agente UI quedan para la adquisición individual de cada equipo.
+    """
+    serials = ADBManager().list_devices()
+    if not serials:
+        ForensicUtils.log("MAIN", "CRITICAL", "No hay dispositivos autorizados conectados.")
+        return []
+
+    ForensicUtils.log("MAIN", "INFO", f"{len(serials)} dispositivos detectados: {', '.join(serials)}")
+    results = []
+    with ProcessPoolExecutor(max_workers=len(serials)) as pool:
+        futures = {pool.submit(acquire_device, case_id, perito, serial, False, None, scope): serial for serial in serials}
+        for future in as_completed(futures):
+            serial = futures[future]
+            try:
+                results.append(future.result())
+            except Exception as e:
+                ForensicUtils.log("MAIN", "ERROR", f"[{serial}] Fallo del proceso de adquisición: {e}")
+                results.append({"serial": serial, "case_path": None, "device": None, "method": None,
+                                "success": False, "manifest_sha256": None, "merkle_root": None, "error": str(e)})
+
+    results.sort(key=lambda r: r["serial"])
+
+    # --- RESUMEN CONSOLIDADO ---
+    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+    safe_id = "".join([c for c in case_id if c.isalnum() or c in ('-', '_')]).strip() or "CASO"
+    summary_path = os.path.join("cases", f"{safe_id}_MULTI_{timestamp}.json")
+    with open(summary_path, "w", encoding="utf-8") as f:
+        json.dump({"case_id": case_id, "perito": perito, "devices": results}, f, indent=4, ensure_ascii=False)
+
+    print("\n" + "="*60)
+    print(" RESUMEN MULTI-DISPOSITIVO")
+    print("="*60)
+    for r in results:
+        status = "OK" if r["success"] else "FALLO"
+        print(f" {r['serial']:<20} {status:<6} {r['method'] or '-':<18} {r['case_path'] or '-'}")
+    print("="*60)
+    ForensicUtils.log("MAIN", "INFO", f"Resumen consolidado en: {summary_path}")
+    return results
+
+def verify_case(case_path, subtree=""):
+    """Re-verifica un caso cerrado contra su manifiesto Merkle."""
+    try:
+        result = ForensicUtils.verify_manifest(case_path, subtree)
+    except FileNotFoundError:
+        ForensicUtils.log("VERIFY", "ERROR", f"No existe manifiesto Merkle en: {case_path}")
+        return False
+
+    if result.get("error"):
+        ForensicUtils.log("VERIFY", "ERROR", result["error"])
+        return False
+
+    ForensicUtils.log("VERIFY", "INFO", f"Raíz Merkle: {result['root']} | Subárbol: {result['subtree']} | Archivos verificados: {result['files_checked']}")
+    if not result["chain_ok"]:
+        ForensicUtils.log("VERIFY", "ERROR", "El árbol Merkle almacenado no es coherente con su raíz (manifiesto alterado).")
+    for label, key in (("MODIFICADO", "modified"), ("FALTANTE", "missing"), ("AGREGADO", "added")):
+        for path in result[key]:
+            ForensicUtils.log("VERIFY", "ERROR", f"{label}: {path}")
+
+    if result["ok"]:
+        ForensicUtils.log("VERIFY", "SUCCESS", "Integridad verificada: sin diferencias.")
+    return result["ok"]
+
+def find_similar(case_path, image_path):
+    """Lista las imágenes del caso visualmente equivalentes a una imagen dada."""
+    folders = {k: os.path.join(case_path, v) for k, v in
+               (("logs", "02_Logs"), ("media", "04_Media"), ("report", "03_Report"))}
+    if not os.path.isdir(folders["media"]):
+        ForensicUtils.log("SIMIL", "ERROR", f"No existe carpeta multimedia en: {case_path}")
+        return False
+    matches = SimilarityAnalyst(folders).similar(image_path)
+    for distance, path in matches:
+        ForensicUtils.log("SIMIL", "INFO", f"Distancia {distance:2d}: {os.path.relpath(path, case_path)}")
+    ForensicUtils.log("SIMIL", "SUCCESS" if matches else "INFO", f"{len(matches)} imágenes visualmente equivalentes.")
+    return True
+
+def compile_hashes(output, sources):
+    """Compila listas de SHA-256 conocidos (texto/CSV) al formato binario consultado en el análisis."""
+    missing = [s for s in sources if not os.path.isfile(s)]
+    if missing:
+        ForensicUtils.log("KNOWN", "ERROR", f"No existen las listas: {', '.join(missing)}")
+        return False
+    count = KnownHashSet.compile(sources, output)
+    ForensicUtils.log("KNOWN", "SUCCESS", f"{count} hashes únicos compilados en {output} ({os.path.getsize(output) // 1024} KB).")
+    return True
+
+def main():
+    parser = argparse.ArgumentParser(description="AFAB-Engine: adquisición y preservación forense Android.")
+    parser.add_argument("--multi", action="store_true",
+                        help="Adquiere en paralelo todos los dispositivos conectados (un caso por serial).")
+    parser.add_argument("--verify", metavar="CASO",
+                        help="Verifica la integridad de un caso cerrado contra su manifiesto Merkle.")
+    parser.add_argument("--subtree", metavar="RUTA", default="",
+                        help="Con --verify, limita la verificación a un subárbol (ej. '04_Media/Media/WhatsApp Images').")
+    parser.add_argument("--similar", nargs=2, metavar=("CASO", "IMAGEN"),
+                        help="Busca en un caso las imágenes visualmente equivalentes a IMAGEN (recodificadas, recortadas, capturas).")
+    parser.add_argument("--compile-hashes", nargs="+", metavar=("SALIDA", "LISTA"),
+                        help="Compila listas de SHA-256 conocidos a un conjunto .khs (usar con AFAB_KNOWN_BAD / AFAB_KNOWN_GOOD).")
+    parser.add_argument("--previous", metavar="CASO",
+                        help="Caso previo del mismo dispositivo: la multimedia vigente se reutiliza y sólo se transfiere lo nuevo o modificado.")
+    scope_args = parser.add_argument_group("alcance de la adquisición multimedia (evaluado en el dispositivo)")
+    scope_args.add_argument("--since", metavar="FECHA", help="Sólo archivos modificados desde FECHA (AAAA-MM-DD[THH:MM]).")
+    scope_args.add_argument("--until", metavar="FECHA", help="Sólo archivos modificados hasta FECHA inclusive.")
+    scope_args.add_argument("--types", metavar="LISTA", help="Clases (image,video,audio,document) o extensiones separadas por coma.")
+    scope_args.add_argument("--min-size", metavar="TAM", help="Tamaño mínimo (ej. 10K).")
+    scope_args.add_argument("--max-size", metavar="TAM", help="Tamaño máximo (ej. 50M).")
+    scope_args.add_argument("--folders", metavar="LISTA", help="Subcarpetas autorizadas (ej. 'WhatsApp Images,WhatsApp Video').")
+    args = parser.parse_args()
+
+    if args.verify:
+        sys.exit(0 if verify_case(args.verify, args.subtree) else 1)
+    if args.similar:
+        sys.exit(0 if find_similar(*args.similar) else 1)
+    if args.compile_hashes:
+        if len(args.compile_hashes) < 2:
+            parser.error("--compile-hashes requiere SALIDA y al menos una LISTA")
+        sys.exit(0 if compile_hashes(args.compile_hashes[0], args.compile_hashes[1:]) else 1)
+
+    try:
+        scope = AcquisitionScope.from_cli(args.since, args.until, args.types, args.min_size, args.max_size, args.folders)
+    except ValueError as e:
+        parser.error(f"Alcance inválido: {e}")
+
+    ForensicUtils.banner()
+
+    case_id = input("[?] Ingrese ID de Caso / Expediente: ")
+    perito = input("[?] Nombre del Perito Responsable: ")
+
+    if args.multi:
+        acquire_all_devices(case_id, perito, scope)
+    else:
+        acquire_device(case_id, perito, previous=args.previous, scope=scope)
+
 if __name__ == "__main__":
     try:
         main()
     except KeyboardInterrupt:
         print("\n[!] Operación abortada.")
-        sys.exit(0)
\ No newline at end of file
+        sys.exit(0)
@@ -0,0 +1,42 @@
+import os
+
+# --- Conectividad ADB ---
+# Backend de comandos: "subprocess" (cliente 'adb' por comando) o "socket"
+# (protocolo nativo contra el servidor ADB con sesiones reutilizables).
+ADB_BACKEND = os.environ.get("AFAB_ADB_BACKEND", "subprocess")
+ADB_SERVER_HOST = os.environ.get("AFAB_ADB_HOST", "127.0.0.1")
+ADB_SERVER_PORT = int(os.environ.get("AFAB_ADB_PORT", "5037"))
+
+# --- Extracción multimedia ---
+# Modo de transferencia: "sync" (inventario remoto + stream tar sólo de lo
+# faltante o modificado, reanudable), "tar" (stream 'exec-out tar' completo con
+# hash en escritura) o "pull" (clásico 'adb pull' de la carpeta completa).
+MEDIA_TRANSFER_MODE = os.environ.get("AFAB_MEDIA_MODE", "sync")
+# Tope de transferencias simultáneas (streams tar o pulls) contra un dispositivo;
+# la concurrencia efectiva se ajusta al throughput observado.
+MEDIA_WORKERS = int(os.environ.get("AFAB_MEDIA_WORKERS", "4"))
+# Almacén direccionado por contenido: cada cuerpo multimedia se guarda una sola vez
+# (por SHA-256) y las rutas del caso son enlaces duros. La raíz se comparte entre
+# casos, por lo que conviene ubicarla en el mismo volumen que 'cases/'.
+MEDIA_DEDUP = os.environ.get("AFAB_MEDIA_DEDUP", "0") == "1"
+MEDIA_STORE_DIR = os.environ.get("AFAB_MEDIA_STORE", os.path.join("cases", "_store"))
+
+# --- Análisis de metadatos ---
+# Procesos del escaneo EXIF (0 = uno por núcleo). Los casos pequeños se analizan en serie.
+META_WORKERS = int(os.environ.get("AFAB_META_WORKERS", "0"))
+# Caché de metadatos compartida entre casos (SQLite, por SHA-256 del contenido y tipo).
+# Vacío la desactiva; el tamaño se acota por cantidad de entradas (LRU, ~330 bytes c/u).
+META_CACHE_PATH = os.environ.get("AFAB_META_CACHE", os.path.join("cases", "_cache", "metadata_cache.db"))
+META_CACHE_MAX_ENTRIES = int(os.environ.get("AFAB_META_CACHE_MAX", "1000000"))
+# Conjunto de imágenes de referencia para la similitud visual (hash perceptual);
+# vacío = sin contraste contra referencias.
+PHASH_REFERENCE_DIR = os.environ.get("AFAB_PHASH_REFERENCE", "")
+# Conjuntos compilados (.khs, ver 'main.py --compile-hashes') de hashes conocidos:
+# material ilícito a señalar (KNOWN_BAD) y material benigno a suprimir (KNOWN_GOOD).
+KNOWN_BAD_SET = os.environ.get("AFAB_KNOWN_BAD", "")
+KNOWN_GOOD_SET = os.environ.get("AFAB_KNOWN_GOOD", "")
+
+# --- Análisis de palabras clave ---
+# Comparación sin distinguir tildes (además de mayúsculas) y, opcionalmente, sólo palabras completas.
+KEYWORD_FOLD_ACCENTS = os.environ.get("AFAB_KW_FOLD_ACCENTS", "1") == "1"
+KEYWORD_WHOLE_WORD = os.environ.get("AFAB_KW_WHOLE_WORD", "0") == "1"
@@ -1,102 +1,455 @@
+import asyncio
 import subprocess
+import threading
+import time
 import shutil
+import socket
 import re
-import time
+from contextlib import contextmanager
+from typing import TypedDict
+from src import config
 from src.utils import ForensicUtils
+from src.modules.adb_protocol import ADBSocketClient, ADBProtocolError
+
+
+class DeviceSnapshot(TypedDict):
+    """Radiografía del dispositivo obtenida en un único 'adb shell'."""
+    props: dict
+    sdk: int
+    rooted: bool
+    kernel: str
+    uptime: str
+    battery_level: str
+    storage: str
+    whatsapp_version: str
+    imei_raw: str
+    accessibility: str
+
+
+class SubprocessBackend:
+    """Backend clásico: lanza un proceso cliente 'adb' por cada comando."""
+
+    def __init__(self, manager):
+        self.manager = manager
+
+    def run(self, args, timeout=None):
+        return subprocess.run(self.manager._adb(*args), capture_output=True, text=True, timeout=timeout)
+
+    async def arun(self, args, timeout=None):
+        proc = await asyncio.create_subprocess_exec(
+            *self.manager._adb(*args), stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        try:
+            out, err = await asyncio.wait_for(proc.communicate(), timeout)
+        except asyncio.TimeoutError:
+            proc.kill()
+            await proc.wait()
+            raise subprocess.TimeoutExpired(args, timeout)
+        return subprocess.CompletedProcess(args, proc.returncode, out.decode("utf-8", "replace"), err.decode("utf-8", "replace"))
+
+    @contextmanager
+    def stream(self, args, timeout=None):
+        """
+        Salida del proceso como canal binario. Con 'timeout', un vigía mata el proceso
+        si una lectura pasa ese tiempo sin recibir datos (dispositivo colgado). Si el
+        consumidor termina sin error, se exige que adb haya salido con código 0.
+        """
+        proc = subprocess.Popen(self.manager._adb(*args), stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        pipe = _WatchedPipe(proc, timeout)
+        try:
+            yield pipe
+        except BaseException:
+            # El consumidor abandonó el canal antes del EOF (ej. error de escritura local)
+            pipe.stop()
+            proc.kill()
+            proc.stdout.close()
+            proc.wait()
+            raise
+        # Se drena el relleno final (registros del tar) para no cortar a adb con SIGPIPE
+        try:
+            while pipe.read(65536):
+                pass
+        finally:
+            pipe.stop()
+            proc.stdout.close()
+        try:
+            proc.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.wait()
+        if pipe.stalled:
+            raise subprocess.TimeoutExpired(args, timeout)
+        if proc.returncode != 0:
+            raise subprocess.CalledProcessError(proc.returncode, args)
+
+
+class _WatchedPipe:
+    """stdout de un proceso con vigilancia de inactividad: sólo cuenta el tiempo bloqueado en lecturas."""
+
+    def __init__(self, proc, timeout):
+        self.proc = proc
+        self.timeout = timeout
+        self.stalled = False
+        self._waiting_since = None
+        self._stop = threading.Event()
+        if timeout:
+            threading.Thread(target=self._watch, daemon=True).start()
+
+    def read(self, size=-1):
+        self._waiting_since = time.monotonic()
+        try:
+            # read1: devuelve en cuanto hay datos, de modo que un goteo lento no cuenta como inactividad
+            data = self.proc.stdout.read1(size) if size and size > 0 else self.proc.stdout.read()
+        finally:
+            self._waiting_since = None
+        if self.stalled:
+            raise subprocess.TimeoutExpired(self.proc.args, self.timeout)
+        return data
+
+    def _watch(self):
+        while not self._stop.wait(1):
+            since = self._waiting_since
+            if since is not None and time.monotonic() - since > self.timeout:
+                self.stalled = True
+                self.proc.kill()
+                return
+
+    def stop(self):
+        self._stop.set()
+
+
+class SocketBackend:
+    """
+    Backend nativo: shell, pull, push y devices viajan por el protocolo del
+    servidor ADB sin procesos intermedios. El resto de verbos (install, backup)
+    se delegan al cliente 'adb'.
+    """
+    NATIVE = ("shell", "pull", "push", "devices")
+
+    def __init__(self, manager, host, port):
+        self.client = ADBSocketClient(serial=manager.serial, host=host, port=port)
+        self.fallback = SubprocessBackend(manager)
+        self._server_started = False
+
+    def _with_server(self, fn):
+        try:
+            return fn()
+        except ConnectionRefusedError:
+            if self._server_started:
+                raise
+            # Mismo comportamiento que el cliente oficial: levantar el servidor si no corre
+            self._server_started = True
+            subprocess.run(["adb", "start-server"], capture_output=True)
+            return fn()
+
+    def run(self, args, timeout=None):
+        if not args or args[0] not in self.NATIVE:
+            return self.fallback.run(args, timeout)
+        try:
+            return self._with_server(lambda: self._dispatch(args, timeout))
+        except socket.timeout:
+            raise subprocess.TimeoutExpired(args, timeout)
+        except ADBProtocolError as e:
+            return subprocess.CompletedProcess(args, 1, "", f"{e}\n")
+
+    async def arun(self, args, timeout=None):
+        # El cliente nativo es bloqueante con timeouts de socket propios: se delega a un hilo
+        return await asyncio.to_thread(self.run, args, timeout)
+
+    @contextmanager
+    def stream(self, args, timeout=None):
+        if not args or args[0] != "exec-out":
+            with self.fallback.stream(args, timeout) as out:
+                yield out
+            return
+        try:
+            sock = self._with_server(lambda: self.client.open_stream(" ".join(args[1:]), timeout))
+        except ADBProtocolError as e:
+            raise subprocess.CalledProcessError(1, args, stderr=str(e))
+        try:
+            with sock.makefile("rb") as out:
+                yield out
+        finally:
+            sock.close()
+
+    def _dispatch(self, args, timeout):
+        verb = args[0]
+        if verb == "shell":
+            rc, out, err = self.client.shell(" ".join(args[1:]), timeout)
+            return subprocess.CompletedProcess(args, rc, out.decode("utf-8", "replace"), err.decode("utf-8", "replace"))
+        if verb == "devices":
+            lines = ["List of devices attached"] + [f"{s}\t{state}" for s, state in self.client.devices()]
+            return subprocess.CompletedProcess(args, 0, "\n".join(lines) + "\n", "")
+        if verb == "pull":
+            files, size = self.client.pull(args[1], args[2])
+            return subprocess.CompletedProcess(args, 0, f"{args[1]}: {files} files pulled ({size} bytes)\n", "")
+        size = self.client.push(args[1], args[2])
+        return subprocess.CompletedProcess(args, 0, f"{args[1]}: 1 file pushed ({size} bytes)\n", "")
+
 
 class ADBManager:
     """
     Gestor ADB con Exponential Backoff y Extracción Exhaustiva de Metadatos.
     Recupera la identidad completa del dispositivo (Hardware, Red, Energía).
     """
-    
-    def __init__(self):
+
+    # Marcador que separa la salida de cada sonda dentro del snapshot
+    SNAPSHOT_MARK = "@@AFAB:"
+
+    # Sondas que viajan en la misma invocación que el volcado completo de getprop
+    SNAPSHOT_PROBES = {
+        "kernel": "uname -r",
+        "uptime": "uptime",
+        "battery": "dumpsys battery",
+        "storage": "df -h /data",
+        "accessibility": "settings get secure enabled_accessibility_services",
+    }
+
+    # Sondas lentas o que pueden quedar bloqueadas (ej. diálogo de concesión de 'su'):
+    # viajan en el mismo script, cada una acotada por 'timeout' del dispositivo (segundos)
+    ISOLATED_PROBES = {
+        "whatsapp": ("dumpsys package com.whatsapp | grep versionName", 15),
+        "imei": ("service call iphonesubinfo 1", 10),
+        "root": ("su -c id </dev/null", 8),
+    }
+
+    # Caché de sesión compartida entre instancias: serial -> DeviceSnapshot
+    _snapshots = {}
+
+    def __init__(self, serial=None, backend=None, max_concurrency=4):
         self.adb_available = shutil.which("adb") is not None
+        self.serial = serial
+        self.max_concurrency = max_concurrency
+        self._limiter = None
+        self.backend_name = backend or config.ADB_BACKEND
+        if self.backend_name == "socket":
+            self.backend = SocketBackend(self, config.ADB_SERVER_HOST, config.ADB_SERVER_PORT)
+        else:
+            self.backend = SubprocessBackend(self)
+
+    def _adb(self, *args):
+        """Construye la línea de comando ADB dirigida al dispositivo de esta sesión."""
+        cmd = ["adb"]
+        if self.serial:
+            cmd += ["-s", self.serial]
+        return cmd + list(args)
+
+    def run(self, *args, timeout=None, check=False):
+        """
+        Punto único de ejecución para todos los módulos: equivale a
+        'adb [-s serial] <args>' sobre el backend activo.
+        """
+        res = self.backend.run(list(args), timeout=timeout)
+        if check and res.returncode != 0:
+            raise subprocess.CalledProcessError(res.returncode, res.args, res.stdout, res.stderr)
+        return res
 
-    def _exec(self, command_list, retries=3):
-        """Ejecutor interno con Exponential Backoff para estabilidad."""
-        attempt = 0
-        while attempt < retries:
+    def shell(self, command, timeout=None, check=False):
+        return self.run("shell", command, timeout=timeout, check=check)
+
+    def pull(self, remote_path, local_path, timeout=None, check=False):
+        return self.run("pull", remote_path, local_path, timeout=timeout, check=check)
+
+    def push(self, local_path, remote_path, timeout=None, check=False):
+        return self.run("push", local_path, remote_path, timeout=timeout, check=check)
+
+    @contextmanager
+    def stream(self, *args, timeout=None):
+        """
+        Canal binario de sólo lectura sobre la salida de un comando
+        (ej. 'exec-out tar ...'), consumible a medida que llega sin cargarlo en memoria.
+        """
+        with self.backend.stream(list(args), timeout=timeout) as out:
+            yield out
+
+    def _semaphore(self):
+        """Límite de comandos simultáneos contra este dispositivo (uno por event loop)."""
+        loop = asyncio.get_running_loop()
+        if self._limiter is None or self._limiter[0] is not loop:
+            self._limiter = (loop, asyncio.Semaphore(self.max_concurrency))
+        return self._limiter[1]
+
+    async def exec(self, *args, retries=3, timeout=10):
+        """
+        Ejecutor asíncrono con Exponential Backoff. La espera entre reintentos
+        no bloquea al resto de sondas en curso.
+        """
+        for attempt in range(retries):
             try:
-                res = subprocess.run(command_list, capture_output=True, text=True, timeout=10)
+                async with self._semaphore():
+                    res = await self.backend.arun(list(args), timeout=timeout)
                 if res.returncode == 0:
                     return res.stdout.strip()
-                else:
-                    if attempt == retries - 1: return "ERROR"
+                if attempt == retries - 1:
+                    return "ERROR"
             except Exception:
                 pass
-            
-            wait_time = 2 ** attempt
-            if attempt > 0:
-                # Solo logueamos reintentos graves para no ensuciar
-                pass 
-            time.sleep(wait_time)
-            attempt += 1
-        
+
+            if attempt < retries - 1:
+                await asyncio.sleep(2 ** attempt)
+
         return "ERROR_TIMEOUT"
 
+    def _exec(self, args, retries=3, timeout=10):
+        """Ejecutor interno síncrono (envoltorio de exec)."""
+        return asyncio.run(self.exec(*args, retries=retries, timeout=timeout))
+
     def check_connection(self):
-        if not self.adb_available:
+        if not self.adb_available and self.backend_name != "socket":
             ForensicUtils.log("ADB", "ERROR", "ADB no detectado.")
             return False
-        res = self._exec(["adb", "devices"])
+        res = self._exec(["devices"])
+        if self.serial:
+            return f"{self.serial}\tdevice" in res
         return "\tdevice" in res
 
+    def list_devices(self):
+        """Seriales de todos los dispositivos conectados y autorizados ('adb devices')."""
+        if not self.adb_available and self.backend_name != "socket":
+            ForensicUtils.log("ADB", "ERROR", "ADB no detectado.")
+            return []
+        serials = []
+        for line in self._exec(["devices"]).splitlines():
+            if line.endswith("\tdevice"):
+                serials.append(line.split("\t", 1)[0])
+        return serials
+
+    def _snapshot_script(self):
+        """Script remoto: getprop completo + sondas, separadas por marcadores."""
+        # Sin 'timeout' en el dispositivo (toybox anterior a Android 7) las sondas
+        # aisladas no se emiten y quedan para gather_metadata
+        parts = [f"probe() {{ command -v timeout >/dev/null || return 0; echo \"{self.SNAPSHOT_MARK}$1\"; "
+                 f"timeout \"$2\" sh -c \"exec $3\" </dev/null 2>/dev/null; }}",
+                 f"echo '{self.SNAPSHOT_MARK}props'", "getprop"]
+        for name, cmd in self.SNAPSHOT_PROBES.items():
+            parts.append(f"echo '{self.SNAPSHOT_MARK}{name}'")
+            parts.append(f"({cmd}) 2>/dev/null")
+        for name, (cmd, limit) in self.ISOLATED_PROBES.items():
+            parts.append(f"probe {name} {limit} '{cmd}'")
+        parts.append(f"echo '{self.SNAPSHOT_MARK}end'")
+        return "; ".join(parts)
+
+    def _split_sections(self, raw):
+        """Separa la salida cruda del script por marcador de sonda."""
+        sections = {}
+        current = None
+        for line in raw.splitlines():
+            if line.startswith(self.SNAPSHOT_MARK):
+                current = line[len(self.SNAPSHOT_MARK):].strip()
+                sections[current] = []
+            elif current:
+                sections[current].append(line.rstrip("\r"))
+        return sections
+
+    def _build_snapshot(self, sections):
+        """Convierte las secciones de todas las sondas en un DeviceSnapshot tipado."""
+        props = {}
+        for line in sections.get("props", []):
+            m = re.match(r"^\[(.+?)\]: \[(.*)\]$", line)
+            if m:
+                props[m.group(1)] = m.group(2)
+
+        def text(name):
+            return "\n".join(sections.get(name, [])).strip()
+
+        sdk = props.get("ro.build.version.sdk", "")
+        level = re.search(r"level: (\d+)", text("battery"))
+        storage = text("storage")
+        ver_match = re.search(r"versionName=([\d.]+)", text("whatsapp"))
+        imei = text("imei")
+
+        return DeviceSnapshot(
+            props=props,
+            sdk=int(sdk) if sdk.isdigit() else 0,
+            rooted="uid=0(root)" in text("root"),
+            kernel=text("kernel"),
+            uptime=text("uptime"),
+            battery_level=level.group(1) if level else "N/A",
+            storage=storage.split("\n")[-1] if "\n" in storage else "N/A",
+            whatsapp_version=ver_match.group(1) if ver_match else "NOT_INSTALLED",
+            imei_raw=imei if "Result" in imei else "RESTRICTED/UNAVAILABLE",
+            accessibility=text("accessibility"),
+        )
+
+    async def gather_metadata(self, refresh=False):
+        """
+        Obtiene el snapshot del dispositivo en un único 'adb shell'. Si el dispositivo
+        no pudo acotar las sondas aisladas, éstas se lanzan aparte, a la vez, cada una
+        con su propio timeout. Se consulta una sola vez por serial salvo refresh=True.
+        """
+        key = self.serial or "default"
+        if not refresh and key in self._snapshots:
+            return self._snapshots[key]
+
+        limits = sum(limit for _, limit in self.ISOLATED_PROBES.values())
+        sections = self._split_sections(await self.exec("shell", self._snapshot_script(), timeout=30 + limits))
+
+        missing = [name for name in self.ISOLATED_PROBES if name not in sections]
+        results = await asyncio.gather(
+            *(self.exec("shell", f"({self.ISOLATED_PROBES[name][0]}) 2>/dev/null; true",
+                        retries=2, timeout=self.ISOLATED_PROBES[name][1])
+              for name in missing)
+        )
+        for name, output in zip(missing, results):
+            sections[name] = [] if output.startswith("ERROR") else output.splitlines()
+        snapshot = self._build_snapshot(sections)
+
+        # No cacheamos respuestas fallidas (sin tabla de propiedades)
+        if snapshot["props"]:
+            self._snapshots[key] = snapshot
+        return snapshot
+
+    def get_snapshot(self, refresh=False):
+        """
+        Versión síncrona de gather_metadata.
+        Usar refresh=True tras operaciones que alteran el estado (ej. exploit LPE).
+        """
+        return asyncio.run(self.gather_metadata(refresh=refresh))
+
     def get_device_metadata(self):
         """Extrae radiografía completa del dispositivo (Versión Exhaustiva)."""
         ForensicUtils.log("ADB", "INFO", "Iniciando extracción profunda de metadatos...")
+        snap = self.get_snapshot()
+        props = snap["props"]
         metadata = {}
-        
+
         # --- 1. Identificación de Hardware ---
-        metadata["fabricante"] = self._exec(["adb", "shell", "getprop", "ro.product.manufacturer"])
-        metadata["modelo"] = self._exec(["adb", "shell", "getprop", "ro.product.model"])
-        metadata["nombre_codigo"] = self._exec(["adb", "shell", "getprop", "ro.product.name"])
-        metadata["serial_number"] = self._exec(["adb", "shell", "getprop", "ro.serialno"])
-        
+        metadata["fabricante"] = props.get("ro.product.manufacturer", "")
+        metadata["modelo"] = props.get("ro.product.model", "")
+        metadata["nombre_codigo"] = props.get("ro.product.name", "")
+        metadata["serial_number"] = props.get("ro.serialno", "")
+
         # --- 2. Software y Seguridad ---
-        metadata["android_version"] = self._exec(["adb", "shell", "getprop", "ro.build.version.release"])
-        metadata["sdk_level"] = self._exec(["adb", "shell", "getprop", "ro.build.version.sdk"])
-        metadata["security_patch"] = self._exec(["adb", "shell", "getprop", "ro.build.version.security_patch"])
-        metadata["kernel"] = self._exec(["adb", "shell", "uname", "-r"])
-        
+        metadata["android_version"] = props.get("ro.build.version.release", "")
+        metadata["sdk_level"] = props.get("ro.build.version.sdk", "")
+        metadata["security_patch"] = props.get("ro.build.version.security_patch", "")
+        metadata["kernel"] = snap["kernel"]
+
         # --- 3. Estado de Telefonía (Red) ---
-        imei_call = self._exec(["adb", "shell", "service", "call", "iphonesubinfo", "1"])
-        # Limpiamos un poco el resultado crudo del servicio
-        metadata["imei_raw"] = imei_call if "Result" in imei_call else "RESTRICTED/UNAVAILABLE"
-        metadata["sim_state"] = self._exec(["adb", "shell", "getprop", "gsm.sim.state"])
-        metadata["operador"] = self._exec(["adb", "shell", "getprop", "gsm.operator.alpha"])
+        metadata["imei_raw"] = snap["imei_raw"]
+        metadata["sim_state"] = props.get("gsm.sim.state", "")
+        metadata["operador"] = props.get("gsm.operator.alpha", "")
 
         # --- 4. Estado del Sistema (Energía y Tiempo) ---
-        battery = self._exec(["adb", "shell", "dumpsys", "battery"])
-        level = re.search(r"level: (\d+)", battery)
-        metadata["bateria_nivel"] = level.group(1) if level else "N/A"
-        
-        metadata["tiempo_encendido"] = self._exec(["adb", "shell", "uptime"])
-        
+        metadata["bateria_nivel"] = snap["battery_level"]
+        metadata["tiempo_encendido"] = snap["uptime"]
+
         # --- 5. Almacenamiento ---
-        # Obtenemos solo la línea relevante de /data
-        storage = self._exec(["adb", "shell", "df", "-h", "/data"])
-        metadata["almacenamiento_info"] = storage.split("\n")[-1] if "\n" in storage else "N/A"
+        metadata["almacenamiento_info"] = snap["storage"]
 
         # --- 6. Aplicación Objetivo ---
-        wa_info = self._exec(["adb", "shell", "dumpsys", "package", "com.whatsapp"])
-        ver_match = re.search(r"versionName=([\d.]+)", wa_info)
-        metadata["whatsapp_version"] = ver_match.group(1) if ver_match else "NOT_INSTALLED"
-        
+        metadata["whatsapp_version"] = snap["whatsapp_version"]
+
         # --- 7. Accesibilidad ---
-        acc = self._exec(["adb", "shell", "settings", "get", "secure", "enabled_accessibility_services"])
-        metadata["accessibility_services"] = acc
+        metadata["accessibility_services"] = snap["accessibility"]
 
         ForensicUtils.log("ADB", "SUCCESS", "Radiografía de hardware completada.")
         return metadata
 
     def get_android_version(self):
         try:
-            val = self._exec(["adb", "shell", "getprop", "ro.build.version.sdk"])
-            return int(val) if val.isdigit() else 0
+            return self.get_snapshot()["sdk"]
         except:
             return 0
 
-    def is_rooted(self):
-        res = subprocess.run(["adb", "shell", "su", "-c", "id"], capture_output=True, text=True)
-        return "uid=0(root)" in res.stdout
\ No newline at end of file
+    def is_rooted(self, refresh=False):
+        return self.get_snapshot(refresh=refresh)["rooted"]
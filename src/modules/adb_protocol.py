@@ -0,0 +1,310 @@
+import os
+import socket
+import stat
+import struct
+import threading
+from contextlib import contextmanager
+
+
+class ADBProtocolError(Exception):
+    """Respuesta FAIL del servidor ADB o trama inesperada en el canal."""
+
+
+class SyncConnection:
+    """
+    Sesión 'sync:' abierta contra un dispositivo (STAT / LIST / RECV / SEND).
+    Una misma sesión admite múltiples transferencias hasta enviar QUIT,
+    por eso es la unidad que se reutiliza en el pool.
+    """
+    MAX_CHUNK = 64 * 1024
+
+    def __init__(self, sock):
+        self.sock = sock
+
+    def _send(self, cmd, payload=b""):
+        self.sock.sendall(cmd + struct.pack("<I", len(payload)) + payload)
+
+    def _recv_packet(self):
+        header = _read_exact(self.sock, 8)
+        return header[:4], struct.unpack("<I", header[4:])[0]
+
+    def stat(self, path):
+        """Devuelve (mode, size, mtime). mode == 0 si la ruta no existe."""
+        self._send(b"STAT", path.encode("utf-8"))
+        data = _read_exact(self.sock, 16)
+        if data[:4] != b"STAT":
+            raise ADBProtocolError(f"Respuesta STAT inválida: {data[:4]!r}")
+        return struct.unpack("<III", data[4:])
+
+    def list(self, path):
+        """Lista un directorio remoto: [(name, mode, size, mtime)]."""
+        self._send(b"LIST", path.encode("utf-8"))
+        entries = []
+        while True:
+            data = _read_exact(self.sock, 20)
+            cmd = data[:4]
+            if cmd == b"DONE":
+                return entries
+            if cmd != b"DENT":
+                raise ADBProtocolError(f"Respuesta LIST inválida: {cmd!r}")
+            mode, size, mtime, namelen = struct.unpack("<IIII", data[4:])
+            name = _read_exact(self.sock, namelen).decode("utf-8", "replace")
+            if name not in (".", ".."):
+                entries.append((name, mode, size, mtime))
+
+    def recv(self, remote_path, out):
+        """Copia un archivo remoto sobre el objeto 'out' (modo binario). Devuelve bytes."""
+        self._send(b"RECV", remote_path.encode("utf-8"))
+        total = 0
+        while True:
+            cmd, length = self._recv_packet()
+            if cmd == b"DATA":
+                chunk = _read_exact(self.sock, length)
+                out.write(chunk)
+                total += length
+            elif cmd == b"DONE":
+                return total
+            elif cmd == b"FAIL":
+                raise ADBProtocolError(_read_exact(self.sock, length).decode("utf-8", "replace"))
+            else:
+                raise ADBProtocolError(f"Respuesta RECV inválida: {cmd!r}")
+
+    def send(self, src, remote_path, mode=0o644, mtime=0):
+        """Sube el contenido del objeto 'src' (modo binario) a la ruta remota."""
+        self._send(b"SEND", f"{remote_path},{mode}".encode("utf-8"))
+        total = 0
+        for chunk in iter(lambda: src.read(self.MAX_CHUNK), b""):
+            self._send(b"DATA", chunk)
+            total += len(chunk)
+        self.sock.sendall(b"DONE" + struct.pack("<I", mtime))
+        cmd, length = self._recv_packet()
+        if cmd == b"FAIL":
+            raise ADBProtocolError(_read_exact(self.sock, length).decode("utf-8", "replace"))
+        if cmd != b"OKAY":
+            raise ADBProtocolError(f"Respuesta SEND inválida: {cmd!r}")
+        return total
+
+    def close(self):
+        try:
+            self._send(b"QUIT")
+        except OSError:
+            pass
+        self.sock.close()
+
+
+class ADBSocketClient:
+    """
+    Cliente nativo del protocolo de host del servidor ADB (TCP 5037).
+    Evita lanzar un proceso 'adb' por comando: cada orden es una conexión
+    local al servidor y las sesiones sync se reutilizan desde un pool.
+    """
+
+    def __init__(self, serial=None, host="127.0.0.1", port=5037, max_idle=4, timeout=10):
+        self.serial = serial
+        self.host = host
+        self.port = port
+        self.max_idle = max_idle
+        self.timeout = timeout
+        self._idle = []
+        self._lock = threading.Lock()
+        self._shell_v2 = True
+
+    # --- Capa de transporte ---
+
+    def _connect(self, timeout=None):
+        sock = socket.create_connection((self.host, self.port), timeout=timeout or self.timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return sock
+
+    def _request(self, sock, payload):
+        data = payload.encode("utf-8")
+        sock.sendall(b"%04x" % len(data) + data)
+        status = _read_exact(sock, 4)
+        if status == b"OKAY":
+            return
+        if status == b"FAIL":
+            raise ADBProtocolError(_read_hex_block(sock).decode("utf-8", "replace"))
+        raise ADBProtocolError(f"Estado desconocido del servidor: {status!r}")
+
+    def _open_service(self, service, timeout=None):
+        """Abre 'host:transport' hacia el dispositivo y solicita el servicio indicado."""
+        sock = self._connect(timeout)
+        try:
+            target = f"host:transport:{self.serial}" if self.serial else "host:transport-any"
+            self._request(sock, target)
+            self._request(sock, service)
+        except Exception:
+            sock.close()
+            raise
+        return sock
+
+    def host_command(self, command):
+        """Consulta directa al servidor (ej. 'host:devices', 'host:version')."""
+        sock = self._connect()
+        try:
+            self._request(sock, command)
+            return _read_hex_block(sock).decode("utf-8", "replace")
+        finally:
+            sock.close()
+
+    def devices(self):
+        """Devuelve [(serial, estado)] según 'host:devices'."""
+        result = []
+        for line in self.host_command("host:devices").splitlines():
+            if "\t" in line:
+                serial, state = line.split("\t", 1)
+                result.append((serial, state.strip()))
+        return result
+
+    # --- Servicio shell ---
+
+    def shell(self, command, timeout=None):
+        """Ejecuta un comando remoto. Devuelve (returncode, stdout, stderr) en bytes."""
+        if self._shell_v2:
+            try:
+                sock = self._open_service(f"shell,v2,raw:{command}", timeout)
+            except ADBProtocolError:
+                # Dispositivos anteriores a Android 7 no implementan shell v2:
+                # si el servicio clásico responde, recordamos el fallback
+                sock = self._open_service(f"shell:{command}", timeout)
+                self._shell_v2 = False
+            else:
+                return self._read_shell_v2(sock)
+        else:
+            sock = self._open_service(f"shell:{command}", timeout)
+        try:
+            return 0, _read_all(sock), b""
+        finally:
+            sock.close()
+
+    def _read_shell_v2(self, sock):
+        stdout, stderr, rc = [], [], 1
+        try:
+            # CLOSE_STDIN: el comando no espera entrada del host
+            sock.sendall(struct.pack("<BI", 4, 0))
+            while True:
+                header = _read_exact(sock, 5, allow_eof=True)
+                if not header:
+                    break
+                packet_id, length = struct.unpack("<BI", header)
+                data = _read_exact(sock, length)
+                if packet_id == 1:
+                    stdout.append(data)
+                elif packet_id == 2:
+                    stderr.append(data)
+                elif packet_id == 3:
+                    rc = data[0] if data else 0
+                    break
+        finally:
+            sock.close()
+        return rc, b"".join(stdout), b"".join(stderr)
+
+    def open_stream(self, command, timeout=None):
+        """Canal 'exec:' crudo (equivalente a 'adb exec-out') para lectura en streaming."""
+        return self._open_service(f"exec:{command}", timeout)
+
+    # --- Servicio sync (con pool de sesiones) ---
+
+    @contextmanager
+    def sync(self):
+        """Presta una sesión sync del pool; se descarta si la operación falla."""
+        with self._lock:
+            conn = self._idle.pop() if self._idle else None
+        if conn is None:
+            conn = SyncConnection(self._open_service("sync:"))
+        try:
+            yield conn
+        except Exception:
+            conn.close()
+            raise
+        with self._lock:
+            if len(self._idle) < self.max_idle:
+                self._idle.append(conn)
+                conn = None
+        if conn is not None:
+            conn.close()
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+    def pull(self, remote_path, local_path):
+        """
+        Descarga un archivo o árbol remoto con la misma semántica que 'adb pull':
+        si el destino es un directorio existente se crea dentro con el nombre remoto.
+        Devuelve (archivos, bytes).
+        """
+        with self.sync() as conn:
+            mode, _, _ = conn.stat(remote_path)
+            if mode:
+                if os.path.isdir(local_path):
+                    local_path = os.path.join(local_path, os.path.basename(remote_path.rstrip("/")))
+                if stat.S_ISDIR(mode):
+                    return self._pull_tree(conn, remote_path.rstrip("/"), local_path)
+                return 1, self._recv_file(conn, remote_path, local_path)
+        raise ADBProtocolError(f"remote object '{remote_path}' does not exist")
+
+    def _pull_tree(self, conn, remote_dir, local_dir):
+        os.makedirs(local_dir, exist_ok=True)
+        files, total = 0, 0
+        for name, mode, _, _ in conn.list(remote_dir):
+            remote = f"{remote_dir}/{name}"
+            local = os.path.join(local_dir, name)
+            if stat.S_ISLNK(mode):
+                mode, _, _ = conn.stat(remote)
+            if stat.S_ISDIR(mode):
+                sub_files, sub_bytes = self._pull_tree(conn, remote, local)
+                files += sub_files
+                total += sub_bytes
+            elif stat.S_ISREG(mode):
+                total += self._recv_file(conn, remote, local)
+                files += 1
+        return files, total
+
+    @staticmethod
+    def _recv_file(conn, remote_path, local_path):
+        """
+        Descarga a un temporal y lo renombra sobre el destino: si éste es un enlace duro
+        (ej. a un blob del almacén de contenido) se reemplaza en lugar de reescribirse.
+        """
+        part_path = local_path + ".part"
+        try:
+            with open(part_path, "wb") as out:
+                size = conn.recv(remote_path, out)
+            os.replace(part_path, local_path)
+        finally:
+            if os.path.exists(part_path):
+                os.remove(part_path)
+        return size
+
+    def push(self, local_path, remote_path):
+        """Sube un archivo local. Devuelve bytes transferidos."""
+        st = os.stat(local_path)
+        with self.sync() as conn, open(local_path, "rb") as src:
+            return conn.send(src, remote_path, stat.S_IMODE(st.st_mode), int(st.st_mtime))
+
+
+def _read_exact(sock, size, allow_eof=False):
+    buf = bytearray()
+    while len(buf) < size:
+        chunk = sock.recv(size - len(buf))
+        if not chunk:
+            if allow_eof and not buf:
+                return b""
+            raise ADBProtocolError("Conexión cerrada por el servidor ADB")
+        buf += chunk
+    return bytes(buf)
+
+
+def _read_hex_block(sock):
+    length = int(_read_exact(sock, 4), 16)
+    return _read_exact(sock, length)
+
+
+def _read_all(sock):
+    chunks = []
+    for chunk in iter(lambda: sock.recv(65536), b""):
+        chunks.append(chunk)
+    return b"".join(chunks)
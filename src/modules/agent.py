@@ -1,10 +1,9 @@
 import os
 import time
-import subprocess
 import json
 import re
 import xml.etree.ElementTree as ET
-from src.utils import ForensicUtils
+from src.utils import ForensicUtils, HashCache
 
 class UIAgent:
     """
@@ -19,6 +18,7 @@ class UIAgent:
         self.screenshot_dir = os.path.join(self.evidence_dir, "Screenshots")
         self.audit_log = os.path.join(case_folders["logs"], "audit.log")
         self.json_path = os.path.join(self.evidence_dir, "chat_data.json")
+        self.hash_cache = HashCache.for_case(case_folders["logs"])
         
         if not os.path.exists(self.screenshot_dir):
             os.makedirs(self.screenshot_dir)
@@ -30,18 +30,19 @@ class UIAgent:
         local_path = os.path.join(self.screenshot_dir, filename)
         remote_path = "/data/local/tmp/screen.png"
         
-        subprocess.run(["adb", "shell", "screencap", "-p", remote_path], check=True, capture_output=True)
-        subprocess.run(["adb", "pull", remote_path, local_path], check=True, capture_output=True)
+        self.adb.run("shell", "screencap", "-p", remote_path, check=True)
+        self.adb.pull(remote_path, local_path, check=True)
         
-        img_hash = ForensicUtils.calculate_hash(local_path)
+        img_hash = self.hash_cache.sha256(local_path)
+        self.hash_cache.save()
         ForensicUtils.log_audit(self.audit_log, "UI_AGENT", "SCREENSHOT", f"File: {filename} | Hash: {img_hash}")
         return filename, img_hash
 
     def get_ui_dump(self):
         temp_xml = "temp_view_dump.xml"
         remote_xml = "/data/local/tmp/view.xml"
-        subprocess.run(["adb", "shell", "uiautomator", "dump", remote_xml], check=True, capture_output=True)
-        subprocess.run(["adb", "pull", remote_xml, temp_xml], check=True, capture_output=True)
+        self.adb.run("shell", "uiautomator", "dump", remote_xml, check=True)
+        self.adb.pull(remote_xml, temp_xml, check=True)
         return temp_xml
 
     def _is_time_string(self, text):
@@ -100,7 +101,7 @@ class UIAgent:
 
         for p in range(pages):
             ntp_time = ForensicUtils.get_ntp_time()
-            device_time = subprocess.check_output(["adb", "shell", "date", "+'%Y-%m-%dT%H:%M:%S'"]).decode().strip()
+            device_time = self.adb.run("shell", "date", "+'%Y-%m-%dT%H:%M:%S'", check=True).stdout.strip()
             
             img_name, img_hash = self.take_screenshot(p)
             xml_file = self.get_ui_dump()
@@ -144,7 +145,7 @@ class UIAgent:
                 ForensicUtils.log("AGENT", "SUCCESS", f"Página {p+1}: {new_entries} mensajes capturados.")
                 
                 # Scroll
-                subprocess.run(["adb", "shell", "input", "swipe", "500", "500", "500", "1500", "400"])
+                self.adb.run("shell", "input", "swipe", "500", "500", "500", "1500", "400")
                 
                 if os.path.exists(xml_file): os.remove(xml_file)
                 time.sleep(1.5)
@@ -1,6 +1,8 @@
 import json
 import os
+from src import config
 from src.utils import ForensicUtils
+from src.modules.keyword_matcher import KeywordMatcher
 
 class DataAnalyst:
     """
@@ -17,10 +19,19 @@ class DataAnalyst:
             "drogas", "arma", "dinero", "pago", "matar", "ubicación", 
             "location", "transferencia", "cbu", "alias", "banco", "meet"
         ]
+        self._matcher = None
+
+    def _get_matcher(self):
+        """Autómata del diccionario vigente; se reconstruye sólo si la lista cambió."""
+        key = (tuple(self.keywords), config.KEYWORD_FOLD_ACCENTS, config.KEYWORD_WHOLE_WORD)
+        if self._matcher is None or self._matcher[0] != key:
+            self._matcher = (key, KeywordMatcher(self.keywords, config.KEYWORD_FOLD_ACCENTS, config.KEYWORD_WHOLE_WORD))
+        return self._matcher[1]
 
     def set_custom_keywords(self, keyword_list):
         if keyword_list:
-            self.keywords = [k.lower().strip() for k in keyword_list.split(",")]
+            self.keywords = [k.lower().strip() for k in keyword_list.split(",") if k.strip()]
+            self._get_matcher()
 
     def run(self):
         ForensicUtils.log("ANALYST", "INFO", "Iniciando análisis de inteligencia de datos...")
@@ -34,19 +45,18 @@ class DataAnalyst:
             with open(self.json_path, "r", encoding="utf-8") as f:
                 messages = json.load(f)
 
+            matcher = self._get_matcher()
             for msg in messages:
-                text = msg.get("text", "").lower()
-                for kw in self.keywords:
-                    if kw in text:
-                        hit = {
-                            "keyword": kw,
-                            "original_text": msg.get("text"),
-                            "sender": msg.get("sender"),
-                            "time": msg.get("device_time"),
-                            "img_ref": msg.get("img_ref")
-                        }
-                        hits.append(hit)
-                        # No rompemos el loop para encontrar múltiples keywords en un mismo mensaje
+                # Una sola pasada por mensaje, sin importar el tamaño del diccionario
+                for kw in matcher.matches(msg.get("text") or ""):
+                    hit = {
+                        "keyword": kw,
+                        "original_text": msg.get("text"),
+                        "sender": msg.get("sender"),
+                        "time": msg.get("device_time"),
+                        "img_ref": msg.get("img_ref")
+                    }
+                    hits.append(hit)
 
             # Generar Reporte de Hallazgos
             if hits:
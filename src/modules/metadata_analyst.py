@@ -1,9 +1,25 @@
 import os
+import sys
 import json
 import re
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
 from PIL import Image
 from PIL.ExifTags import TAGS, GPSTAGS
-from src.utils import ForensicUtils
+from src import config
+from src.utils import ForensicUtils, HashCache
+from src.modules.exif_reader import ExifReader
+from src.modules.mp4_reader import Mp4Reader
+from src.modules.metadata_cache import MetadataCache
+from src.modules.media_catalog import MediaCatalog
+from src.modules.known_hashes import KnownHashes
+
+
+def _scan_batch(batch):
+    """Unidad de trabajo del pool de procesos: [(ruta, hash|None, clase)] -> [(hash, metadatos|None)]."""
+    return [MetadataAnalyst._scan_file(path, file_hash, kind) for path, file_hash, kind in batch]
+
 
 class MetadataAnalyst:
     """
@@ -11,11 +27,34 @@ class MetadataAnalyst:
     Distingue entre archivos 'lavados' por WhatsApp y archivos originales (Documentos)
     que pueden contener evidencia geolocalizada crítica.
     """
-    def __init__(self, case_folders):
+    BATCH_SIZE = 64         # Imágenes por tarea enviada al pool de procesos
+    PARALLEL_MIN = 256      # Por debajo de este volumen el escaneo serial es más rápido
+    IMAGE_EXT = ('.jpg', '.jpeg', '.png', '.webp')
+    VIDEO_EXT = ('.mp4', '.m4v', '.mov', '.3gp', '.3gpp', '.3g2', '.m4a')   # ISO-BMFF
+    # Tipos reales (catálogo) que se analizan, por clase
+    IMAGE_TYPES = ("image/jpeg", "image/png", "image/webp")
+    VIDEO_TYPES = ("video/mp4", "video/3gpp", "video/quicktime", "audio/mp4")
+
+    def __init__(self, case_folders, workers=None, progress=None, cache=None):
         self.media_dir = case_folders.get("media")
         self.report_dir = case_folders.get("report")
+        self.hash_cache = HashCache.for_case(case_folders["logs"])
+        self.catalog = MediaCatalog(case_folders)
+        self.workers = max(1, workers or config.META_WORKERS or os.cpu_count() or 1)
+        # progress(hechas, total): por defecto una línea de estado en consola
+        self.progress = progress or self._console_progress
+        # Caché entre casos por contenido (MetadataCache); por defecto la del espacio de trabajo
+        self.cache = cache
 
-    def _get_exif_data(self, image):
+    @staticmethod
+    def _console_progress(done, total):
+        sys.stdout.write(f"\r[*] Analizando metadatos: {done}/{total} archivos")
+        if done >= total:
+            sys.stdout.write("\n")
+        sys.stdout.flush()
+
+    @staticmethod
+    def _get_exif_data(image):
         """Extrae data EXIF cruda de forma segura."""
         exif_data = {}
         try:
@@ -40,7 +79,8 @@ class MetadataAnalyst:
             pass
         return exif_data
 
-    def _get_lat_lon(self, exif_data):
+    @staticmethod
+    def _get_lat_lon(exif_data):
         """Convierte coordenadas GPS a formato decimal legible."""
         lat = None
         lon = None
@@ -81,6 +121,207 @@ class MetadataAnalyst:
             
         return "INDETERMINADO"
 
+    @staticmethod
+    def _read_metadata(filepath, kind=None):
+        """
+        Resumen EXIF (cámara, fecha, GPS) de una imagen o video, o None si no puede decodificarse.
+        'kind' ("image"/"video") viene del tipo real del catálogo; sin él se usa la extensión.
+        """
+        if kind is None:
+            kind = "video" if filepath.lower().endswith(MetadataAnalyst.VIDEO_EXT) else "image"
+        if kind == "video":
+            return MetadataAnalyst._read_video_metadata(filepath)
+        # Lectura de cabecera (una lectura pequeña); PIL sólo para archivos atípicos
+        exif = ExifReader.read(filepath)
+        if exif is None:
+            try:
+                with Image.open(filepath) as img:
+                    exif = MetadataAnalyst._get_exif_data(img)
+            except Exception:
+                return None
+        lat, lon = MetadataAnalyst._get_lat_lon(exif)
+        return {
+            "camera": f"{exif.get('Make', '')} {exif.get('Model', '')}".strip(),
+            "date_original": str(exif.get("DateTimeOriginal", "N/A")),
+            "has_meta": "Make" in exif or "DateTimeOriginal" in exif,
+            "lat": lat,
+            "lon": lon,
+        }
+
+    @staticmethod
+    def _read_video_metadata(filepath):
+        """
+        Resumen equivalente para MP4/3GP. La fecha de 'mvhd' la reescribe cualquier
+        recodificación (ej. la de WhatsApp), por lo que sólo se muestra: no cuenta como
+        metadato de origen, a diferencia de la fecha de captura, el equipo o el GPS.
+        """
+        info = Mp4Reader.read(filepath)
+        if info is None:
+            return None
+        return {
+            "camera": f"{info.get('Make', '')} {info.get('Model', '')}".strip(),
+            "date_original": info.get("DateTimeOriginal") or info.get("CreationTime") or "N/A",
+            "has_meta": "Make" in info or "DateTimeOriginal" in info,
+            "lat": info.get("lat"),
+            "lon": info.get("lon"),
+        }
+
+    @staticmethod
+    def _scan_file(filepath, file_hash=None, kind=None):
+        """Hash (si no se conoce) y metadatos de una imagen o video. Se ejecuta en el proceso worker."""
+        if file_hash is None:
+            try:
+                file_hash = ForensicUtils.calculate_hashes(filepath)["sha256"]
+            except OSError:
+                return None, None
+        try:
+            return file_hash, MetadataAnalyst._read_metadata(filepath, kind)
+        except Exception:
+            # Un archivo malformado no debe interrumpir el análisis del caso
+            return file_hash, None
+
+    def _open_cache(self):
+        if self.cache is None and config.META_CACHE_PATH:
+            try:
+                self.cache = MetadataCache(config.META_CACHE_PATH, config.META_CACHE_MAX_ENTRIES)
+            except sqlite3.Error as e:
+                ForensicUtils.log("META", "WARNING", f"Caché de metadatos no disponible ({e}).")
+        return self.cache
+
+    def _open_known(self):
+        """Listas de hashes conocidos configuradas, o None si no hay (o no se pueden abrir)."""
+        try:
+            known = KnownHashes.from_config()
+        except (OSError, ValueError) as e:
+            ForensicUtils.log("META", "WARNING", f"Listas de hashes conocidos no disponibles ({e}).")
+            return None
+        return known if known.active else None
+
+    def _candidates(self):
+        """
+        Imágenes y videos a analizar, en el orden del recorrido (el orden del JSON resultante):
+        [(ruta, nombre, clase)]. Con catálogo del caso se eligen por tipo real, de modo que
+        los archivos renombrados o sin extensión también se analizan.
+        """
+        # Filtramos archivos que no son imágenes o videos útiles
+        excluded_ext = ['.thumb', '.dat', '.opus', '.sticker']
+        candidates = []
+        rows = None
+        if self.catalog.exists():
+            try:
+                rows = self.catalog.query(types=self.IMAGE_TYPES + self.VIDEO_TYPES)
+            except sqlite3.Error as e:
+                ForensicUtils.log("META", "WARNING", f"Catálogo multimedia ilegible ({e}). Se recorre 04_Media.")
+        if rows is not None:
+            for row in rows:
+                file = os.path.basename(row["path"])
+                if any(file.endswith(ext) for ext in excluded_ext): continue
+                candidates.append((row["path"], file, "image" if row["type"] in self.IMAGE_TYPES else "video"))
+            return candidates
+        for root, _, files in os.walk(self.media_dir):
+            for file in files:
+                if any(file.endswith(ext) for ext in excluded_ext): continue
+                if file.lower().endswith(self.IMAGE_EXT + self.VIDEO_EXT):
+                    kind = "video" if file.lower().endswith(self.VIDEO_EXT) else "image"
+                    candidates.append((os.path.join(root, file), file, kind))
+        return candidates
+
+    def _scan(self, candidates):
+        """
+        Devuelve [(hash, metadatos|None)] alineado con 'candidates'.
+        Los hashes vigentes salen de la caché del caso y cada contenido conocido se
+        decodifica una sola vez (o ninguna, si ya figura en la caché entre casos); el
+        resto se reparte en lotes a un pool de procesos (o se procesa en serie en casos
+        pequeños). El orden no depende del reparto.
+        """
+        total = len(candidates)
+        results = [None] * total
+        pending = []            # (índice, ruta, hash conocido o None)
+        first_by_hash = {}
+        duplicates = []
+        stats = {}
+        hashes = {}
+        cache = self._open_cache()
+        if cache:
+            # Con caché entre casos, los hashes se resuelven antes de decodificar (hilos, sin GIL)
+            try:
+                hashed = self.hash_cache.hash_files([p for p, _, _ in candidates if os.path.isfile(p)])
+                hashes = {path: digests["sha256"] for path, digests in hashed.items()}
+            except OSError:
+                hashes = {}
+        for i, (filepath, _, kind) in enumerate(candidates):
+            file_hash = hashes.get(filepath)
+            if file_hash is None:
+                cached = self.hash_cache.get(filepath)
+                file_hash = cached["sha256"] if cached else None
+            # El resumen depende del contenido y del tipo con que se analiza (imagen o video)
+            if (file_hash, kind) in first_by_hash:
+                duplicates.append((i, first_by_hash[(file_hash, kind)]))
+                continue
+            if file_hash:
+                first_by_hash[(file_hash, kind)] = i
+            else:
+                try:
+                    stats[i] = os.stat(filepath)
+                except OSError:
+                    results[i] = (None, None)
+                    continue
+            pending.append((i, filepath, file_hash))
+
+        if cache:
+            try:
+                known = cache.get_many((h, candidates[i][2]) for i, _, h in pending if h)
+            except sqlite3.Error as e:
+                ForensicUtils.log("META", "WARNING", f"Caché de metadatos no disponible ({e}).")
+                known, cache = {}, None
+            for i, _, file_hash in pending:
+                if (file_hash, candidates[i][2]) in known:
+                    results[i] = (file_hash, known[(file_hash, candidates[i][2])])
+            pending = [item for item in pending if (item[2], candidates[item[0]][2]) not in known]
+            if known:
+                ForensicUtils.log("META", "INFO", f"Caché de metadatos: {len(known)} contenidos ya analizados, {len(pending)} por analizar.")
+
+        done = total - len(pending)
+        batches = [pending[n:n + self.BATCH_SIZE] for n in range(0, len(pending), self.BATCH_SIZE)]
+
+        def collect(batch, scanned):
+            nonlocal done
+            for (i, filepath, _), (file_hash, meta) in zip(batch, scanned):
+                results[i] = (file_hash, meta)
+                if file_hash and i in stats:
+                    self.hash_cache.record(filepath, {"sha256": file_hash}, stats[i])
+            done += len(batch)
+            self.progress(done, total)
+
+        remaining = batches
+        if self.workers > 1 and len(pending) >= self.PARALLEL_MIN:
+            ForensicUtils.log("META", "INFO", f"Escaneo paralelo: {len(pending)} archivos en {len(batches)} lotes ({self.workers} procesos).")
+            try:
+                with ProcessPoolExecutor(max_workers=self.workers) as pool:
+                    futures = {pool.submit(_scan_batch, [(path, h, candidates[i][2]) for i, path, h in batch]): batch for batch in batches}
+                    for future in as_completed(futures):
+                        collect(futures[future], future.result())
+                remaining = []
+            except (BrokenProcessPool, OSError) as e:
+                ForensicUtils.log("META", "WARNING", f"Pool de procesos no disponible ({e}). Se continúa en serie.")
+                remaining = [batch for batch in batches if results[batch[0][0]] is None]
+
+        for batch in remaining:
+            collect(batch, _scan_batch([(path, h, candidates[i][2]) for i, path, h in batch]))
+
+        if cache:
+            try:
+                cache.put_many({(results[i][0], candidates[i][2]): results[i][1] for i, _, _ in pending if results[i][0]})
+            except sqlite3.Error as e:
+                ForensicUtils.log("META", "WARNING", f"No se pudo actualizar la caché de metadatos ({e}).")
+
+        for i, first in duplicates:
+            results[i] = results[first]
+        if duplicates and done < total:
+            self.progress(total, total)
+        return results
+
+
     def run(self):
         ForensicUtils.log("META", "INFO", "Iniciando análisis forense de metadatos (EXIF)...")
         
@@ -88,52 +329,75 @@ class MetadataAnalyst:
             return
 
         findings = []
-        scan_count = 0
         gps_count = 0
 
-        # Filtramos archivos que no son imágenes útiles
-        excluded_ext = ['.thumb', '.dat', '.opus', '.sticker'] 
+        candidates = self._candidates()
+        scan_count = len(candidates)
+        results = self._scan(candidates)
+        unique_hashes = set()
+        statuses = {}
+        known = self._open_known()
+        known_counts = {KnownHashes.KNOWN_BAD: 0, KnownHashes.KNOWN_GOOD: 0}
 
-        for root, _, files in os.walk(self.media_dir):
-            for file in files:
-                if any(file.endswith(ext) for ext in excluded_ext): continue
-                
-                if file.lower().endswith(('.jpg', '.jpeg', '.png', '.webp')):
-                    scan_count += 1
-                    try:
-                        filepath = os.path.join(root, file)
-                        origin_status = self._classify_origin(file)
-                        
-                        # Integridad: Hash del archivo
-                        file_hash = ForensicUtils.calculate_hash(filepath)
-                        
-                        # EXIF
-                        img = Image.open(filepath)
-                        exif = self._get_exif_data(img)
-                        lat, lon = self._get_lat_lon(exif)
-                        
-                        gps_str = None
-                        if lat:
-                            gps_str = f"{lat}, {lon}"
-                            gps_count += 1
-                            origin_status = "CRÍTICO: GEO-EVIDENCIA POSITIVA"
-
-                        # Guardamos si tiene datos o si parece original
-                        has_meta = "Make" in exif or "DateTimeOriginal" in exif
-                        
-                        if lat or has_meta or "ORIGINAL" in origin_status:
-                            entry = {
-                                "filename": file,
-                                "rel_path": os.path.relpath(filepath, self.report_dir),
-                                "hash": file_hash,
-                                "status": origin_status,
-                                "camera": f"{exif.get('Make', '')} {exif.get('Model', '')}".strip(),
-                                "date_original": str(exif.get("DateTimeOriginal", "N/A")),
-                                "gps": gps_str
-                            }
-                            findings.append(entry)
-                    except:
-                        pass 
+        for (filepath, file, _), (file_hash, meta) in zip(candidates, results):
+            if file_hash:
+                unique_hashes.add(file_hash)
+            statuses[filepath] = "analyzed" if meta else "undecodable"
+            label = known.tag(file_hash) if known and file_hash else None
+            if label:
+                known_counts[label] += 1
+            if label == KnownHashes.KNOWN_GOOD:
+                # Material benigno conocido: no aporta hallazgos
+                statuses[filepath] = "known_good"
+                continue
+            if meta is None:
+                if label == KnownHashes.KNOWN_BAD:
+                    findings.append({
+                        "filename": file,
+                        "rel_path": os.path.relpath(filepath, self.report_dir),
+                        "hash": file_hash,
+                        "status": "CRÍTICO: HASH CONOCIDO (KNOWN_BAD)",
+                        "camera": "N/A",
+                        "date_original": "N/A",
+                        "gps": None,
+                        "known": label
+                    })
+                    statuses[filepath] = "finding"
+                continue
+            origin_status = self._classify_origin(file)
+            lat, lon = meta["lat"], meta["lon"]
+
+            gps_str = None
+            if lat:
+                gps_str = f"{lat}, {lon}"
+                gps_count += 1
+                origin_status = "CRÍTICO: GEO-EVIDENCIA POSITIVA"
+
+            if label == KnownHashes.KNOWN_BAD:
+                origin_status = "CRÍTICO: HASH CONOCIDO (KNOWN_BAD)"
+
+            # Guardamos si tiene datos o si parece original
+            if label or lat or meta["has_meta"] or "ORIGINAL" in origin_status:
+                entry = {
+                    "filename": file,
+                    "rel_path": os.path.relpath(filepath, self.report_dir),
+                    "hash": file_hash,
+                    "status": origin_status,
+                    "camera": meta["camera"],
+                    "date_original": meta["date_original"],
+                    "gps": gps_str
+                }
+                if label:
+                    entry["known"] = label
+                findings.append(entry)
+                statuses[filepath] = "finding"
+
+        self.hash_cache.save()
+        if self.catalog.exists():
+            try:
+                self.catalog.set_status(statuses)
+            except sqlite3.Error as e:
+                ForensicUtils.log("META", "WARNING", f"No se pudo actualizar el catálogo multimedia ({e}).")
 
         # Guardar resultados JSON para el generador de reportes
         output_file = os.path.join(self.report_dir, "Analisis_Metadatos.json")
@@ -141,6 +405,13 @@ class MetadataAnalyst:
             json.dump(findings, f, indent=4)
             
         if gps_count > 0:
-            ForensicUtils.log("META", "SUCCESS", f"¡ALERTA! Se encontraron {gps_count} imágenes con coordenadas GPS.")
+            ForensicUtils.log("META", "SUCCESS", f"¡ALERTA! Se encontraron {gps_count} archivos con coordenadas GPS.")
         else:
-            ForensicUtils.log("META", "INFO", f"Escaneadas {scan_count} imágenes. Sin GPS (Normal en media procesada).")
\ No newline at end of file
+            ForensicUtils.log("META", "INFO", f"Escaneados {scan_count} archivos (imágenes y videos). Sin GPS (Normal en media procesada).")
+        if known:
+            if known_counts[KnownHashes.KNOWN_BAD]:
+                ForensicUtils.log("META", "WARNING", f"¡ALERTA! {known_counts[KnownHashes.KNOWN_BAD]} archivos coinciden con la lista de hashes KNOWN_BAD.")
+            if known_counts[KnownHashes.KNOWN_GOOD]:
+                ForensicUtils.log("META", "INFO", f"{known_counts[KnownHashes.KNOWN_GOOD]} archivos descartados por figurar en la lista KNOWN_GOOD.")
+        if len(unique_hashes) < scan_count:
+            ForensicUtils.log("META", "INFO", f"{scan_count - len(unique_hashes)} archivos duplicados reutilizaron el análisis de su contenido ({len(unique_hashes)} únicos).")
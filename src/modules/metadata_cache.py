@@ -0,0 +1,82 @@
+import os
+import json
+import time
+import sqlite3
+
+
+class MetadataCache:
+    """
+    Caché persistente entre casos del análisis de metadatos (SQLite en el espacio
+    de trabajo compartido). Clave: SHA-256 del contenido, tipo con el que se analizó
+    ("image"/"video") y versión del analizador; valor: el resumen EXIF/GPS que produce
+    MetadataAnalyst (o None si el archivo no pudo decodificarse).
+    El tamaño se acota por cantidad de entradas, descartando las menos usadas; cada
+    entrada ocupa unos 330 bytes en disco (~330 MB con el límite por defecto).
+    """
+    VERSION = 3         # Versión del analizador: las entradas de otra versión no se consultan (3: clave por tipo)
+    BATCH = 400         # Claves por consulta (límite de parámetros de SQLite)
+
+    def __init__(self, db_path, max_entries):
+        self.db_path = os.path.abspath(db_path)
+        self.max_entries = max_entries
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        # Varios procesos (modo multi-dispositivo) pueden compartir la base
+        self.conn = sqlite3.connect(self.db_path, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        with self.conn:
+            columns = [row[1] for row in self.conn.execute("PRAGMA table_info(metadata)")]
+            if columns and "kind" not in columns:
+                # Esquema anterior (clave sólo por SHA-256): es una caché, se descarta
+                self.conn.execute("DROP TABLE metadata")
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS metadata ("
+                "sha256 TEXT NOT NULL, kind TEXT NOT NULL, version INTEGER NOT NULL, result TEXT, "
+                "last_used REAL NOT NULL, PRIMARY KEY (sha256, kind, version))"
+            )
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_metadata_last_used ON metadata(last_used)")
+
+    def get_many(self, keys):
+        """
+        Devuelve {(sha256, tipo): resumen} para las claves presentes en la versión
+        actual y renueva su uso.
+        """
+        keys = list(keys)
+        found = {}
+        for n in range(0, len(keys), self.BATCH):
+            chunk = keys[n:n + self.BATCH]
+            marks = ",".join("(?, ?)" for _ in chunk)
+            rows = self.conn.execute(
+                f"SELECT sha256, kind, result FROM metadata WHERE version = ? AND (sha256, kind) IN (VALUES {marks})",
+                [self.VERSION] + [value for key in chunk for value in key],
+            )
+            for sha256, kind, result in rows:
+                found[(sha256, kind)] = json.loads(result)
+        if found:
+            now = time.time()
+            with self.conn:
+                self.conn.executemany("UPDATE metadata SET last_used = ? WHERE sha256 = ? AND kind = ? AND version = ?",
+                                      [(now, sha256, kind, self.VERSION) for sha256, kind in found])
+        return found
+
+    def put_many(self, results):
+        """Registra {(sha256, tipo): resumen} y aplica el límite de entradas."""
+        if not results:
+            return
+        now = time.time()
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO metadata (sha256, kind, version, result, last_used) VALUES (?, ?, ?, ?, ?)",
+                [(sha256, kind, self.VERSION, json.dumps(result), now) for (sha256, kind), result in results.items()],
+            )
+            self._evict()
+
+    def _evict(self):
+        count = self.conn.execute("SELECT COUNT(*) FROM metadata").fetchone()[0]
+        if count > self.max_entries:
+            self.conn.execute(
+                "DELETE FROM metadata WHERE rowid IN (SELECT rowid FROM metadata ORDER BY last_used LIMIT ?)",
+                (count - self.max_entries,),
+            )
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,167 @@
+import re
+import struct
+import datetime
+
+
+class Mp4Reader:
+    """
+    Lector de metadatos para contenedores ISO-BMFF (MP4, 3GP, MOV, M4A).
+    Recorre sólo las cabeceras de caja: salta 'mdat' y las tablas de muestras de cada
+    pista, y lee únicamente mvhd, udta y meta (ilst/keys). Cada archivo cuesta unos
+    pocos KB de E/S sin importar la duración del video.
+    Devuelve {"Make", "Model", "DateTimeOriginal", "CreationTime", "lat", "lon"}
+    (sólo las claves presentes), o None si el archivo no es ISO-BMFF legible.
+    """
+    LEAF_LIMIT = 4096           # Ningún átomo de metadatos útil supera este tamaño
+    MAC_EPOCH = datetime.datetime(1904, 1, 1)
+    MAX_SECONDS = int((datetime.datetime(9999, 12, 31) - MAC_EPOCH).total_seconds())
+    TOP_LEVEL = {b"ftyp", b"moov", b"mdat", b"free", b"skip", b"wide", b"pnot", b"uuid", b"moof", b"styp"}
+
+    # Átomos clásicos de QuickTime/iTunes (udta o meta/ilst)
+    ATOMS = {b"\xa9xyz": "location", b"\xa9mak": "Make", b"\xa9mod": "Model", b"\xa9day": "DateTimeOriginal"}
+    # Claves 'mdta' (moov/meta/keys) de iOS y Android
+    KEYS = {
+        "com.apple.quicktime.location.ISO6709": "location",
+        "com.apple.quicktime.make": "Make",
+        "com.apple.quicktime.model": "Model",
+        "com.apple.quicktime.creationdate": "DateTimeOriginal",
+        "com.android.manufacturer": "Make",
+        "com.android.model": "Model",
+    }
+    ISO6709 = re.compile(r"([+-]\d+(?:\.\d+)?)([+-]\d+(?:\.\d+)?)")
+
+    @classmethod
+    def read(cls, path):
+        info = {}
+        try:
+            with open(path, "rb") as f:
+                f.seek(0, 2)
+                end = f.tell()
+                f.seek(0)
+                head = f.read(8)
+                if len(head) < 8 or head[4:8] not in cls.TOP_LEVEL:
+                    return None
+                for btype, start, stop in cls._boxes(f, 0, end):
+                    if btype == b"moov":
+                        cls._moov(f, start, stop, info)
+                        break
+                else:
+                    return None
+        except Exception:
+            # Cajas truncadas, tamaños o valores fuera de rango: el archivo no es legible
+            return None
+        return info
+
+    @classmethod
+    def _boxes(cls, f, start, end):
+        """Cajas hijas en [start, end): (tipo, inicio del contenido, fin). Sólo lee cabeceras."""
+        offset = start
+        while offset + 8 <= end:
+            f.seek(offset)
+            size, btype = struct.unpack(">I4s", f.read(8))
+            header = 8
+            if size == 1:
+                size = struct.unpack(">Q", f.read(8))[0]
+                header = 16
+            elif size == 0:
+                size = end - offset
+            if size < header:
+                return
+            # Una caja nunca excede a su contenedor (ni al archivo)
+            size = min(size, end - offset)
+            if size < header:
+                return
+            yield btype, offset + header, offset + size
+            offset += size
+
+    @classmethod
+    def _payload(cls, f, start, stop):
+        f.seek(start)
+        return f.read(min(stop - start, cls.LEAF_LIMIT))
+
+    @classmethod
+    def _moov(cls, f, start, stop, info):
+        for btype, s, e in cls._boxes(f, start, stop):
+            if btype == b"mvhd":
+                data = cls._payload(f, s, e)
+                if len(data) < 12:
+                    continue
+                seconds = struct.unpack(">Q", data[4:12])[0] if data[0] == 1 else struct.unpack(">I", data[4:8])[0]
+                if 0 < seconds <= cls.MAX_SECONDS:
+                    created = cls.MAC_EPOCH + datetime.timedelta(seconds=seconds)
+                    info["CreationTime"] = created.strftime("%Y:%m:%d %H:%M:%S")
+            elif btype == b"udta":
+                cls._udta(f, s, e, info)
+            elif btype == b"meta":
+                cls._meta(f, s, e, info)
+
+    @classmethod
+    def _udta(cls, f, start, stop, info):
+        for btype, s, e in cls._boxes(f, start, stop):
+            if btype in cls.ATOMS:
+                data = cls._payload(f, s, e)
+                # Cadena internacional de QuickTime: longitud (2), idioma (2), texto
+                length = struct.unpack(">H", data[:2])[0]
+                cls._store(info, cls.ATOMS[btype], data[4:4 + length])
+            elif btype == b"loci":
+                cls._loci(cls._payload(f, s, e), info)
+            elif btype == b"meta":
+                cls._meta(f, s, e, info)
+
+    @classmethod
+    def _loci(cls, data, info):
+        """Ubicación 3GPP: nombre terminado en NUL, rol y coordenadas en punto fijo 16.16."""
+        name_end = data.index(b"\x00", 6)
+        lon, lat = struct.unpack(">ii", data[name_end + 2:name_end + 10])
+        info.setdefault("lat", lat / 65536.0)
+        info.setdefault("lon", lon / 65536.0)
+
+    @classmethod
+    def _meta(cls, f, start, stop, info):
+        # 'meta' ISO es una full box (versión/flags); la de QuickTime no
+        f.seek(start)
+        if f.read(4) == b"\x00\x00\x00\x00":
+            start += 4
+        keys = []
+        for btype, s, e in cls._boxes(f, start, stop):
+            if btype == b"keys":
+                keys = cls._keys(cls._payload(f, s, e))
+            elif btype == b"ilst":
+                for item, is_, ie in cls._boxes(f, s, e):
+                    name = None
+                    if item in cls.ATOMS:
+                        name = cls.ATOMS[item]
+                    elif 0 < struct.unpack(">I", item)[0] <= len(keys):
+                        name = cls.KEYS.get(keys[struct.unpack(">I", item)[0] - 1])
+                    if name is None:
+                        continue
+                    for dtype, ds, de in cls._boxes(f, is_, ie):
+                        if dtype == b"data":
+                            # Tipo (4) + locale (4) + valor
+                            cls._store(info, name, cls._payload(f, ds, de)[8:])
+                            break
+
+    @staticmethod
+    def _keys(data):
+        count = struct.unpack(">I", data[4:8])[0]
+        keys, offset = [], 8
+        for _ in range(count):
+            size = struct.unpack(">I", data[offset:offset + 4])[0]
+            keys.append(data[offset + 8:offset + size].decode("utf-8", "replace"))
+            offset += size
+        return keys
+
+    @classmethod
+    def _store(cls, info, name, raw):
+        value = raw.decode("utf-8", "replace").strip("\x00").strip()
+        if not value:
+            return
+        if name == "location":
+            match = cls.ISO6709.match(value)
+            if match and "lat" not in info:
+                info["lat"], info["lon"] = float(match.group(1)), float(match.group(2))
+        elif name == "DateTimeOriginal":
+            # ISO 8601 ('2024-01-02T10:00:00+0100') al formato EXIF
+            info.setdefault(name, value[:19].replace("-", ":", 2).replace("T", " "))
+        else:
+            info.setdefault(name, value)
@@ -0,0 +1,322 @@
+import os
+import json
+import math
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from PIL import Image, ImageChops
+from src import config
+from src.utils import ForensicUtils, HashCache
+from src.modules.media_catalog import MediaCatalog
+
+
+def _hash_batch(paths):
+    """Unidad de trabajo del pool de procesos: [ruta] -> [(dhash, phash) | None]."""
+    return [PerceptualHasher.hashes(path) for path in paths]
+
+
+def _popcount(value):
+    """Bits en 1 (int.bit_count exige Python 3.10)."""
+    return bin(value).count("1")
+
+
+class PerceptualHasher:
+    """
+    Hashes perceptuales de 64 bits (dHash y pHash) calculados sobre una decodificación
+    reducida: en JPEG, el modo 'draft' de PIL escala en la propia DCT y evita
+    decodificar la resolución completa.
+    """
+    DRAFT_SIZE = (64, 64)
+    MIN_STDDEV = 2.0        # Imágenes planas (sin estructura): no se comparan
+    BORDER_TOLERANCE = 16   # Diferencia de gris para considerar un borde uniforme (barras, marcos)
+    # Base DCT-II: 8 coeficientes de baja frecuencia sobre 32 muestras
+    _COS = [[math.cos(math.pi * (2 * n + 1) * k / 64) for n in range(32)] for k in range(8)]
+
+    @classmethod
+    def _trim(cls, gray):
+        """Recorta bordes uniformes (ej. bandas de una captura de pantalla de una foto)."""
+        background = Image.new("L", gray.size, gray.getpixel((0, 0)))
+        mask = ImageChops.difference(gray, background).point(lambda p: 255 if p > cls.BORDER_TOLERANCE else 0)
+        bbox = mask.getbbox()
+        if bbox and (bbox[2] - bbox[0]) * (bbox[3] - bbox[1]) * 4 >= gray.size[0] * gray.size[1]:
+            return gray.crop(bbox)
+        return gray
+
+    @classmethod
+    def hashes(cls, path):
+        """(dhash, phash) como enteros, o None si la imagen no se decodifica o es plana."""
+        try:
+            with Image.open(path) as img:
+                img.draft("L", cls.DRAFT_SIZE)
+                gray = cls._trim(img.convert("L"))
+                dpix = list(gray.resize((9, 8), Image.LANCZOS).getdata())
+                ppix = list(gray.resize((32, 32), Image.LANCZOS).getdata())
+        except Exception:
+            return None
+
+        mean = sum(ppix) / len(ppix)
+        if math.sqrt(sum((p - mean) ** 2 for p in ppix) / len(ppix)) < cls.MIN_STDDEV:
+            return None
+
+        dhash = 0
+        for row in range(8):
+            for col in range(8):
+                dhash = (dhash << 1) | (dpix[row * 9 + col] > dpix[row * 9 + col + 1])
+
+        # DCT separable: filas (32x8) y luego columnas (8x8)
+        rows = [[sum(ppix[r * 32 + n] * cls._COS[k][n] for n in range(32)) for k in range(8)] for r in range(32)]
+        coeffs = [sum(cls._COS[k1][r] * rows[r][k2] for r in range(32)) for k1 in range(8) for k2 in range(8)]
+        median = sorted(coeffs[1:])[31]     # Sin el término de continua
+        phash = 0
+        for c in coeffs:
+            phash = (phash << 1) | (c > median)
+        return dhash, phash
+
+
+class BKTree:
+    """Árbol BK sobre distancia de Hamming: consultas por radio sin comparar contra todo el conjunto."""
+
+    def __init__(self):
+        self.root = None
+        self.size = 0
+
+    def add(self, key, item):
+        self.size += 1
+        if self.root is None:
+            self.root = [key, [item], {}]
+            return
+        node = self.root
+        while True:
+            distance = _popcount(key ^ node[0])
+            if distance == 0:
+                node[1].append(item)
+                return
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = [key, [item], {}]
+                return
+            node = child
+
+    def query(self, key, radius):
+        """[(distancia, item)] con distancia <= radius."""
+        found = []
+        stack = [self.root] if self.root else []
+        while stack:
+            node = stack.pop()
+            distance = _popcount(key ^ node[0])
+            if distance <= radius:
+                found.extend((distance, item) for item in node[1])
+            for edge, child in node[2].items():
+                if distance - radius <= edge <= distance + radius:
+                    stack.append(child)
+        return found
+
+
+class SimilarityAnalyst:
+    """
+    Detección de imágenes visualmente equivalentes (reenvíos recodificados, recortes,
+    capturas de pantalla de una foto). El árbol BK indexa el dHash y cada candidato
+    se confirma con el pHash. Agrupa el material del caso en clusters y lo contrasta
+    con un conjunto de referencia opcional.
+    """
+    DHASH_RADIUS = 10       # Bits de diferencia admitidos (de 64) en la búsqueda
+    PHASH_RADIUS = 16       # Confirmación con el hash de frecuencias
+    BATCH_SIZE = 64
+    PARALLEL_MIN = 256
+    IMAGE_EXT = ('.jpg', '.jpeg', '.png', '.webp', '.gif', '.bmp')
+    IMAGE_TYPES = ("image/jpeg", "image/png", "image/webp", "image/gif", "image/bmp")
+    FILENAME = "perceptual_hashes.json"
+    REFERENCE_CACHE = "reference_phash.json"
+
+    def __init__(self, case_folders, reference_dir=None, workers=None):
+        self.media_dir = case_folders.get("media")
+        self.report_dir = case_folders.get("report")
+        self.logs_dir = case_folders["logs"]
+        self.hash_cache = HashCache.for_case(case_folders["logs"])
+        self.catalog = MediaCatalog(case_folders)
+        self.reference_dir = reference_dir if reference_dir is not None else config.PHASH_REFERENCE_DIR
+        self.workers = max(1, workers or config.META_WORKERS or os.cpu_count() or 1)
+        self.store_path = os.path.join(self.logs_dir, self.FILENAME)
+
+    def _images(self):
+        """Imágenes del caso en orden de recorrido (por tipo real si hay catálogo)."""
+        if self.catalog.exists():
+            return [row["path"] for row in self.catalog.query(types=self.IMAGE_TYPES)]
+        images = []
+        for root, _, files in os.walk(self.media_dir):
+            for file in files:
+                if file.lower().endswith(self.IMAGE_EXT):
+                    images.append(os.path.join(root, file))
+        return images
+
+    def _compute(self, paths):
+        """{ruta: (dhash, phash) | None}, en paralelo por lotes en casos grandes."""
+        results = {}
+        batches = [paths[n:n + self.BATCH_SIZE] for n in range(0, len(paths), self.BATCH_SIZE)]
+        if self.workers > 1 and len(paths) >= self.PARALLEL_MIN:
+            try:
+                with ProcessPoolExecutor(max_workers=self.workers) as pool:
+                    futures = {pool.submit(_hash_batch, batch): batch for batch in batches}
+                    for future in as_completed(futures):
+                        results.update(zip(futures[future], future.result()))
+                return results
+            except (BrokenProcessPool, OSError) as e:
+                ForensicUtils.log("SIMIL", "WARNING", f"Pool de procesos no disponible ({e}). Se continúa en serie.")
+        for batch in batches:
+            if batch[0] not in results:
+                results.update(zip(batch, _hash_batch(batch)))
+        return results
+
+    @staticmethod
+    def _load_json(path):
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    return json.load(f)
+            except (OSError, ValueError):
+                pass
+        return {}
+
+    def _case_hashes(self, images, persist=True):
+        """
+        Hashes perceptuales por contenido (SHA-256), persistidos en 02_Logs para que
+        las consultas posteriores no vuelvan a decodificar. Con persist=False (consulta
+        sobre un caso ya cerrado) lo faltante se calcula sin reescribir el archivo,
+        que forma parte del manifiesto.
+        Devuelve ({sha256: (dhash, phash)}, {sha256: [rutas]}).
+        """
+        stored = self._load_json(self.store_path)
+        digests = self.hash_cache.hash_files(images)
+        self.hash_cache.save()
+        paths_by_sha = {}
+        for path in images:
+            paths_by_sha.setdefault(digests[path]["sha256"], []).append(path)
+
+        missing = [paths[0] for sha, paths in paths_by_sha.items() if sha not in stored]
+        if missing:
+            computed = self._compute(missing)
+            for sha, paths in paths_by_sha.items():
+                if paths[0] in computed:
+                    value = computed[paths[0]]
+                    stored[sha] = [f"{value[0]:016x}", f"{value[1]:016x}"] if value else None
+            if persist:
+                with open(self.store_path, "w", encoding="utf-8") as f:
+                    json.dump(stored, f)
+
+        hashes = {sha: (int(stored[sha][0], 16), int(stored[sha][1], 16)) for sha in paths_by_sha if stored.get(sha)}
+        return hashes, paths_by_sha
+
+    def _reference_hashes(self):
+        """{ruta de referencia: (dhash, phash)}, con caché compartida en el espacio de trabajo."""
+        if not self.reference_dir or not os.path.isdir(self.reference_dir):
+            return {}
+        cache_path = os.path.join(os.path.dirname(config.META_CACHE_PATH) or ".", self.REFERENCE_CACHE)
+        cache = self._load_json(cache_path)
+        current, missing = {}, []
+        for root, _, files in os.walk(self.reference_dir):
+            for file in files:
+                if not file.lower().endswith(self.IMAGE_EXT):
+                    continue
+                path = os.path.abspath(os.path.join(root, file))
+                st = os.stat(path)
+                entry = cache.get(path)
+                if entry and entry["size"] == st.st_size and entry["mtime_ns"] == st.st_mtime_ns:
+                    current[path] = entry
+                else:
+                    current[path] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "hashes": None}
+                    missing.append(path)
+        if missing:
+            for path, value in self._compute(missing).items():
+                current[path]["hashes"] = [f"{value[0]:016x}", f"{value[1]:016x}"] if value else None
+            os.makedirs(os.path.dirname(cache_path) or ".", exist_ok=True)
+            with open(cache_path, "w", encoding="utf-8") as f:
+                json.dump(current, f)
+        return {path: (int(e["hashes"][0], 16), int(e["hashes"][1], 16)) for path, e in current.items() if e["hashes"]}
+
+    @classmethod
+    def _neighbours(cls, tree, value, radius=None):
+        """Vecinos dentro del radio de dHash confirmados por pHash: [(distancia, item)]."""
+        dhash, phash = value
+        found = []
+        for distance, (item, other_phash) in tree.query(dhash, cls.DHASH_RADIUS if radius is None else radius):
+            if _popcount(phash ^ other_phash) <= cls.PHASH_RADIUS:
+                found.append((distance, item))
+        return sorted(found)
+
+    @staticmethod
+    def _tree(hashes):
+        tree = BKTree()
+        for key, (dhash, phash) in hashes.items():
+            tree.add(dhash, (key, phash))
+        return tree
+
+    def _describe(self, path):
+        return {"filename": os.path.basename(path), "rel_path": os.path.relpath(path, self.report_dir)}
+
+    def run(self):
+        ForensicUtils.log("SIMIL", "INFO", "Iniciando detección de similitud visual (hash perceptual)...")
+        if not self.media_dir or not os.path.exists(self.media_dir):
+            return
+
+        images = self._images()
+        hashes, paths_by_sha = self._case_hashes(images)
+        tree = self._tree(hashes)
+
+        # Clusters: componentes conexas de contenidos distintos dentro del radio
+        parent = {sha: sha for sha in hashes}
+
+        def find(x):
+            while parent[x] != x:
+                parent[x] = parent[parent[x]]
+                x = parent[x]
+            return x
+
+        for sha, value in hashes.items():
+            for _, other in self._neighbours(tree, value):
+                parent[find(other)] = find(sha)
+
+        # Miembros en orden de recorrido (paths_by_sha conserva el orden de 'images')
+        groups = {}
+        for sha in paths_by_sha:
+            if sha in hashes:
+                groups.setdefault(find(sha), []).append(sha)
+        clusters = []
+        for members in groups.values():
+            if len(members) < 2:
+                continue
+            clusters.append({
+                "members": [{"hash": sha, "dhash": f"{hashes[sha][0]:016x}", "phash": f"{hashes[sha][1]:016x}",
+                             "files": [self._describe(p) for p in paths_by_sha[sha]]} for sha in members],
+            })
+        clusters.sort(key=lambda c: -len(c["members"]))
+
+        reference_matches = []
+        references = self._reference_hashes()
+        if references:
+            ref_tree = self._tree(references)
+            for sha, value in hashes.items():
+                for distance, ref in self._neighbours(ref_tree, value):
+                    for path in paths_by_sha[sha]:
+                        reference_matches.append(dict(self._describe(path), hash=sha, reference=os.path.relpath(ref, self.reference_dir),
+                                                      distance=distance))
+
+        output_file = os.path.join(self.report_dir, "Similitud_Visual.json")
+        with open(output_file, "w", encoding="utf-8") as f:
+            json.dump({"clusters": clusters, "reference_matches": reference_matches}, f, indent=4, ensure_ascii=False)
+
+        ForensicUtils.log("SIMIL", "INFO", f"{len(hashes)} imágenes únicas indexadas: {len(clusters)} grupos de imágenes visualmente equivalentes.")
+        if reference_matches:
+            ForensicUtils.log("SIMIL", "SUCCESS", f"¡ALERTA! {len(reference_matches)} coincidencias con el conjunto de referencia.")
+
+    def similar(self, image_path, radius=None):
+        """
+        Imágenes del caso visualmente equivalentes a 'image_path':
+        [(distancia dHash, ruta)] ordenadas por distancia. No modifica el caso.
+        """
+        value = PerceptualHasher.hashes(image_path)
+        if value is None:
+            return []
+        hashes, paths_by_sha = self._case_hashes(self._images(), persist=False)
+        matches = []
+        for distance, sha in self._neighbours(self._tree(hashes), value, radius):
+            matches.extend((distance, path) for path in paths_by_sha[sha])
+        return matches
@@ -2,6 +2,7 @@ import os
 import json
 import datetime
 from src.utils import ForensicUtils
+from src.modules.media_catalog import MediaCatalog
 
 class ReportGenerator:
     """
@@ -13,7 +14,9 @@ class ReportGenerator:
         self.metadata = metadata
         self.report_path = os.path.join(case_folders["report"], "Informe_Forense_Final.html")
 
-    def _generate_html(self, chat_data, findings_data, media_data):
+    MISMATCH_LIMIT = 100    # Archivos renombrados listados en el informe (el resto, en el catálogo)
+
+    def _generate_html(self, chat_data, findings_data, media_data, inventory=None, similarity=None):
         css = """
         @page { size: A4; margin: 2cm; }
         body { font-family: 'Helvetica Neue', Helvetica, Arial, sans-serif; color: #333; line-height: 1.5; font-size: 12px; }
@@ -51,6 +54,7 @@ class ReportGenerator:
         .media-table th { background: #eee; text-align: left; padding: 5px; border-bottom: 2px solid #ddd; }
         .media-table td { padding: 5px; border-bottom: 1px solid #eee; }
         .geo-link { color: white; background: #e74c3c; padding: 2px 5px; text-decoration: none; border-radius: 3px; }
+        .known-bad { color: white; background: #8e1b10; padding: 1px 4px; font-size: 8px; font-weight: bold; border-radius: 3px; }
         
         /* Alerts */
         .alert-box { border: 1px solid #e74c3c; background: #fdedec; padding: 10px; margin-bottom: 5px; border-left: 5px solid #e74c3c; }
@@ -113,12 +117,17 @@ class ReportGenerator:
 
         # --- SECCIÓN 3: EVIDENCIA MULTIMEDIA Y METADATOS ---
         if media_data:
-            html += f"<h2>3. ANÁLISIS DE MULTIMEDIA ({len(media_data)} archivos relevantes)</h2>"
+            # Una fila por contenido (SHA-256): las copias idénticas se listan bajo el primer hallazgo
+            blobs = {}
+            for m in media_data:
+                blobs.setdefault(m['hash'], []).append(m)
+            html += f"<h2>3. ANÁLISIS DE MULTIMEDIA ({len(media_data)} archivos relevantes, {len(blobs)} contenidos únicos)</h2>"
             html += """<table class="media-table">
             <thead><tr><th>Archivo</th><th>Cámara / Origen</th><th>Fecha Original</th><th>Geolocalización</th><th>Integridad (SHA-256)</th></tr></thead>
             <tbody>"""
             
-            for m in media_data:
+            for copies in blobs.values():
+                m = copies[0]
                 gps_block = "N/A"
                 if m['gps']:
                     gps_block = f"<a href='https://maps.google.com/?q={m['gps']}' target='_blank' class='geo-link'>VER MAPA</a><br>{m['gps']}"
@@ -127,9 +136,16 @@ class ReportGenerator:
                 # Ojo: media_extractor guarda en absolute path o relative? Asumimos estructura standard.
                 # Como metadata_analyst guarda 'rel_path' relativo a report_dir, lo usamos directo.
                 
+                copies_block = ""
+                if len(copies) > 1:
+                    links = ", ".join(f"<a href='{c['rel_path']}' target='_blank'>{c['filename']}</a>" for c in copies[1:])
+                    copies_block = f"<br><small>+{len(copies) - 1} copias idénticas: {links}</small>"
+                if m.get('known') == "KNOWN_BAD":
+                    copies_block = " <span class='known-bad'>KNOWN_BAD</span>" + copies_block
+
                 html += f"""
                 <tr>
-                    <td><b><a href="{m['rel_path']}" target="_blank">{m['filename']}</a></b></td>
+                    <td><b><a href="{m['rel_path']}" target="_blank">{m['filename']}</a></b>{copies_block}</td>
                     <td>{m['camera']}</td>
                     <td>{m['date_original']}</td>
                     <td>{gps_block}</td>
@@ -140,6 +156,45 @@ class ReportGenerator:
         else:
             html += "<h2>3. ANÁLISIS DE MULTIMEDIA</h2><p>No se encontraron metadatos relevantes (EXIF/GPS) en los archivos extraídos.</p>"
 
+        # --- SECCIÓN 4: INVENTARIO MULTIMEDIA (catálogo del caso, tipo real por firma) ---
+        if inventory and inventory["types"]:
+            total = sum(t["files"] for t in inventory["types"])
+            html += f"<h2>4. INVENTARIO MULTIMEDIA ({total} archivos)</h2>"
+            html += """<table class="media-table">
+            <thead><tr><th>Tipo real (firma)</th><th>Archivos</th><th>Tamaño (MiB)</th></tr></thead>
+            <tbody>"""
+            for t in inventory["types"]:
+                html += f"<tr><td>{t['type']}</td><td>{t['files']}</td><td>{(t['bytes'] or 0) / (1024 * 1024):.1f}</td></tr>"
+            html += "</tbody></table>"
+
+            mismatched = inventory["mismatched"]
+            if mismatched:
+                html += f"<p><b>{len(mismatched)} archivos con extensión que no corresponde a su contenido:</b></p><ul>"
+                for m in mismatched[:self.MISMATCH_LIMIT]:
+                    html += f"<li><a href='../{m['rel_path']}' target='_blank'>{m['rel_path']}</a> ({m['type']})</li>"
+                if len(mismatched) > self.MISMATCH_LIMIT:
+                    html += f"<li>... y {len(mismatched) - self.MISMATCH_LIMIT} más (ver 02_Logs/{MediaCatalog.FILENAME})</li>"
+                html += "</ul>"
+
+        # --- SECCIÓN 5: SIMILITUD VISUAL (hash perceptual) ---
+        if similarity and (similarity["clusters"] or similarity["reference_matches"]):
+            html += f"<h2>5. SIMILITUD VISUAL ({len(similarity['clusters'])} grupos)</h2>"
+            html += "<p style='font-size: 10px;'>Imágenes de contenido distinto (SHA-256) pero visualmente equivalentes: reenvíos recodificados, redimensionados, recortes o capturas de pantalla.</p>"
+            for n, cluster in enumerate(similarity["clusters"], 1):
+                html += f"<p><b>Grupo {n}</b> ({len(cluster['members'])} variantes)</p><div>"
+                for member in cluster["members"]:
+                    first = member["files"][0]
+                    extra = f" +{len(member['files']) - 1}" if len(member["files"]) > 1 else ""
+                    html += (f"<a href='{first['rel_path']}' target='_blank' title='{first['filename']}{extra}'>"
+                             f"<img src='{first['rel_path']}' class='img-preview'></a> ")
+                html += "</div>"
+            if similarity["reference_matches"]:
+                html += """<p><b>Coincidencias con el conjunto de referencia:</b></p><table class="media-table">
+                <thead><tr><th>Archivo</th><th>Referencia</th><th>Distancia</th></tr></thead><tbody>"""
+                for m in similarity["reference_matches"]:
+                    html += f"<tr><td><a href='{m['rel_path']}' target='_blank'>{m['filename']}</a></td><td>{m['reference']}</td><td>{m['distance']}</td></tr>"
+                html += "</tbody></table>"
+
         # --- FOOTER ---
         html += """
         <div style="margin-top: 50px; border-top: 2px solid #000; padding-top: 10px;">
@@ -173,8 +228,18 @@ class ReportGenerator:
             if os.path.exists(json_meta):
                 with open(json_meta, "r", encoding="utf-8") as f: media_data = json.load(f)
             
+            similarity = None
+            json_simil = os.path.join(self.case_folders["report"], "Similitud_Visual.json")
+            if os.path.exists(json_simil):
+                with open(json_simil, "r", encoding="utf-8") as f: similarity = json.load(f)
+
+            inventory = None
+            catalog = MediaCatalog(self.case_folders)
+            if catalog.exists():
+                inventory = catalog.summary()
+
             # Generar HTML
-            html = self._generate_html(chat_data, findings_data, media_data)
+            html = self._generate_html(chat_data, findings_data, media_data, inventory, similarity)
             
             with open(self.report_path, "w", encoding="utf-8") as f: 
                 f.write(html)
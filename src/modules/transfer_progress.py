@@ -0,0 +1,189 @@
+import os
+import sys
+import json
+import time
+import datetime
+import threading
+from collections import deque
+
+
+class TransferProgress:
+    """
+    Progreso de la transferencia multimedia: archivos y bytes hechos/total,
+    throughput, ETA y tiempos por carpeta.
+    Cualquier front-end puede suscribirse con subscribe(callback); cada evento es un
+    dict con la clave "event" ("start", "file", "tick", "finish") más el estado actual.
+    """
+    TICK = 0.5          # Segundos entre eventos "tick"
+    WINDOW = 5.0        # Ventana (segundos) del throughput instantáneo
+    FILENAME = "transfer_stats.json"
+
+    def __init__(self):
+        self._subscribers = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._ticker = None
+        self.mode = None
+        self.started = None
+        self.finished = None
+        self.files_total = None
+        self.bytes_total = None
+        self.files_done = 0
+        self.bytes_done = 0
+        self.peak_rate = 0.0
+        self.folders = {}
+        self._samples = deque()
+
+    def subscribe(self, callback):
+        self._subscribers.append(callback)
+        return callback
+
+    def _emit(self, event, payload):
+        payload["event"] = event
+        for callback in list(self._subscribers):
+            try:
+                callback(payload)
+            except Exception:
+                # Un front-end defectuoso no debe interrumpir la adquisición
+                pass
+
+    def start(self, mode, files_total=None, bytes_total=None):
+        self.mode = mode
+        self.started = time.monotonic()
+        self.files_total = files_total
+        self.bytes_total = bytes_total
+        self._samples.append((self.started, 0))
+        self._emit("start", self.snapshot())
+        self._stop.clear()
+        self._ticker = threading.Thread(target=self._tick_loop, daemon=True)
+        self._ticker.start()
+
+    def set_total(self, files_total, bytes_total):
+        """Totales conocidos tras planificar (ej. inventario remoto del modo sync)."""
+        with self._lock:
+            self.files_total = self.files_done + files_total
+            self.bytes_total = self.bytes_done + bytes_total
+
+    def file_done(self, folder, size):
+        """Un archivo terminó de escribirse en el caso."""
+        now = time.monotonic()
+        with self._lock:
+            self.files_done += 1
+            self.bytes_done += size
+            self._samples.append((now, self.bytes_done))
+            stats = self.folders.setdefault(folder, {"files": 0, "bytes": 0, "first": now, "last": now})
+            stats["files"] += 1
+            stats["bytes"] += size
+            stats["last"] = now
+            payload = {"folder": folder, "size": size, "files_done": self.files_done, "bytes_done": self.bytes_done}
+        self._emit("file", payload)
+
+    def folder_done(self, folder, files, size, seconds):
+        """Carpeta copiada en bloque (modos 'adb pull', sin eventos por archivo)."""
+        now = time.monotonic()
+        with self._lock:
+            self.files_done += files
+            self.bytes_done += size
+            self._samples.append((now, self.bytes_done))
+            stats = self.folders.setdefault(folder, {"files": 0, "bytes": 0, "first": now - seconds, "last": now})
+            stats["files"] += files
+            stats["bytes"] += size
+            stats["last"] = now
+
+    def _rate(self, now):
+        """Throughput instantáneo sobre la ventana WINDOW (bytes/s)."""
+        while len(self._samples) > 2 and now - self._samples[1][0] > self.WINDOW:
+            self._samples.popleft()
+        (t0, b0), (t1, b1) = self._samples[0], self._samples[-1]
+        if now - t0 <= 0:
+            return 0.0
+        # El tramo sin datos desde el último archivo también cuenta (enlace detenido)
+        return (b1 - b0) / (now - t0)
+
+    def snapshot(self):
+        now = (self.finished or time.monotonic()) if self.started else None
+        with self._lock:
+            elapsed = now - self.started if self.started else 0.0
+            rate = self._rate(now) if self.started and not self.finished else 0.0
+            self.peak_rate = max(self.peak_rate, rate)
+            average = self.bytes_done / elapsed if elapsed > 0 else 0.0
+            eta = None
+            if self.bytes_total is not None and rate > 0:
+                eta = max(self.bytes_total - self.bytes_done, 0) / rate
+            folders = {}
+            for name, stats in sorted(self.folders.items()):
+                seconds = stats["last"] - stats["first"]
+                folders[name] = {"files": stats["files"], "bytes": stats["bytes"], "seconds": round(seconds, 3),
+                                 "rate": round(stats["bytes"] / seconds, 1) if seconds > 0 else None}
+            return {
+                "mode": self.mode,
+                "files_done": self.files_done,
+                "files_total": self.files_total,
+                "bytes_done": self.bytes_done,
+                "bytes_total": self.bytes_total,
+                "elapsed": round(elapsed, 3),
+                "rate": round(rate, 1),
+                "avg_rate": round(average, 1),
+                "peak_rate": round(self.peak_rate, 1),
+                "eta": round(eta, 1) if eta is not None else None,
+                "folders": folders,
+            }
+
+    def _tick_loop(self):
+        while not self._stop.wait(self.TICK):
+            self._emit("tick", self.snapshot())
+
+    def finish(self):
+        """Detiene el ticker y emite el estado final."""
+        self._stop.set()
+        if self._ticker and self._ticker.is_alive():
+            self._ticker.join()
+        if self.started and self.finished is None:
+            self.finished = time.monotonic()
+        snapshot = self.snapshot()
+        self._emit("finish", dict(snapshot))
+        return snapshot
+
+    def save(self, logs_dir, **extra):
+        """Resumen para diagnóstico (dispositivos o cables lentos) en 02_Logs/transfer_stats.json."""
+        summary = dict(self.snapshot(), **extra)
+        summary.pop("rate", None)
+        summary.pop("eta", None)
+        summary["saved_at"] = datetime.datetime.now().isoformat()
+        path = os.path.join(logs_dir, self.FILENAME)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=4, ensure_ascii=False)
+        return path
+
+    @staticmethod
+    def format(state):
+        """Línea de estado legible: '120/930 archivos | 45.2/812.0 MiB | 12.3 MiB/s | ETA 01:02'."""
+        mib = 1024 * 1024
+        files = f"{state['files_done']}/{state['files_total']}" if state["files_total"] is not None else str(state["files_done"])
+        size = f"{state['bytes_done'] / mib:.1f}"
+        if state["bytes_total"] is not None:
+            size += f"/{state['bytes_total'] / mib:.1f}"
+        parts = [f"{files} archivos", f"{size} MiB", f"{state['rate'] / mib:.1f} MiB/s"]
+        if state["eta"] is not None:
+            parts.append("ETA " + time.strftime("%M:%S" if state["eta"] < 3600 else "%H:%M:%S", time.gmtime(state["eta"])))
+        parts.append(time.strftime("%M:%S" if state["elapsed"] < 3600 else "%H:%M:%S", time.gmtime(state["elapsed"])))
+        return " | ".join(parts)
+
+
+class ConsoleProgress:
+    """Suscriptor de consola: una línea de estado que se reescribe en cada tick."""
+
+    def __init__(self, label="Extrayendo multimedia"):
+        self.label = label
+        self._width = 0
+
+    def __call__(self, event):
+        if event["event"] == "tick":
+            line = f"[*] {self.label}: {TransferProgress.format(event)}"
+            sys.stdout.write("\r" + line.ljust(self._width))
+            sys.stdout.flush()
+            self._width = max(self._width, len(line))
+        elif event["event"] == "finish" and self._width:
+            sys.stdout.write("\r" + " " * self._width + "\r")
+            sys.stdout.flush()
+            self._width = 0
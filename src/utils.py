@@ -4,7 +4,10 @@ import os
 import json
 import socket
 import struct
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from colorama import init, Fore, Style
+from src.modules.known_hashes import KnownHashes
 
 # Inicializar colorama para logs en consola
 init(autoreset=True)
@@ -14,6 +17,12 @@ class ForensicUtils:
     SISTEMA DE PRESERVACIÓN DIGITAL (ISO 27037).
     Maneja integridad criptográfica, validación temporal y auditoría.
     """
+
+    HASH_BUFFER = 1024 * 1024   # Buffer de lectura para hashing (1 MiB)
+    MERKLE_FILE = "manifest_merkle.json"
+    KNOWN_FILE = "known_hashes.json"
+    # El resumen ejecutivo cita el hash del manifiesto: se escribe después y queda fuera del árbol
+    SUMMARY_FILE = os.path.join("03_Report", "Resumen_Ejecutivo.txt")
     
     @staticmethod
     def banner():
@@ -52,32 +61,337 @@ class ForensicUtils:
     @staticmethod
     def calculate_hash(file_path):
         """Calcula el SHA-256 de un archivo para garantizar su inalterabilidad."""
-        sha256 = hashlib.sha256()
-        with open(file_path, "rb") as f:
-            for chunk in iter(lambda: f.read(4096), b""):
-                sha256.update(chunk)
-        return sha256.hexdigest()
+        return ForensicUtils.calculate_hashes(file_path)["sha256"]
+
+    @staticmethod
+    def calculate_hashes(file_path, algorithms=("sha256",)):
+        """
+        Calcula varios digests (ej. SHA-256 + MD5/SHA-1 para sistemas judiciales
+        heredados) en una única lectura del archivo con buffer grande.
+        """
+        hashers = [hashlib.new(algo) for algo in algorithms]
+        buf = bytearray(ForensicUtils.HASH_BUFFER)
+        view = memoryview(buf)
+        with open(file_path, "rb", buffering=0) as f:
+            while True:
+                n = f.readinto(buf)
+                if not n:
+                    break
+                for h in hashers:
+                    h.update(view[:n])
+        return {algo: h.hexdigest() for algo, h in zip(algorithms, hashers)}
 
     @staticmethod
-    def generate_manifest(case_path):
-        """Crea el manifiesto final con los hashes de todos los archivos del caso."""
+    def hash_files(paths, algorithms=("sha256",), workers=None):
+        """
+        Hashea una lista de archivos en paralelo (hashlib libera el GIL).
+        Devuelve {ruta: {algoritmo: hex}} en el mismo orden de entrada.
+        """
+        paths = list(paths)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            digests = pool.map(lambda p: ForensicUtils.calculate_hashes(p, algorithms), paths)
+            return dict(zip(paths, digests))
+
+    @staticmethod
+    def generate_manifest(case_path, algorithms=("sha256",), workers=None):
+        """
+        Crea el manifiesto final con los hashes de todos los archivos del caso.
+        Con sólo SHA-256 cada entrada es el hex; con varios algoritmos, un diccionario.
+        Sólo se leen los archivos nuevos o modificados según la caché de hashes del caso.
+        """
+        cache = HashCache.for_case(os.path.join(case_path, "02_Logs"))
+        paths = ForensicUtils._case_files(case_path)
+
         manifest = {}
-        for root, _, files in os.walk(case_path):
-            for file in files:
-                if file == "manifest.json": continue
-                full_path = os.path.join(root, file)
-                rel_path = os.path.relpath(full_path, case_path)
-                manifest[rel_path] = ForensicUtils.calculate_hash(full_path)
+        hashed = cache.hash_files(paths, algorithms, workers)
+        cache.save()
+        for full_path, digests in hashed.items():
+            rel_path = os.path.relpath(full_path, case_path)
+            manifest[rel_path] = digests["sha256"] if tuple(algorithms) == ("sha256",) else digests
         
         # El manifiesto se guarda en la carpeta de Logs
         manifest_path = os.path.join(case_path, "02_Logs/manifest.json")
         with open(manifest_path, "w") as f:
             json.dump(manifest, f, indent=4)
+
+        # Árbol Merkle: hash por directorio consolidado en una raíz única
+        file_hashes = {os.path.relpath(p, case_path).replace(os.sep, "/"): d["sha256"] for p, d in hashed.items()}
+        tree = ForensicUtils.build_merkle(file_hashes)
+        with open(os.path.join(case_path, "02_Logs", ForensicUtils.MERKLE_FILE), "w") as f:
+            json.dump({"algorithm": "sha256", "root": tree[""]["hash"], "tree": tree}, f, indent=4)
+
+        # Listas de hashes conocidos: etiquetado de todo el caso (no sólo multimedia)
+        try:
+            known = KnownHashes.from_config()
+        except (OSError, ValueError) as e:
+            ForensicUtils.log("INTEGRITY", "WARNING", f"Listas de hashes conocidos no disponibles ({e}).")
+            known = None
+        if known and known.active:
+            tagged = {KnownHashes.KNOWN_BAD: [], KnownHashes.KNOWN_GOOD: []}
+            for rel_path, digest in sorted(file_hashes.items()):
+                label = known.tag(digest)
+                if label:
+                    tagged[label].append(rel_path)
+            with open(os.path.join(case_path, "02_Logs", ForensicUtils.KNOWN_FILE), "w") as f:
+                json.dump(dict(sets=known.describe(), **tagged), f, indent=4)
+            if tagged[KnownHashes.KNOWN_BAD]:
+                ForensicUtils.log("INTEGRITY", "WARNING", f"¡ALERTA! {len(tagged[KnownHashes.KNOWN_BAD])} archivos del caso figuran en la lista KNOWN_BAD.")
+            ForensicUtils.log("INTEGRITY", "INFO", f"Hashes conocidos: {len(tagged[KnownHashes.KNOWN_BAD])} KNOWN_BAD, {len(tagged[KnownHashes.KNOWN_GOOD])} KNOWN_GOOD. Detalle en {ForensicUtils.KNOWN_FILE}")
         return manifest_path
 
+    @staticmethod
+    def _case_files(case_path, subtree=""):
+        """Archivos del caso (o de un subárbol) excluyendo los artefactos de cierre."""
+        excluded = ("manifest.json", ForensicUtils.MERKLE_FILE, ForensicUtils.KNOWN_FILE, HashCache.FILENAME, HashCache.FILENAME + ".tmp")
+        summary = os.path.normpath(os.path.join(case_path, ForensicUtils.SUMMARY_FILE))
+        paths = []
+        for root, _, files in os.walk(os.path.join(case_path, subtree)):
+            for file in files:
+                if file in excluded: continue
+                path = os.path.join(root, file)
+                if os.path.normpath(path) == summary: continue
+                paths.append(path)
+        return paths
+
+    @staticmethod
+    def _merkle_node_hash(files, dir_hashes):
+        """Hash de un directorio: entradas ordenadas 'tipo\tnombre\thash'."""
+        entries = [("F", name, digest) for name, digest in files.items()]
+        entries += [("D", name, digest) for name, digest in dir_hashes.items()]
+        h = hashlib.sha256()
+        for kind, name, digest in sorted(entries, key=lambda e: (e[1], e[0])):
+            h.update(f"{kind}\t{name}\t{digest}\n".encode("utf-8"))
+        return h.hexdigest()
+
+    @staticmethod
+    def build_merkle(file_hashes):
+        """
+        Construye el árbol Merkle a partir de {ruta_relativa: sha256} (separador '/').
+        Devuelve {directorio: {"hash", "files", "dirs"}}; la raíz es la clave "".
+        """
+        tree = {"": {"files": {}, "dirs": []}}
+
+        def ensure(path):
+            if path in tree:
+                return
+            parent, _, name = path.rpartition("/")
+            ensure(parent)
+            tree[path] = {"files": {}, "dirs": []}
+            tree[parent]["dirs"].append(name)
+
+        for rel_path, digest in file_hashes.items():
+            parent, _, name = rel_path.rpartition("/")
+            ensure(parent)
+            tree[parent]["files"][name] = digest
+
+        # De las hojas hacia la raíz
+        for path in sorted(tree, key=lambda p: p.count("/") + bool(p), reverse=True):
+            node = tree[path]
+            node["dirs"].sort()
+            child_hashes = {n: tree[f"{path}/{n}" if path else n]["hash"] for n in node["dirs"]}
+            node["hash"] = ForensicUtils._merkle_node_hash(node["files"], child_hashes)
+        return tree
+
+    @staticmethod
+    def load_merkle(case_path):
+        with open(os.path.join(case_path, "02_Logs", ForensicUtils.MERKLE_FILE), "r") as f:
+            return json.load(f)
+
+    @staticmethod
+    def verify_manifest(case_path, subtree="", workers=None):
+        """
+        Verifica el caso (o sólo un subárbol, ej. '04_Media/WhatsApp Images') contra
+        el manifiesto Merkle. Rehashea en paralelo sin usar la caché y desciende sólo
+        por los directorios cuyo hash difiere para señalar los archivos alterados.
+        """
+        merkle = ForensicUtils.load_merkle(case_path)
+        stored = merkle["tree"]
+        subtree = subtree.replace(os.sep, "/").strip("/")
+        if subtree == ".":
+            subtree = ""
+
+        def child(path, name):
+            return f"{path}/{name}" if path else name
+
+        # 1. Coherencia del árbol almacenado: cada nodo debe derivar de sus hijos hasta la raíz
+        chain_ok = merkle["root"] == stored.get("", {}).get("hash")
+        for path, node in stored.items():
+            # Un nodo ausente (manifiesto truncado o adulterado) rompe la cadena
+            children = [stored.get(child(path, n)) for n in node["dirs"]]
+            if None in children:
+                chain_ok = False
+                continue
+            child_hashes = {n: c["hash"] for n, c in zip(node["dirs"], children)}
+            if ForensicUtils._merkle_node_hash(node["files"], child_hashes) != node["hash"]:
+                chain_ok = False
+
+        # 2. Estado actual del subárbol (rehash completo, sin caché)
+        actual_hashes = {}
+        for full_path, digests in ForensicUtils.hash_files(ForensicUtils._case_files(case_path, subtree), workers=workers).items():
+            actual_hashes[os.path.relpath(full_path, case_path).replace(os.sep, "/")] = digests["sha256"]
+        actual = ForensicUtils.build_merkle(actual_hashes)
+
+        result = {"ok": False, "root": merkle["root"], "subtree": subtree or "/", "chain_ok": chain_ok,
+                  "files_checked": len(actual_hashes), "modified": [], "missing": [], "added": [], "dirs_mismatch": []}
+
+        def all_files(tree, path):
+            node = tree.get(path)
+            if node is None:
+                return []
+            files = [child(path, n) for n in node["files"]]
+            for d in node["dirs"]:
+                files += all_files(tree, child(path, d))
+            return files
+
+        # 3. Descenso sólo por los nodos que difieren
+        def compare(path):
+            exp, got = stored.get(path), actual.get(path)
+            if exp is None and got is None:
+                return
+            if exp is None:
+                result["added"] += all_files(actual, path)
+                return
+            if got is None:
+                result["missing"] += all_files(stored, path)
+                return
+            if exp["hash"] == got["hash"]:
+                return
+            result["dirs_mismatch"].append(path or "/")
+            for name in sorted(set(exp["files"]) | set(got["files"])):
+                if name not in got["files"]:
+                    result["missing"].append(child(path, name))
+                elif name not in exp["files"]:
+                    result["added"].append(child(path, name))
+                elif exp["files"][name] != got["files"][name]:
+                    result["modified"].append(child(path, name))
+            for name in sorted(set(exp["dirs"]) | set(got["dirs"])):
+                compare(child(path, name))
+
+        if subtree not in stored and subtree not in actual:
+            result["error"] = f"El subárbol '{subtree}' no existe en el manifiesto ni en disco"
+            return result
+
+        compare(subtree)
+        result["ok"] = chain_ok and not (result["modified"] or result["missing"] or result["added"])
+        return result
+
     @staticmethod
     def log(component, status, message):
         """Muestra mensajes formateados en la consola del perito."""
         colors = {"SUCCESS": Fore.GREEN, "ERROR": Fore.RED, "WARNING": Fore.YELLOW, "INFO": Fore.BLUE}
         color = colors.get(status, Fore.WHITE)
-        print(f"{color}[{component}] {status}: {message}")
\ No newline at end of file
+        print(f"{color}[{component}] {status}: {message}")
+
+class HashCache:
+    """
+    Caché persistente de hashes del caso (02_Logs/hash_cache.json).
+    Cada entrada es válida mientras coincidan tamaño, mtime_ns e inodo del archivo,
+    de modo que cada byte del caso se lee una sola vez entre etapas. Las entradas son
+    siempre por ruta: los enlaces al almacén de contenido se registran al publicarse
+    con el SHA-256 ya verificado del blob, nunca por coincidencia de inodo.
+    La verificación de integridad posterior debe rehashear sin consultar esta caché.
+    """
+    FILENAME = "hash_cache.json"
+    _instances = {}
+    _instances_lock = threading.Lock()
+
+    @classmethod
+    def for_case(cls, logs_dir):
+        """Instancia compartida por todas las etapas que operan sobre el mismo caso."""
+        cache_path = os.path.abspath(os.path.join(logs_dir, cls.FILENAME))
+        with cls._instances_lock:
+            if cache_path not in cls._instances:
+                cls._instances[cache_path] = cls(cache_path)
+            return cls._instances[cache_path]
+
+    def __init__(self, cache_path):
+        self.cache_path = cache_path
+        self.base_dir = os.path.dirname(os.path.dirname(cache_path))
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._dirty = False
+        if os.path.exists(cache_path):
+            try:
+                with open(cache_path, "r", encoding="utf-8") as f:
+                    self._entries = json.load(f).get("entries", {})
+            except (OSError, ValueError):
+                self._entries = {}
+
+    def _key(self, path):
+        return os.path.relpath(os.path.abspath(path), self.base_dir)
+
+    @staticmethod
+    def _signature(st):
+        return {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "inode": st.st_ino}
+
+    def get(self, path, algorithms=("sha256",)):
+        """Devuelve {algoritmo: hex} si el archivo no cambió desde que se hasheó, o None."""
+        try:
+            sig = self._signature(os.stat(path))
+        except OSError:
+            return None
+        with self._lock:
+            entry = self._entries.get(self._key(path))
+        if not entry or any(entry.get(k) != v for k, v in sig.items()):
+            return None
+        digests = entry.get("digests", {})
+        if not all(algo in digests for algo in algorithms):
+            return None
+        return {algo: digests[algo] for algo in algorithms}
+
+    def record(self, path, digests, st=None):
+        """
+        Registra digests ya calculados (ej. hash-on-write). 'st' es el stat tomado
+        antes de leer el archivo: si cambió durante el hashing, la entrada no validará.
+        """
+        sig = self._signature(st or os.stat(path))
+        key = self._key(path)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and all(entry.get(k) == v for k, v in sig.items()):
+                entry["digests"].update(digests)
+            else:
+                self._entries[key] = dict(sig, digests=dict(digests))
+            self._dirty = True
+
+    def hash_file(self, path, algorithms=("sha256",)):
+        cached = self.get(path, algorithms)
+        if cached is not None:
+            return cached
+        st = os.stat(path)
+        digests = ForensicUtils.calculate_hashes(path, algorithms)
+        self.record(path, digests, st)
+        return digests
+
+    def sha256(self, path):
+        return self.hash_file(path)["sha256"]
+
+    def hash_files(self, paths, algorithms=("sha256",), workers=None):
+        """Como ForensicUtils.hash_files, pero sólo lee archivos nuevos o modificados."""
+        paths = list(paths)
+        results = {}
+        misses = {}
+        for path in paths:
+            cached = self.get(path, algorithms)
+            if cached is not None:
+                results[path] = cached
+            else:
+                misses[path] = os.stat(path)
+
+        if misses:
+            for path, digests in ForensicUtils.hash_files(misses, algorithms, workers).items():
+                self.record(path, digests, misses[path])
+                results[path] = digests
+        return {path: results[path] for path in paths}
+
+    def save(self):
+        """Persiste la caché de forma atómica (sólo si hubo cambios)."""
+        with self._lock:
+            if not self._dirty:
+                return
+            data = {"version": 1, "entries": dict(self._entries)}
+            self._dirty = False
+        tmp_path = self.cache_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, self.cache_path)
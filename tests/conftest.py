@@ -0,0 +1,7 @@
+import os
+import sys
+
+# Los módulos se importan como 'src.*' y 'main' desde la raíz del repositorio
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Utilidades de prueba (servidor ADB simulado) importables desde los tests
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
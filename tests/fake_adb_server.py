@@ -0,0 +1,159 @@
+"""
+Servidor ADB de prueba en proceso: habla el protocolo de host (TCP) frente a un
+dispositivo simulado con un sistema de archivos en memoria y respuestas de shell fijas.
+"""
+import stat
+import struct
+import socketserver
+import threading
+
+
+def _recv_exact(sock, size):
+    buf = b""
+    while len(buf) < size:
+        chunk = sock.recv(size - len(buf))
+        if not chunk:
+            raise EOFError
+        buf += chunk
+    return buf
+
+
+class FakeDevice:
+    def __init__(self, serial="FAKE123", files=None, dirs=(), shell=None, shell_v2=True, chunk=64 * 1024):
+        self.serial = serial
+        self.files = dict(files or {})          # {ruta: bytes}
+        self.dirs = set(dirs)
+        self.shell = dict(shell or {})          # {comando: (rc, stdout, stderr)}
+        self.shell_v2 = shell_v2
+        self.chunk = chunk
+        self.mtime = 1700000000
+
+
+class _Handler(socketserver.BaseRequestHandler):
+
+    def _okay(self):
+        self.request.sendall(b"OKAY")
+
+    def _fail(self, message):
+        data = message.encode()
+        self.request.sendall(b"FAIL" + b"%04x" % len(data) + data)
+
+    def _read_request(self):
+        length = int(_recv_exact(self.request, 4), 16)
+        return _recv_exact(self.request, length).decode()
+
+    def handle(self):
+        server, device = self.server, self.server.device
+        try:
+            request = self._read_request()
+            server.requests.append(request)
+            if request == "host:devices":
+                data = f"{device.serial}\tdevice\n".encode()
+                self._okay()
+                self.request.sendall(b"%04x" % len(data) + data)
+                return
+            if request not in ("host:transport-any", f"host:transport:{device.serial}"):
+                return self._fail(f"device '{request.rsplit(':', 1)[-1]}' not found")
+            self._okay()
+
+            service = self._read_request()
+            server.requests.append(service)
+            if service.startswith("shell,v2,raw:"):
+                if not device.shell_v2:
+                    return self._fail("closed")
+                self._okay()
+                self._shell_v2(service[len("shell,v2,raw:"):])
+            elif service.startswith(("shell:", "exec:")):
+                self._okay()
+                self.request.sendall(device.shell.get(service.split(":", 1)[1], (0, b"", b""))[1])
+            elif service == "sync:":
+                self._okay()
+                self._sync()
+            else:
+                self._fail(f"unknown service {service}")
+        except (EOFError, ConnectionError):
+            pass
+
+    def _shell_v2(self, command):
+        rc, out, err = self.server.device.shell.get(command, (127, b"", b"sh: not found\n"))
+        # Salida partida en varios paquetes e intercalada con stderr, como en un dispositivo real
+        for offset in range(0, max(len(out), len(err)), 7):
+            for packet_id, data in ((1, out[offset:offset + 7]), (2, err[offset:offset + 7])):
+                if data:
+                    self.request.sendall(struct.pack("<BI", packet_id, len(data)) + data)
+        self.request.sendall(struct.pack("<BI", 3, 1) + bytes([rc]))
+
+    def _stat(self, path):
+        device = self.server.device
+        if path in device.files:
+            return stat.S_IFREG | 0o644, len(device.files[path]), device.mtime
+        if path in device.dirs:
+            return stat.S_IFDIR | 0o755, 4096, device.mtime
+        return 0, 0, 0
+
+    def _sync(self):
+        sock, device = self.request, self.server.device
+        while True:
+            cmd = _recv_exact(sock, 4)
+            length = struct.unpack("<I", _recv_exact(sock, 4))[0]
+            if cmd == b"QUIT":
+                return
+            arg = _recv_exact(sock, length).decode()
+            self.server.sync_commands.append(cmd.decode())
+            if cmd == b"STAT":
+                sock.sendall(b"STAT" + struct.pack("<III", *self._stat(arg)))
+            elif cmd == b"LIST":
+                prefix = arg.rstrip("/") + "/"
+                names = {p[len(prefix):].split("/", 1)[0] for p in list(device.files) + list(device.dirs) if p.startswith(prefix)}
+                for name in [".", ".."] + sorted(names):
+                    mode, size, mtime = self._stat(prefix + name) if name not in (".", "..") else (stat.S_IFDIR | 0o755, 4096, 0)
+                    raw = name.encode()
+                    sock.sendall(b"DENT" + struct.pack("<IIII", mode, size, mtime, len(raw)) + raw)
+                sock.sendall(b"DONE" + b"\x00" * 16)
+            elif cmd == b"RECV":
+                if arg not in device.files:
+                    message = b"No such file or directory"
+                    sock.sendall(b"FAIL" + struct.pack("<I", len(message)) + message)
+                    continue
+                data = device.files[arg]
+                for offset in range(0, len(data), device.chunk):
+                    chunk = data[offset:offset + device.chunk]
+                    sock.sendall(b"DATA" + struct.pack("<I", len(chunk)) + chunk)
+                    self.server.data_packets += 1
+                sock.sendall(b"DONE" + b"\x00" * 4)
+            elif cmd == b"SEND":
+                path = arg.rsplit(",", 1)[0]
+                received = b""
+                while True:
+                    packet = _recv_exact(sock, 4)
+                    value = struct.unpack("<I", _recv_exact(sock, 4))[0]
+                    if packet == b"DONE":
+                        break
+                    received += _recv_exact(sock, value)
+                device.files[path] = received
+                sock.sendall(b"OKAY" + b"\x00" * 4)
+
+
+class FakeADBServer(socketserver.ThreadingTCPServer):
+    """Uso: 'with FakeADBServer(FakeDevice(...)) as server:' -> server.port."""
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, device):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.device = device
+        self.requests = []
+        self.sync_commands = []
+        self.data_packets = 0
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def __enter__(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+        self.server_close()
@@ -0,0 +1,71 @@
+"""
+Dispositivo simulado sobre el sistema de archivos local: 'shell' y 'exec-out' se
+ejecutan con sh (find, stat y tar del equipo), y 'push'/'pull' copian archivos.
+Permite reproducir entregas incompletas del stream tar y cortes del canal.
+"""
+import os
+import shutil
+import subprocess
+from contextlib import contextmanager
+from src.modules.adb_manager import SubprocessBackend
+
+
+class LocalDevice:
+    serial = "LOCAL"
+
+    def __init__(self, withheld=None, cut=None, tar=True):
+        # {nombre de archivo: veces que tar lo omite en silencio (None = siempre)}
+        self.withheld = dict(withheld or {})
+        self.unpullable = set()     # nombres que 'adb pull' tampoco puede leer
+        self.cut = cut              # bytes tras los que se corta el stream (sin error)
+        self.tar = tar
+        self.streams = 0
+        self.pulls = []
+        self.backend = SubprocessBackend(self)
+
+    def _adb(self, *args):
+        command = args[-1]
+        if self.cut is not None:
+            command = f"({command}) | head -c {self.cut}"
+        return ["sh", "-c", command]
+
+    @staticmethod
+    def _done(args, returncode=0, stdout=""):
+        return subprocess.CompletedProcess(list(args), returncode, stdout, "")
+
+    def shell(self, command, timeout=None, check=False):
+        if command == "command -v tar" and not self.tar:
+            return self._done([command], 1)
+        return subprocess.run(["sh", "-c", command], capture_output=True, text=True, timeout=timeout)
+
+    def run(self, *args, timeout=None, check=False):
+        return self._done(args)
+
+    def push(self, local_path, remote_path, timeout=None, check=False):
+        # La lista de miembros llega a tar sin los archivos que éste no podrá leer
+        with open(local_path, encoding="utf-8") as f:
+            members = f.read().splitlines()
+        kept = []
+        for member in members:
+            name = os.path.basename(member)
+            if name in self.withheld and self.withheld[name] != 0:
+                if self.withheld[name] is not None:
+                    self.withheld[name] -= 1
+                continue
+            kept.append(member)
+        with open(remote_path, "w", encoding="utf-8") as f:
+            f.write("\n".join(kept) + "\n")
+        return self._done(["push", local_path, remote_path])
+
+    def pull(self, remote_path, local_path, timeout=None, check=False):
+        self.pulls.append(remote_path)
+        if os.path.basename(remote_path) in self.unpullable:
+            return self._done(["pull", remote_path, local_path], 1)
+        shutil.copyfile(remote_path, local_path)
+        return self._done(["pull", remote_path, local_path])
+
+    @contextmanager
+    def stream(self, *args, timeout=None):
+        self.streams += 1
+        with self.backend.stream(list(args), timeout=timeout) as out:
+            yield out
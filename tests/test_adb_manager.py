@@ -0,0 +1,51 @@
+import subprocess
+from src.modules.adb_manager import ADBManager
+
+PROPS = "[ro.build.version.sdk]: [30]\n[ro.product.model]: [Pixel 4]\n"
+
+
+class ScriptedBackend:
+    """Responde al script del snapshot con la salida indicada y registra cada comando."""
+
+    def __init__(self, snapshot_output, probe_outputs=None):
+        self.snapshot_output = snapshot_output
+        self.probe_outputs = probe_outputs or {}
+        self.commands = []
+
+    async def arun(self, args, timeout=None):
+        command = args[-1]
+        self.commands.append(command)
+        if command.startswith("probe()"):
+            return subprocess.CompletedProcess(args, 0, self.snapshot_output, "")
+        for needle, output in self.probe_outputs.items():
+            if needle in command:
+                return subprocess.CompletedProcess(args, 0, output, "")
+        return subprocess.CompletedProcess(args, 0, "", "")
+
+
+def manager_with(backend, serial):
+    manager = ADBManager(serial=serial)
+    manager.backend = backend
+    return manager
+
+
+def test_snapshot_with_isolated_probes_is_a_single_round_trip():
+    mark = ADBManager.SNAPSHOT_MARK
+    output = (f"{mark}props\n{PROPS}{mark}battery\n  level: 87\n"
+              f"{mark}whatsapp\n    versionName=2.24.1.6\n{mark}imei\n{mark}root\nuid=0(root) gid=0(root)\n{mark}end\n")
+    backend = ScriptedBackend(output)
+    snapshot = manager_with(backend, "SNAP1").get_snapshot(refresh=True)
+    assert len(backend.commands) == 1
+    assert (snapshot["sdk"], snapshot["battery_level"], snapshot["rooted"]) == (30, "87", True)
+    assert snapshot["whatsapp_version"] == "2.24.1.6"
+    assert snapshot["imei_raw"] == "RESTRICTED/UNAVAILABLE"
+
+
+def test_isolated_probes_fall_back_when_device_lacks_timeout():
+    mark = ADBManager.SNAPSHOT_MARK
+    backend = ScriptedBackend(f"{mark}props\n{PROPS}{mark}end\n",
+                              {"com.whatsapp": "versionName=2.23.9\n", "su -c": "uid=2000(shell)\n"})
+    snapshot = manager_with(backend, "SNAP2").get_snapshot(refresh=True)
+    assert len(backend.commands) == 1 + len(ADBManager.ISOLATED_PROBES)
+    assert snapshot["whatsapp_version"] == "2.23.9"
+    assert snapshot["rooted"] is False
@@ -0,0 +1,88 @@
+import os
+import pytest
+from src.modules.adb_protocol import ADBSocketClient, ADBProtocolError
+from fake_adb_server import FakeADBServer, FakeDevice
+
+
+def client_for(server, serial="FAKE123"):
+    return ADBSocketClient(serial=serial, port=server.port, timeout=5)
+
+
+def test_devices_and_transport_okay():
+    with FakeADBServer(FakeDevice(shell={"getprop ro.product.model": (0, b"Pixel 7\n", b"")})) as server:
+        client = client_for(server)
+        assert client.devices() == [("FAKE123", "device")]
+        assert client.shell("getprop ro.product.model") == (0, b"Pixel 7\n", b"")
+        assert "host:transport:FAKE123" in server.requests
+
+
+def test_transport_fail_raises_with_server_message():
+    with FakeADBServer(FakeDevice()) as server:
+        with pytest.raises(ADBProtocolError, match="device 'OTRO' not found"):
+            client_for(server, serial="OTRO").shell("id")
+
+
+def test_shell_v2_demuxes_streams_and_exit_code():
+    out, err = b"linea de salida larga\n" * 3, b"aviso en stderr\n"
+    with FakeADBServer(FakeDevice(shell={"cmd": (3, out, err)})) as server:
+        assert client_for(server).shell("cmd") == (3, out, err)
+
+
+def test_shell_falls_back_to_classic_service():
+    with FakeADBServer(FakeDevice(shell={"id": (0, b"uid=2000(shell)\n", b"")}, shell_v2=False)) as server:
+        client = client_for(server)
+        assert client.shell("id") == (0, b"uid=2000(shell)\n", b"")
+        assert client._shell_v2 is False
+        client.shell("id")
+        assert server.requests.count("shell,v2,raw:id") == 1
+
+
+def test_recv_multi_chunk_file(tmp_path):
+    payload = os.urandom(200 * 1024 + 17)
+    device = FakeDevice(files={"/sdcard/DCIM/video.mp4": payload}, dirs={"/sdcard/DCIM"})
+    with FakeADBServer(device) as server:
+        client = client_for(server)
+        files, size = client.pull("/sdcard/DCIM/video.mp4", str(tmp_path))
+        assert (files, size) == (1, len(payload))
+        assert (tmp_path / "video.mp4").read_bytes() == payload
+        assert server.data_packets == 4
+
+
+def test_pull_tree_reuses_sync_session(tmp_path):
+    device = FakeDevice(files={"/sdcard/Media/a.jpg": b"a" * 10, "/sdcard/Media/sub/b.jpg": b"b" * 20},
+                        dirs={"/sdcard/Media", "/sdcard/Media/sub"})
+    with FakeADBServer(device) as server:
+        client = client_for(server)
+        assert client.pull("/sdcard/Media", str(tmp_path)) == (2, 30)
+        assert (tmp_path / "Media" / "sub" / "b.jpg").read_bytes() == b"b" * 20
+        client.pull("/sdcard/Media/a.jpg", str(tmp_path / "copia.jpg"))
+        assert server.requests.count("sync:") == 1
+        client.close()
+
+
+def test_pull_missing_file_fails(tmp_path):
+    with FakeADBServer(FakeDevice()) as server:
+        with pytest.raises(ADBProtocolError, match="does not exist"):
+            client_for(server).pull("/sdcard/nada.jpg", str(tmp_path))
+
+
+def test_push_roundtrip(tmp_path):
+    local = tmp_path / "lista.txt"
+    local.write_bytes(b"a.jpg\nb.jpg\n")
+    device = FakeDevice()
+    with FakeADBServer(device) as server:
+        assert client_for(server).push(str(local), "/data/local/tmp/lista.txt") == 12
+    assert device.files["/data/local/tmp/lista.txt"] == b"a.jpg\nb.jpg\n"
+
+
+def test_pull_replaces_hardlinked_destination(tmp_path):
+    blob = tmp_path / "blob"
+    blob.write_bytes(b"original")
+    (tmp_path / "caso").mkdir()
+    os.link(blob, tmp_path / "caso" / "a.jpg")
+    device = FakeDevice(files={"/sdcard/a.jpg": b"nuevo contenido"}, dirs={"/sdcard"})
+    with FakeADBServer(device) as server:
+        client_for(server).pull("/sdcard/a.jpg", str(tmp_path / "caso"))
+    assert (tmp_path / "caso" / "a.jpg").read_bytes() == b"nuevo contenido"
+    assert blob.read_bytes() == b"original"
+    assert not (tmp_path / "caso" / "a.jpg.part").exists()
@@ -0,0 +1,98 @@
+import os
+import zlib
+import hashlib
+from Crypto.Cipher import AES
+from src.modules.crypto import WhatsAppDecryptor, TagMismatchError
+
+KEY = bytes(range(32))
+DB = b"SQLite format 3\x00" + os.urandom(300 * 1024)
+
+
+def write_key(path, key=KEY):
+    path.write_bytes(b"\x00" * 126 + key)
+    return str(path)
+
+
+def write_backup(path, payload, key=KEY, iv_offset=67, header_size=191):
+    iv = os.urandom(12)
+    header = bytearray(os.urandom(header_size))
+    header[iv_offset:iv_offset + 12] = iv
+    cipher = AES.new(key, AES.MODE_GCM, nonce=iv)
+    body, tag = cipher.encrypt_and_digest(payload)
+    path.write_bytes(bytes(header) + body + tag)
+    return str(path)
+
+
+def small_chunks():
+    decryptor = WhatsAppDecryptor()
+    decryptor.CHUNK_SIZE = 64 * 1024
+    return decryptor
+
+
+def test_streaming_decrypt_to_sqlite(tmp_path):
+    decryptor = small_chunks()
+    backup = write_backup(tmp_path / "msgstore.db.crypt14", zlib.compress(DB))
+    out = tmp_path / "msgstore.db"
+    assert decryptor.decrypt_to_sqlite(write_key(tmp_path / "key"), backup, str(out))
+    assert out.read_bytes() == DB
+    assert decryptor.last_hash == hashlib.sha256(DB).hexdigest()
+
+
+def test_tampered_backup_is_rejected_and_not_published(tmp_path):
+    decryptor = small_chunks()
+    backup = tmp_path / "msgstore.db.crypt14"
+    write_backup(backup, zlib.compress(DB))
+    data = bytearray(backup.read_bytes())
+    data[-100] ^= 0x01
+    backup.write_bytes(bytes(data))
+
+    out = tmp_path / "msgstore.db"
+    assert not decryptor.decrypt(write_key(tmp_path / "key"), str(backup), str(out))
+    assert not out.exists()
+    assert not (tmp_path / "msgstore.db.part").exists()
+    try:
+        list(decryptor._iter_plaintext(KEY, str(backup)))
+    except TagMismatchError:
+        pass
+    else:
+        raise AssertionError("el tag alterado debe rechazarse")
+
+
+def test_decrypt_auto_detects_key_format_and_layout(tmp_path):
+    decryptor = small_chunks()
+    backup = write_backup(tmp_path / "wa.db.crypt15", zlib.compress(DB), iv_offset=66, header_size=190)
+    hex_key = tmp_path / "key.hex"
+    hex_key.write_text(KEY.hex())
+    out = tmp_path / "wa.db"
+    assert decryptor.decrypt_auto([str(tmp_path / "ausente"), str(hex_key)], backup, str(out))
+    assert out.read_bytes() == DB
+    # La variante detectada no altera la instancia
+    assert (decryptor.IV_OFFSET, decryptor.HEADER_SIZE) == (67, 191)
+
+
+def test_batch_statuses_and_unique_outputs(tmp_path):
+    backups = tmp_path / "Databases"
+    backups.mkdir()
+    write_backup(backups / "msgstore.db.crypt14", zlib.compress(DB))
+    write_backup(backups / "msgstore.db.crypt15", zlib.compress(DB[:1000]))
+    tampered = backups / "msgstore-2024-01-01.1.db.crypt14"
+    write_backup(tampered, zlib.compress(DB))
+    data = tampered.read_bytes()
+    tampered.write_bytes(data[:-1] + bytes([data[-1] ^ 0xFF]))
+    write_backup(backups / "wa.db.crypt14", b"no es zlib")
+    (backups / "corto.db.crypt14").write_bytes(b"\x00" * 10)
+
+    out_dir = tmp_path / "out"
+    rows = small_chunks().decrypt_batch(write_key(tmp_path / "key"), str(backups), str(out_dir), workers=2)
+    status = {os.path.basename(r["file"]): r["status"] for r in rows}
+    assert status == {
+        "msgstore.db.crypt14": "OK",
+        "msgstore.db.crypt15": "OK",
+        "msgstore-2024-01-01.1.db.crypt14": "TAG_MISMATCH",
+        "wa.db.crypt14": "FORMAT_ERROR",
+        "corto.db.crypt14": "ERROR",
+    }
+    outputs = [r["output"] for r in rows]
+    assert len(set(outputs)) == len(outputs)
+    assert (out_dir / "msgstore.crypt14.db").read_bytes() == DB
+    assert (out_dir / "msgstore.crypt15.db").read_bytes() == DB[:1000]
@@ -0,0 +1,62 @@
+import pytest
+from PIL import Image
+from src.modules.exif_reader import ExifReader
+from src.modules.metadata_analyst import MetadataAnalyst
+
+
+def exif_block():
+    exif = Image.Exif()
+    exif[0x010F] = "Canon"
+    exif[0x0110] = "EOS 80D"
+    exif.get_ifd(ExifReader.EXIF_IFD)[0x9003] = "2023:05:01 12:30:00"
+    gps = exif.get_ifd(ExifReader.GPS_IFD)
+    gps[1], gps[2] = "S", (34.0, 36.0, 9.0)
+    gps[3], gps[4] = "W", (58.0, 22.0, 54.0)
+    return exif
+
+
+def summary(exif):
+    lat, lon = MetadataAnalyst._get_lat_lon(exif)
+    return exif.get("Make"), exif.get("Model"), exif.get("DateTimeOriginal"), lat, lon
+
+
+@pytest.mark.parametrize("fmt,ext", [("JPEG", "jpg"), ("PNG", "png"), ("WEBP", "webp")])
+def test_matches_pil(tmp_path, fmt, ext):
+    path = tmp_path / f"foto.{ext}"
+    Image.new("RGB", (16, 16), "red").save(path, fmt, exif=exif_block())
+    fast = ExifReader.read(str(path))
+    assert fast is not None
+    with Image.open(path) as img:
+        slow = MetadataAnalyst._get_exif_data(img)
+    assert summary(fast) == summary(slow)
+    assert summary(fast)[:3] == ("Canon", "EOS 80D", "2023:05:01 12:30:00")
+    lat, lon = summary(fast)[3:]
+    assert lat == pytest.approx(-(34 + 36 / 60 + 9 / 3600)) and lon == pytest.approx(-(58 + 22 / 60 + 54 / 3600))
+
+
+def test_image_without_exif(tmp_path):
+    path = tmp_path / "plano.jpg"
+    Image.new("RGB", (16, 16)).save(path)
+    assert ExifReader.read(str(path)) == {}
+
+
+@pytest.mark.parametrize("cut", [4, 20, 200])
+def test_truncated_or_foreign_files_defer_to_pil(tmp_path, cut):
+    path = tmp_path / "foto.jpg"
+    Image.new("RGB", (16, 16)).save(path, exif=exif_block())
+    data = path.read_bytes()
+    path.write_bytes(data[:cut])
+    assert ExifReader.read(str(path)) in (None, {})
+    other = tmp_path / "doc.pdf"
+    other.write_bytes(b"%PDF-1.4\n")
+    assert ExifReader.read(str(other)) is None
+
+
+def test_corrupt_ifd_offsets_do_not_raise(tmp_path):
+    path = tmp_path / "foto.jpg"
+    Image.new("RGB", (16, 16)).save(path, exif=exif_block())
+    data = bytearray(path.read_bytes())
+    tiff = data.index(b"Exif\x00\x00") + 6
+    data[tiff + 4:tiff + 8] = b"\xff\xff\xff\x7f" if data[tiff] == ord("I") else b"\x7f\xff\xff\xff"
+    path.write_bytes(bytes(data))
+    assert ExifReader.read(str(path)) is None
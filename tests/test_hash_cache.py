@@ -0,0 +1,64 @@
+import os
+import hashlib
+import shutil
+from src.utils import HashCache
+
+
+def sha(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def make_cache(tmp_path):
+    logs = tmp_path / "02_Logs"
+    logs.mkdir(exist_ok=True)
+    return HashCache(str(logs / HashCache.FILENAME))
+
+
+def test_hit_and_invalidation_on_change(tmp_path):
+    cache = make_cache(tmp_path)
+    path = tmp_path / "a.bin"
+    path.write_bytes(b"uno")
+    assert cache.sha256(str(path)) == sha(b"uno")
+    assert cache.get(str(path)) == {"sha256": sha(b"uno")}
+
+    path.write_bytes(b"dos!")
+    assert cache.get(str(path)) is None
+    assert cache.sha256(str(path)) == sha(b"dos!")
+
+
+
+def test_copy_with_preserved_mtime_is_not_shared(tmp_path):
+    cache = make_cache(tmp_path)
+    original = tmp_path / "orig.jpg"
+    original.write_bytes(b"A" * 100)
+    cache.sha256(str(original))
+
+    copy = tmp_path / "copia.jpg"
+    copy.write_bytes(b"B" * 100)
+    shutil.copystat(original, copy)
+    # Otra ruta: jamás hereda los digests de un archivo distinto
+    assert cache.get(str(copy)) is None
+    assert cache.sha256(str(copy)) == sha(b"B" * 100)
+
+
+def test_hardlink_needs_its_own_entry(tmp_path):
+    cache = make_cache(tmp_path)
+    blob = tmp_path / "blob"
+    blob.write_bytes(b"contenido")
+    cache.sha256(str(blob))
+    link = tmp_path / "enlace.jpg"
+    os.link(blob, link)
+    assert cache.get(str(link)) is None
+    cache.record(str(link), {"sha256": sha(b"contenido")})
+    assert cache.get(str(link)) == {"sha256": sha(b"contenido")}
+
+
+def test_persistence_roundtrip(tmp_path):
+    cache = make_cache(tmp_path)
+    path = tmp_path / "a.bin"
+    path.write_bytes(b"x" * 10)
+    cache.sha256(str(path))
+    cache.save()
+    reloaded = make_cache(tmp_path)
+    assert reloaded.get(str(path)) == {"sha256": sha(b"x" * 10)}
+    assert reloaded.get(str(path), ("sha256", "md5")) is None
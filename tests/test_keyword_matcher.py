@@ -0,0 +1,35 @@
+from src.modules.keyword_matcher import KeywordMatcher
+
+
+def test_overlapping_keywords_in_one_pass():
+    matcher = KeywordMatcher(["he", "she", "his", "hers"])
+    found = sorted((matcher.keywords[i], start, end) for i, start, end in matcher.find_all("ushers"))
+    assert found == [("he", 2, 4), ("hers", 2, 6), ("she", 1, 4)]
+
+
+def test_accent_and_case_folding():
+    matcher = KeywordMatcher(["ubicacion", "Transferencia"])
+    assert matcher.matches("Mandame la UBICACIÓN y hacé la transferéncia") == ["ubicacion", "Transferencia"]
+    strict = KeywordMatcher(["ubicacion"], fold_accents=False)
+    assert strict.matches("ubicación") == []
+
+
+def test_whole_word():
+    matcher = KeywordMatcher(["arma", "pago"], whole_word=True)
+    assert matcher.matches("alarma, pagos") == []
+    assert matcher.matches("el arma; pago_") == ["arma"]
+    assert KeywordMatcher(["arma"]).matches("alarma") == ["arma"]
+
+
+def test_duplicates_and_blank_keywords_are_ignored():
+    matcher = KeywordMatcher(["droga", " Droga ", "", "  "])
+    assert len(matcher) == 1
+    assert matcher.matches("") == [] and KeywordMatcher([]).matches("droga") == []
+
+
+def test_matches_agree_with_naive_search():
+    words = ["cash", "ash", "sh", "hash", "as", "cas"]
+    matcher = KeywordMatcher(words)
+    for text in ("cashash", "hashcash has ash", "sssshhhh", "ca sh"):
+        expected = [w for w in words if w in text]
+        assert matcher.matches(text) == expected
@@ -0,0 +1,63 @@
+import hashlib
+import pytest
+from src.modules.known_hashes import KnownHashSet, KnownHashes
+
+
+def digest(n):
+    return hashlib.sha256(str(n).encode()).hexdigest()
+
+
+@pytest.fixture
+def lists(tmp_path):
+    bad = tmp_path / "bad.txt"
+    bad.write_text("\n".join(digest(n) for n in range(500)) + "\n" + digest(3).upper() + "\n")
+    csv = tmp_path / "bad.csv"
+    csv.write_text("sha256,nombre\n" + "".join(f"{digest(n)},archivo_{n}.jpg\n" for n in range(400, 700)))
+    good = tmp_path / "good.txt"
+    good.write_text(f"{digest(1000)}\n{digest(5)}\nno es un hash\n")
+    return bad, csv, good
+
+
+def test_compile_merges_and_deduplicates(tmp_path, lists, monkeypatch):
+    bad, csv, _ = lists
+    # Tramos pequeños para ejercitar la fusión de varios archivos ordenados
+    monkeypatch.setattr(KnownHashSet, "CHUNK", 64)
+    output = str(tmp_path / "bad.khs")
+    assert KnownHashSet.compile([str(bad), str(csv)], output) == 700
+    known = KnownHashSet(output)
+    assert len(known) == 700
+    assert all(digest(n) in known for n in range(700))
+    assert digest(3).upper() in known
+    misses = sum(digest(n) in known for n in range(700, 5700))
+    assert misses == 0
+    assert "zz" not in known and "" not in known and None not in known
+    known.close()
+    assert [p.name for p in tmp_path.iterdir() if p.suffix in (".run", ".sorted", ".tmp")] == []
+
+
+def test_empty_list(tmp_path):
+    empty = tmp_path / "vacio.txt"
+    empty.write_text("")
+    output = str(tmp_path / "vacio.khs")
+    assert KnownHashSet.compile([str(empty)], output) == 0
+    assert digest(1) not in KnownHashSet(output)
+
+
+def test_rejects_foreign_file(tmp_path):
+    other = tmp_path / "otro.khs"
+    other.write_bytes(b"\x00" * 64)
+    with pytest.raises(ValueError):
+        KnownHashSet(str(other))
+
+
+def test_tag_prefers_known_bad(tmp_path, lists):
+    bad, _, good = lists
+    bad_set, good_set = str(tmp_path / "bad.khs"), str(tmp_path / "good.khs")
+    KnownHashSet.compile([str(bad)], bad_set)
+    KnownHashSet.compile([str(good)], good_set)
+    known = KnownHashes(bad_set, good_set)
+    assert known.active
+    assert known.tag(digest(5)) == KnownHashes.KNOWN_BAD
+    assert known.tag(digest(1000)) == KnownHashes.KNOWN_GOOD
+    assert known.tag(digest(2000)) is None
+    assert not KnownHashes().active
@@ -0,0 +1,75 @@
+import os
+import json
+import pytest
+import main
+from src.utils import ForensicUtils
+
+
+@pytest.fixture
+def closed_case(tmp_path, monkeypatch):
+    """Caso recién cerrado con la misma rutina de cierre que 'acquire_device'."""
+    monkeypatch.chdir(tmp_path)
+    folders = main.create_case_structure("TEST")
+    with open(os.path.join(folders["evidence"], "chat_data.json"), "w", encoding="utf-8") as f:
+        json.dump([{"text": "hola"}], f)
+    os.makedirs(os.path.join(folders["media"], "WhatsApp Images"))
+    with open(os.path.join(folders["media"], "WhatsApp Images", "IMG-1.jpg"), "wb") as f:
+        f.write(b"\xff\xd8\xff" + b"\x00" * 100)
+    with open(os.path.join(folders["report"], "Reporte_Forense.html"), "w", encoding="utf-8") as f:
+        f.write("<html></html>")
+    manifest_hash, merkle_root = main.close_case(folders, "TEST", "SERIAL1", "ADB Backup")
+    return folders, manifest_hash, merkle_root
+
+
+def test_fresh_case_verifies(closed_case):
+    folders, manifest_hash, merkle_root = closed_case
+    summary = os.path.join(folders["base"], ForensicUtils.SUMMARY_FILE)
+    with open(summary, encoding="utf-8") as f:
+        text = f.read()
+    assert manifest_hash in text and merkle_root in text
+
+    result = ForensicUtils.verify_manifest(folders["base"])
+    assert result["ok"], result
+    assert result["added"] == result["missing"] == result["modified"] == []
+    assert main.verify_case(folders["base"])
+
+
+def test_modified_file_is_reported(closed_case):
+    folders, _, _ = closed_case
+    with open(os.path.join(folders["report"], "Reporte_Forense.html"), "a", encoding="utf-8") as f:
+        f.write("<!-- alterado -->")
+    result = ForensicUtils.verify_manifest(folders["base"])
+    assert not result["ok"]
+    assert result["modified"] == ["03_Report/Reporte_Forense.html"]
+
+
+def test_truncated_manifest_breaks_chain(closed_case):
+    folders, _, _ = closed_case
+    merkle_path = os.path.join(folders["logs"], ForensicUtils.MERKLE_FILE)
+    with open(merkle_path) as f:
+        merkle = json.load(f)
+    del merkle["tree"]["04_Media/WhatsApp Images"]
+    with open(merkle_path, "w") as f:
+        json.dump(merkle, f)
+
+    result = ForensicUtils.verify_manifest(folders["base"])
+    assert not result["chain_ok"]
+    assert not result["ok"]
+
+
+def test_similar_query_keeps_closed_case_intact(tmp_path, monkeypatch):
+    from PIL import Image
+    monkeypatch.chdir(tmp_path)
+    folders = main.create_case_structure("SIMIL")
+    images = os.path.join(folders["media"], "WhatsApp Images")
+    os.makedirs(images)
+    gradient = Image.linear_gradient("L").resize((64, 64)).convert("RGB")
+    gradient.save(os.path.join(images, "IMG-1.jpg"), quality=95)
+    gradient.resize((48, 48)).save(os.path.join(images, "IMG-2.jpg"), quality=60)
+    main.close_case(folders, "SIMIL", "SERIAL1", "ROOT_ACCESS")
+
+    query = tmp_path / "consulta.png"
+    gradient.save(query)
+    assert main.find_similar(folders["base"], str(query))
+    result = ForensicUtils.verify_manifest(folders["base"])
+    assert result["ok"], result
@@ -0,0 +1,72 @@
+import os
+import hashlib
+import pytest
+from src.modules.media_catalog import MediaCatalog
+
+
+@pytest.fixture
+def case(tmp_path):
+    folders = {"logs": str(tmp_path / "02_Logs"), "media": str(tmp_path / "04_Media")}
+    os.makedirs(folders["logs"])
+    files = {
+        "Images/IMG-1.jpg": b"\xff\xd8\xff\xe0" + b"a" * 50,
+        "Images/renombrada.dat": b"\x89PNG\r\n\x1a\n" + b"b" * 50,
+        "Video/VID-1.mp4": b"\x00\x00\x00\x18ftypisom" + b"c" * 50,
+        "Voice/PTT-1.opus": b"OggS" + b"d" * 50,
+        "Docs/nota.txt": b"texto plano",
+    }
+    for rel, data in files.items():
+        path = os.path.join(folders["media"], *rel.split("/"))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(data)
+    return folders, files
+
+
+def test_build_sniffs_real_type_and_hashes(case):
+    folders, files = case
+    catalog = MediaCatalog(folders)
+    assert catalog.build() == len(files)
+    rows = {row["rel_path"]: row for row in catalog.query()}
+    assert rows["04_Media/Images/renombrada.dat"]["type"] == "image/png"
+    assert rows["04_Media/Video/VID-1.mp4"]["type"] == "video/mp4"
+    assert rows["04_Media/Docs/nota.txt"]["type"] == "application/octet-stream"
+    assert rows["04_Media/Voice/PTT-1.opus"]["sha256"] == hashlib.sha256(files["Voice/PTT-1.opus"]).hexdigest()
+    images = catalog.query(types=("image/jpeg", "image/png"))
+    assert sorted(os.path.basename(r["path"]) for r in images) == ["IMG-1.jpg", "renombrada.dat"]
+    assert catalog.summary()["mismatched"] == [{"rel_path": "04_Media/Images/renombrada.dat", "type": "image/png"}]
+
+
+def test_rebuild_keeps_status_until_content_changes(case):
+    folders, _ = case
+    catalog = MediaCatalog(folders)
+    catalog.build(mtimes={"04_Media/Images/IMG-1.jpg": 1700000000})
+    jpg = os.path.join(folders["media"], "Images", "IMG-1.jpg")
+    mp4 = os.path.join(folders["media"], "Video", "VID-1.mp4")
+    catalog.set_status({jpg: "done", mp4: "done"})
+    assert catalog.query(types=("image/jpeg",))[0]["mtime"] == 1700000000
+
+    with open(mp4, "ab") as f:
+        f.write(b"nuevo")
+    os.remove(os.path.join(folders["media"], "Docs", "nota.txt"))
+    catalog.build()
+    status = {os.path.basename(r["path"]): r["status"] for r in catalog.query()}
+    assert status["IMG-1.jpg"] == "done"
+    assert status["VID-1.mp4"] == "pending"
+    assert "nota.txt" not in status and catalog.count() == 4
+
+
+@pytest.mark.parametrize("head,mime", [
+    (b"GIF89a", "image/gif"),
+    (b"RIFF\x00\x00\x00\x00WEBPVP8 ", "image/webp"),
+    (b"\x00\x00\x00\x18ftypheic", "image/heic"),
+    (b"\x00\x00\x00\x18ftyp3gp4", "video/3gpp"),
+    (b"\x00\x00\x00\x18ftypM4A ", "audio/mp4"),
+    (b"#!AMR\n", "audio/amr"),
+    (b"ID3\x03", "audio/mpeg"),
+    (b"%PDF-1.7", "application/pdf"),
+    (b"PK\x03\x04", "application/zip"),
+    (b"", "application/octet-stream"),
+])
+def test_sniff(head, mime):
+    assert MediaCatalog.sniff(head) == mime
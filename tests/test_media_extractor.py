@@ -0,0 +1,144 @@
+import io
+import os
+import json
+import time
+import hashlib
+import tarfile
+import subprocess
+import pytest
+from src.modules.adb_manager import SubprocessBackend
+from src.modules.media_extractor import MediaExtractor, TarStreamReader
+from src.modules.media_store import ContentStore
+from src.modules.transfer_progress import TransferProgress
+from local_device import LocalDevice
+
+FILES = {
+    "WhatsApp Images/IMG-1.jpg": b"\xff\xd8\xff" + b"1" * 3000,
+    "WhatsApp Images/IMG-2.jpg": b"\xff\xd8\xff" + b"2" * 700,
+    "WhatsApp Video/VID-1.mp4": b"\x00\x00\x00\x18ftypmp42" + b"v" * 5000,
+}
+
+
+@pytest.fixture
+def device_tree(tmp_path):
+    root = tmp_path / "device" / "Media"
+    for rel, data in FILES.items():
+        path = root / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(data)
+    return str(root)
+
+
+def extractor_for(tmp_path, device, store=None, workers=1):
+    folders = {"logs": str(tmp_path / "case" / "02_Logs"), "media": str(tmp_path / "case" / "04_Media")}
+    os.makedirs(folders["logs"], exist_ok=True)
+    os.makedirs(folders["media"], exist_ok=True)
+    extractor = MediaExtractor(device, folders, mode="sync", workers=workers, progress=TransferProgress(), store=store)
+    extractor.REMOTE_LIST = str(tmp_path / "afab_sync_{}.lst")
+    extractor.BATCH_RETRIES = 1
+    extractor.MAX_RESUMES = 0
+    return extractor
+
+
+def test_sync_transfers_and_records_every_listed_file(tmp_path, device_tree):
+    extractor = extractor_for(tmp_path, LocalDevice(), workers=2)
+    result = extractor._extract_sync(device_tree)
+    assert result["error"] is None and "missing" not in result
+    assert (result["listed"], result["files"]) == (3, 3)
+    for rel, data in FILES.items():
+        entry = extractor.ledger.files[f"{device_tree}/{rel}"]
+        assert entry["sha256"] == hashlib.sha256(data).hexdigest()
+        with open(os.path.join(extractor.media_output, "Media", rel), "rb") as f:
+            assert f.read() == data
+
+    # Segunda corrida: todo vigente, nada viaja
+    device = LocalDevice()
+    again = extractor_for(tmp_path, device)._extract_sync(device_tree)
+    assert (again["up_to_date"], again["files"], device.streams) == (3, 0, 0)
+
+
+def test_member_skipped_once_is_retried(tmp_path, device_tree):
+    device = LocalDevice(withheld={"IMG-2.jpg": 1})
+    result = extractor_for(tmp_path, device, workers=2)._extract_sync(device_tree)
+    assert result["error"] is None and "missing" not in result
+    assert (result["files"], result["retries"]) == (3, 1)
+    assert device.pulls == []
+
+
+def test_silently_skipped_file_is_reported_missing(tmp_path, device_tree):
+    device = LocalDevice(withheld={"VID-1.mp4": None})
+    device.unpullable.add("VID-1.mp4")
+    extractor = extractor_for(tmp_path, device, workers=2)
+    result = extractor._extract_sync(device_tree)
+    missing = f"{device_tree}/WhatsApp Video/VID-1.mp4"
+    assert result["missing"] == [missing]
+    assert result["error"] == "1 archivos listados no transferidos"
+    with open(extractor.ledger.path, encoding="utf-8") as f:
+        assert json.load(f)["missing"] == [missing]
+    with open(extractor.audit_log, encoding="utf-8") as f:
+        assert "SYNC_MISSING" in f.read()
+
+
+def test_withheld_file_recovered_by_pull(tmp_path, device_tree):
+    device = LocalDevice(withheld={"IMG-1.jpg": None})
+    result = extractor_for(tmp_path, device)._extract_sync(device_tree)
+    assert result["error"] is None and result["files"] == 3
+    assert [os.path.basename(p) for p in device.pulls] == ["IMG-1.jpg"]
+
+
+def test_tar_cut_between_members_is_detected(tmp_path, device_tree):
+    # Cabecera (512) + datos de IMG-2.jpg (703 -> 1024): corte justo antes del siguiente miembro
+    extractor = extractor_for(tmp_path, LocalDevice(cut=1536))
+    parent = os.path.dirname(device_tree)
+    result = extractor._extract_tar(device_tree, ["Media/WhatsApp Images/IMG-2.jpg", "Media/WhatsApp Images/IMG-1.jpg"])
+    assert "marcador de fin" in result["error"]
+    assert result["files"] == 1
+    assert f"{parent}/Media/WhatsApp Images/IMG-2.jpg" in extractor.ledger.files
+    assert not any(name.endswith(".part") for _, _, names in os.walk(extractor.media_output) for name in names)
+
+
+def test_sync_with_content_store_links_case_paths(tmp_path, device_tree):
+    store = ContentStore(str(tmp_path / "store"))
+    extractor = extractor_for(tmp_path, LocalDevice(), store=store)
+    assert extractor._extract_sync(device_tree)["error"] is None
+    for rel, data in FILES.items():
+        local = os.path.join(extractor.media_output, "Media", rel)
+        assert os.path.samefile(local, store.blob_path(hashlib.sha256(data).hexdigest()))
+
+
+def test_tar_reader_requires_end_of_archive_marker():
+    buf = io.BytesIO()
+    with tarfile.open(fileobj=buf, mode="w") as tar:
+        for name, size in (("a.bin", 100), ("b.bin", 700)):
+            info = tarfile.TarInfo(name)
+            info.size = size
+            tar.addfile(info, io.BytesIO(b"x" * size))
+    complete = buf.getvalue()
+    cut = complete[:512 + 512 + 512 + 1024]     # Dos miembros completos, sin bloques de ceros
+
+    for data, expected in ((complete, True), (cut, False)):
+        reader = TarStreamReader(io.BytesIO(data))
+        with tarfile.open(fileobj=reader, mode="r|") as tar:
+            assert [m.name for m in tar] == ["a.bin", "b.bin"]
+            assert reader.ended_at(tar.offset) is expected
+
+
+class _Shell:
+    @staticmethod
+    def _adb(*args):
+        return ["sh", "-c", args[-1]]
+
+
+def test_stalled_stream_is_killed():
+    started = time.monotonic()
+    with pytest.raises(subprocess.TimeoutExpired):
+        with SubprocessBackend(_Shell()).stream(["printf abc; exec sleep 30"], timeout=1) as out:
+            assert out.read(10) == b"abc"
+            out.read(10)
+    assert time.monotonic() - started < 10
+
+
+def test_stream_exit_code_is_checked():
+    with pytest.raises(subprocess.CalledProcessError):
+        with SubprocessBackend(_Shell()).stream(["printf abc; exit 3"], timeout=5) as out:
+            assert out.read(10) == b"abc"
@@ -0,0 +1,64 @@
+import os
+import hashlib
+import stat
+from src.modules.media_store import ContentStore
+
+
+def staged(tmp_path, name, data):
+    path = tmp_path / name
+    path.write_bytes(data)
+    return str(path), hashlib.sha256(data).hexdigest()
+
+
+def test_ingest_deduplicates_and_links(tmp_path):
+    store = ContentStore(str(tmp_path / "store"))
+    src, sha = staged(tmp_path, "a.part", b"foto")
+    created, linked = store.ingest(src, sha, str(tmp_path / "caso" / "a.jpg"))
+    assert (created, linked) == (True, True)
+    assert not os.path.exists(src)
+    assert stat.S_IMODE(os.stat(store.blob_path(sha)).st_mode) == 0o444
+
+    src, _ = staged(tmp_path, "b.part", b"foto")
+    created, _ = store.ingest(src, sha, str(tmp_path / "caso" / "b.jpg"))
+    assert created is False
+    assert os.path.samefile(tmp_path / "caso" / "a.jpg", tmp_path / "caso" / "b.jpg")
+    assert os.listdir(os.path.dirname(store.blob_path(sha))) == [sha]
+
+
+def test_ingest_keeps_blob_published_by_another_process(tmp_path):
+    root = str(tmp_path / "store")
+    store = ContentStore(root)
+    other = ContentStore(root)
+    src, sha = staged(tmp_path, "a.part", b"compartido")
+    # Otro proceso ya publicó el blob entre la comprobación y la publicación
+    other.ingest(staged(tmp_path, "x.part", b"compartido")[0], sha, str(tmp_path / "otro" / "x.jpg"))
+    inode = os.stat(store.blob_path(sha)).st_ino
+    created, linked = store.ingest(src, sha, str(tmp_path / "caso" / "a.jpg"))
+    assert (created, linked) == (False, True)
+    assert os.stat(store.blob_path(sha)).st_ino == inode
+    assert not any(n.endswith(".tmp") for n in os.listdir(os.path.dirname(store.blob_path(sha))))
+
+
+def test_link_replaces_existing_destination_without_touching_blob(tmp_path):
+    store = ContentStore(str(tmp_path / "store"))
+    src_a, sha_a = staged(tmp_path, "a.part", b"A")
+    src_b, sha_b = staged(tmp_path, "b.part", b"B")
+    dest = str(tmp_path / "caso" / "x.jpg")
+    store.ingest(src_a, sha_a, dest)
+    store.ingest(src_b, sha_b, dest)
+    assert open(dest, "rb").read() == b"B"
+    assert open(store.blob_path(sha_a), "rb").read() == b"A"
+
+
+def test_case_index(tmp_path):
+    store = ContentStore(str(tmp_path / "store"))
+    logs = tmp_path / "caso" / "02_Logs"
+    logs.mkdir(parents=True)
+    entries = []
+    for name in ("a.jpg", "b.jpg"):
+        src, sha = staged(tmp_path, name + ".part", b"igual")
+        store.ingest(src, sha, str(tmp_path / "caso" / "04_Media" / name))
+        entries.append({"local": f"04_Media/{name}", "size": 5, "sha256": sha})
+    index = store.write_case_index(str(logs), entries)
+    assert (index["files"], index["unique_blobs"], index["bytes_unique"], index["bytes_logical"]) == (2, 1, 5, 10)
+    assert index["blobs"][entries[0]["sha256"]]["linked"] is True
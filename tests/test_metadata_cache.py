@@ -0,0 +1,55 @@
+import sqlite3
+from src.modules.metadata_cache import MetadataCache
+
+SHA = "ab" * 32
+IMAGE = {"camera": "Canon EOS", "date_original": "2023:01:01 10:00:00", "has_meta": True, "lat": None, "lon": None}
+VIDEO = {"camera": "", "date_original": "2023-01-01T10:00:00", "has_meta": False, "lat": None, "lon": None}
+
+
+def test_same_content_is_cached_per_kind(tmp_path):
+    cache = MetadataCache(str(tmp_path / "meta.db"), 100)
+    cache.put_many({(SHA, "image"): IMAGE, (SHA, "video"): VIDEO, ("cd" * 32, "image"): None})
+    found = cache.get_many([(SHA, "image"), (SHA, "video"), ("cd" * 32, "image"), ("cd" * 32, "video")])
+    assert found == {(SHA, "image"): IMAGE, (SHA, "video"): VIDEO, ("cd" * 32, "image"): None}
+
+
+def test_other_parser_version_is_not_served(tmp_path):
+    path = str(tmp_path / "meta.db")
+    cache = MetadataCache(path, 100)
+    cache.put_many({(SHA, "image"): IMAGE})
+    cache.close()
+    MetadataCache.VERSION, version = MetadataCache.VERSION + 1, MetadataCache.VERSION
+    try:
+        assert MetadataCache(path, 100).get_many([(SHA, "image")]) == {}
+    finally:
+        MetadataCache.VERSION = version
+
+
+def test_legacy_schema_is_replaced(tmp_path):
+    path = str(tmp_path / "meta.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE metadata (sha256 TEXT PRIMARY KEY, version INTEGER NOT NULL, result TEXT, last_used REAL NOT NULL)")
+    conn.execute("INSERT INTO metadata VALUES (?, 2, 'null', 0)", (SHA,))
+    conn.commit()
+    conn.close()
+    cache = MetadataCache(path, 100)
+    assert cache.get_many([(SHA, "image")]) == {}
+    cache.put_many({(SHA, "image"): IMAGE})
+    assert cache.get_many([(SHA, "image")]) == {(SHA, "image"): IMAGE}
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = MetadataCache(str(tmp_path / "meta.db"), 3)
+    keys = [(f"{n:064x}", "image") for n in range(3)]
+    for key in keys:
+        cache.put_many({key: IMAGE})
+    cache.get_many([keys[0]])
+    cache.put_many({("f" * 64, "image"): IMAGE})
+    assert set(cache.get_many(keys + [("f" * 64, "image")])) == {keys[0], keys[2], ("f" * 64, "image")}
+
+
+def test_batches_beyond_the_parameter_limit(tmp_path):
+    cache = MetadataCache(str(tmp_path / "meta.db"), 10000)
+    keys = [(f"{n:064x}", "video" if n % 2 else "image") for n in range(1000)]
+    cache.put_many({key: None for key in keys})
+    assert len(cache.get_many(keys)) == 1000
@@ -0,0 +1,71 @@
+import struct
+import datetime
+from src.modules.mp4_reader import Mp4Reader
+
+
+def box(kind, payload=b""):
+    return struct.pack(">I", 8 + len(payload)) + kind + payload
+
+
+def qt_string(text):
+    data = text.encode()
+    return struct.pack(">HH", len(data), 0x15C7) + data
+
+
+def mvhd(created):
+    seconds = int((created - Mp4Reader.MAC_EPOCH).total_seconds())
+    return box(b"mvhd", b"\x00\x00\x00\x00" + struct.pack(">II", seconds, seconds) + b"\x00" * 88)
+
+
+def keys_meta(entries):
+    keys = b"".join(box(b"mdta", name.encode()) for name, _ in entries)
+    items = b"".join(box(struct.pack(">I", n + 1), box(b"data", struct.pack(">II", 1, 0) + value.encode()))
+                     for n, (_, value) in enumerate(entries))
+    return box(b"meta", b"\x00\x00\x00\x00" + box(b"hdlr", b"\x00" * 24) +
+               box(b"keys", struct.pack(">II", 0, len(entries)) + keys) + box(b"ilst", items))
+
+
+def write(path, *boxes):
+    path.write_bytes(box(b"ftyp", b"mp42\x00\x00\x00\x00mp42") + b"".join(boxes))
+    return str(path)
+
+
+def test_udta_quicktime_atoms(tmp_path):
+    moov = box(b"moov", mvhd(datetime.datetime(2024, 1, 2, 10, 0, 0)) +
+               box(b"udta", box(b"\xa9xyz", qt_string("-34.6037-058.3816/")) +
+                   box(b"\xa9mak", qt_string("samsung")) + box(b"\xa9mod", qt_string("SM-G991B"))))
+    path = write(tmp_path / "v.mp4", box(b"mdat", b"\x00" * 4096), moov)
+    info = Mp4Reader.read(path)
+    assert info == {"CreationTime": "2024:01:02 10:00:00", "lat": -34.6037, "lon": -58.3816,
+                    "Make": "samsung", "Model": "SM-G991B"}
+
+
+def test_mdta_keys_from_ios(tmp_path):
+    moov = box(b"moov", mvhd(datetime.datetime(2024, 1, 2, 10, 0, 0)) + keys_meta([
+        ("com.apple.quicktime.make", "Apple"),
+        ("com.apple.quicktime.model", "iPhone 13"),
+        ("com.apple.quicktime.creationdate", "2024-01-02T07:00:00-0300"),
+        ("com.apple.quicktime.location.ISO6709", "+40.4168-003.7038+650.000/"),
+    ]))
+    info = Mp4Reader.read(write(tmp_path / "v.mov", moov))
+    assert info["Make"] == "Apple" and info["Model"] == "iPhone 13"
+    assert info["DateTimeOriginal"] == "2024:01:02 07:00:00"
+    assert (info["lat"], info["lon"]) == (40.4168, -3.7038)
+
+
+def test_large_mdat_is_skipped_by_size(tmp_path):
+    # mdat de 64 bits que declara más bytes de los presentes: no se lee su contenido
+    mdat = struct.pack(">I", 1) + b"mdat" + struct.pack(">Q", 1 << 40)
+    path = write(tmp_path / "v.mp4", box(b"moov", mvhd(datetime.datetime(2020, 6, 1))), mdat + b"\x00" * 64)
+    assert Mp4Reader.read(path) == {"CreationTime": "2020:06:01 00:00:00"}
+
+
+def test_malformed_containers(tmp_path):
+    assert Mp4Reader.read(write(tmp_path / "sin_moov.mp4", box(b"mdat", b"x" * 10))) is None
+    (tmp_path / "texto.mp4").write_bytes(b"no es un contenedor")
+    assert Mp4Reader.read(str(tmp_path / "texto.mp4")) is None
+    truncated = box(b"moov", box(b"udta", box(b"\xa9mak", qt_string("Nokia"))))[:-3]
+    # Las cajas se acotan al archivo: se conserva lo legible sin leer más allá del final
+    assert Mp4Reader.read(write(tmp_path / "corto.mp4", truncated)) == {"Make": "No"}
+    bad_date = box(b"moov", box(b"mvhd", b"\x01\x00\x00\x00" + b"\xff" * 16 + b"\x00" * 80))
+    assert Mp4Reader.read(write(tmp_path / "fecha.mp4", bad_date)) == {}
@@ -0,0 +1,25 @@
+import random
+from src.modules.perceptual_hash import BKTree, _popcount
+
+
+def test_bktree_matches_linear_scan():
+    rng = random.Random(7)
+    keys = [rng.getrandbits(64) for _ in range(300)]
+    keys += [keys[0] ^ (1 << bit) for bit in range(5)]
+    tree = BKTree()
+    for n, key in enumerate(keys):
+        tree.add(key, n)
+    assert tree.size == len(keys)
+
+    for probe in keys[:20] + [rng.getrandbits(64)]:
+        for radius in (0, 3, 12):
+            expected = sorted((_popcount(probe ^ key), n) for n, key in enumerate(keys) if _popcount(probe ^ key) <= radius)
+            assert sorted(tree.query(probe, radius)) == expected
+
+
+def test_duplicate_keys_share_a_node():
+    tree = BKTree()
+    tree.add(0b1010, "a")
+    tree.add(0b1010, "b")
+    assert sorted(tree.query(0b1011, 1)) == [(1, "a"), (1, "b")]
+    assert tree.query(0b0101, 3) == []